@@ -0,0 +1,254 @@
+"""
+Benchmark demo pipelines without a display.
+
+Runs the demo pipeline for every combination of inference model, inference skip and input size,
+and reports the throughput and latency of each run as JSON or CSV.
+"""
+
+from itertools import product
+from typing import Any, Optional
+import argparse
+import csv
+import json
+import sys
+
+from gst.inprocess import HAVE_GST_BINDINGS
+from gst.pipeline import GstPipelineGenerator
+from gst.tuning import TUNING_PROFILES
+from utils.common import InputType
+from utils.model_info import get_model_input_dims
+from utils.user_input import get_inf_model, get_inp_src_info, validate_inp_dims
+
+# report columns, in order
+REPORT_FIELDS: tuple[str, ...] = (
+    "model",
+    "inf_w",
+    "inf_h",
+    "inf_skip",
+    "inp_w",
+    "inp_h",
+    "ok",
+    "duration_s",
+    "source_fps",
+    "display_fps",
+    "inference_rate",
+    "latency_avg_ms",
+    "latency_p50_ms",
+    "latency_p99_ms",
+    "frame_p99_ms",
+    "dropped_inference",
+    "dropped_display",
+)
+
+
+def run_benchmark(
+    base_params: dict[str, Any],
+    model: str,
+    inf_skip: int,
+    inp_dims: Optional[tuple[int, int]],
+    duration: float,
+) -> dict[str, Any]:
+    """
+    Runs a single headless pipeline and returns its measurements as a report row.
+    """
+    model_inp_dims = get_model_input_dims(model)
+    row: dict[str, Any] = {
+        "model": model,
+        "inf_skip": inf_skip,
+        "inp_w": inp_dims[0] if inp_dims else None,
+        "inp_h": inp_dims[1] if inp_dims else None,
+        "ok": False,
+    }
+    if not model_inp_dims:
+        return row
+    row["inf_w"], row["inf_h"] = model_inp_dims
+    gst_params: dict[str, Any] = {
+        **base_params,
+        "inf_model": model,
+        "inf_w": model_inp_dims[0],
+        "inf_h": model_inp_dims[1],
+        "inf_skip": inf_skip,
+        "stats": "",
+        # runs are summarized in the report table instead
+        "stats_verbose": False,
+    }
+    if inp_dims:
+        gst_params["inp_w"], gst_params["inp_h"] = inp_dims
+    gen = GstPipelineGenerator(gst_params)
+    gen.make_pipeline()
+    row["ok"] = gen.pipeline.run(
+        f"Benchmarking {model} (inference skip {inf_skip}, input {'x'.join(map(str, inp_dims or ('native',)))})...",
+        timeout=duration,
+    )
+    summary = gen.stats.summary
+    row.update(
+        {
+            "duration_s": summary.get("duration_s"),
+            "source_fps": summary.get("source", {}).get("fps"),
+            "display_fps": summary.get("display", {}).get("fps"),
+            "inference_rate": summary.get("inference", {}).get("rate"),
+            "latency_avg_ms": summary.get("latency", {}).get("avg_ms"),
+            "latency_p50_ms": summary.get("latency", {}).get("p50_ms"),
+            "latency_p99_ms": summary.get("latency", {}).get("p99_ms"),
+            "frame_p99_ms": summary.get("display", {}).get("p99_ms"),
+            "dropped_inference": summary.get("dropped_frames", {}).get("inference"),
+            "dropped_display": summary.get("dropped_frames", {}).get("display"),
+        }
+    )
+    return row
+
+
+def save_report(rows: list[dict[str, Any]], output: str) -> None:
+    """
+    Saves report rows as CSV if `output` ends with ".csv", otherwise as JSON.
+    """
+    with open(output, "w", newline="") as f:
+        if output.lower().endswith(".csv"):
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            json.dump(rows, f, indent=2)
+
+
+def main(args: argparse.Namespace) -> None:
+    if not HAVE_GST_BINDINGS:
+        raise SystemExit("Fatal: benchmarking requires the GStreamer Python bindings (python3-gi)")
+    try:
+        inp_src_info = get_inp_src_info(None, None, args.input, args.input_codec, args.revalidate)
+        if not inp_src_info:
+            sys.exit(1)
+        models = [get_inf_model(m, args.revalidate) for m in args.models]
+    except KeyboardInterrupt:
+        print("\nExiting...")
+        sys.exit()
+
+    base_params: dict[str, Any] = {
+        "inp_type": inp_src_info[0],
+        "inp_src": inp_src_info[1],
+        "inp_codec": inp_src_info[2],
+        "codec_elems": inp_src_info[3],
+        "inf_max": args.num_inferences,
+        "inf_thresh": args.confidence_threshold,
+        "fullscreen": False,
+        "backend": "inprocess",
+        "headless": True,
+        "scale_input": True,
+        "tuning": args.tuning,
+    }
+    inp_dims: list[Optional[tuple[int, int]]] = [
+        tuple(int(d) for d in dims.split("x")) for dims in args.input_dims
+    ] or [None]
+    if inp_src_info[0] == InputType.RTSP and inp_dims != [None]:
+        print("Input sizes are ignored for RTSP streams")
+        inp_dims = [None]
+
+    rows: list[dict[str, Any]] = []
+    try:
+        for model, inf_skip, dims in product(models, args.inference_skips, inp_dims):
+            rows.append(run_benchmark(base_params, model, inf_skip, dims, args.duration))
+    except KeyboardInterrupt:
+        print("\nBenchmark interrupted, saving completed runs")
+
+    print(f"\n{'model':<60} {'skip':>4} {'input':>10} {'fps':>7} {'inf/s':>7} {'p99 ms':>7}")
+    for row in rows:
+        dims = f"{row['inp_w']}x{row['inp_h']}" if row["inp_w"] else "native"
+        print(
+            f"{row['model'][-60:]:<60} {row['inf_skip']:>4} {dims:>10} "
+            f"{row.get('display_fps') or '-':>7} {row.get('inference_rate') or '-':>7} {row.get('latency_p99_ms') or '-':>7}"
+        )
+    if args.output:
+        save_report(rows, args.output)
+        print(f"\nSaved benchmark report to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "-i",
+        "--input",
+        type=str,
+        required=True,
+        metavar="SRC",
+        help="Input source (file / camera / RTSP)",
+    )
+    parser.add_argument(
+        "-c",
+        "--input_codec",
+        type=str,
+        default="auto",
+        help="Input codec for file/RTSP (default: %(default)s, detected for files and h264 for RTSP)",
+    )
+    parser.add_argument(
+        "-d",
+        "--input_dims",
+        type=validate_inp_dims,
+        nargs="+",
+        default=[],
+        metavar="WIDTHxHEIGHT",
+        help="Input sizes to benchmark (default: native input size)",
+    )
+    parser.add_argument(
+        "-m",
+        "--models",
+        type=str,
+        nargs="+",
+        required=True,
+        metavar="FILE",
+        help="SyNAP model files to benchmark",
+    )
+    parser.add_argument(
+        "-s",
+        "--inference_skips",
+        type=int,
+        nargs="+",
+        default=[1],
+        metavar="N_FRAMES",
+        help="Inference skips to benchmark (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-n",
+        "--num_inferences",
+        type=int,
+        metavar="N_RESULTS",
+        default=5,
+        help="Maximum number of detections returned per frame (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-t",
+        "--confidence_threshold",
+        type=float,
+        metavar="SCORE",
+        default=0.5,
+        help="Confidence threshold for inferences (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--tuning",
+        type=str,
+        default="throughput",
+        choices=TUNING_PROFILES,
+        help="Queue and RTSP latency settings of the benchmarked pipeline (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=20,
+        metavar="SECONDS",
+        help="Maximum duration of each run (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        metavar="FILE",
+        help="Save report to FILE as CSV (.csv) or JSON",
+    )
+    parser.add_argument(
+        "--revalidate",
+        action="store_true",
+        default=False,
+        help="Validate the input source and model even if they passed validation before",
+    )
+    args = parser.parse_args()
+
+    main(args)
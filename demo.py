@@ -6,40 +6,138 @@ Requires a valid input source (video / camera / RTSP) and SyNAP inference model.
 
 from typing import Any
 import argparse
+import importlib
+import os
 import sys
 
-from gst.pipeline import GstPipelineGenerator
+from gst.adaptive import ADAPTIVE_DEFAULT_FPS
+from gst.elements import set_decoder_override
+from gst.pipeline import BACKENDS, GstPipelineGenerator
+from gst.record import get_record_location
+from gst.rtsp import RTSP_TRANSPORTS
+from gst.tuning import DEFAULT_TUNING, TUNING_PROFILES
+from utils.common import InputType
 from utils.user_input import *
 from utils.model_info import *
+from utils.model_profiler import select_model
+from utils.run_profile import load_run_profile, save_run_profile
+from utils.video_info import get_video_file_fps, get_video_file_info
 
 
 def main(args: argparse.Namespace) -> None:
-    gst_params: dict[str, Any] = {}
+    gst_params: dict[str, Any] = {
+        # measurements, hooks and per-stream inference of multiple sources need the in-process backend,
+        # use it if available, it also finalizes recordings most reliably on Ctrl+C
+        "backend": args.backend
+        or (
+            "auto"
+            if args.stats is not None
+            or args.supervise
+            or args.adaptive_skip
+            or args.export
+            or args.frame_hook
+            or args.tiles
+            or args.roi
+            or args.motion_gate
+            or args.track
+            or len(args.input or []) > 1
+            or args.record
+            else "subprocess"
+        ),
+        "stats": args.stats,
+        "convert": args.convert,
+        "tuning": args.tuning,
+        "rtsp_latency": args.rtsp_latency,
+        "rtsp_transport": args.rtsp_transport,
+        "rtsp_reconnect": args.rtsp_reconnect,
+        "supervise": args.supervise,
+        "stall_timeout": args.stall_timeout,
+        "heartbeat_file": args.heartbeat,
+        "max_restarts": args.max_restarts,
+        "adaptive_skip": args.adaptive_skip,
+        "target_fps": args.target_fps,
+        "max_skip": args.max_skip,
+        "skip_log": args.skip_log,
+        "tiles": args.tiles,
+        "tile_overlap": args.tile_overlap,
+        "rois": args.roi,
+        "motion_gate": args.motion_gate,
+        "motion_threshold": args.motion_threshold,
+        "motion_keepalive": args.motion_keepalive,
+        "tracking": args.track,
+        "export": args.export,
+        "frame_format": args.frame_format,
+        "frame_queue": args.frame_queue,
+        "record": args.record,
+        "record_segment_s": args.record_segment,
+        "record_segment_mb": args.record_max_mb,
+    }
 
     try:
+        if args.frame_hook:
+            module, _, func = args.frame_hook.partition(":")
+            try:
+                gst_params["frame_callback"] = getattr(importlib.import_module(module), func)
+            except (ImportError, AttributeError, ValueError) as e:
+                print(f'\nERROR: Invalid frame hook "{args.frame_hook}": {e}\n')
+                sys.exit(1)
+        if args.record:
+            try:
+                get_record_location(args.record, False)
+            except ValueError as e:
+                print(f"\nERROR: {e}\n")
+                sys.exit(1)
+        if args.decoder:
+            codec, _, decoder = args.decoder.rpartition("=")
+            try:
+                set_decoder_override(decoder, codec or None)
+            except KeyError:
+                print(f'\nERROR: Invalid codec "{codec}" for decoder override\n')
+                sys.exit(1)
         if args.input_dims:
             gst_params["inp_w"], gst_params["inp_h"] = [int(d) for d in args.input_dims.split("x")]
 
-        if not (
-            inp_src_info := get_inp_src_info(
-                gst_params.get("inp_w", None),
-                gst_params.get("inp_h", None),
-                args.input,
-                args.input_codec if args.input else None,
+        sources: list[dict[str, Any]] = []
+        for inp_src in args.input or [None]:
+            if not (
+                inp_src_info := get_inp_src_info(
+                    gst_params.get("inp_w", None),
+                    gst_params.get("inp_h", None),
+                    inp_src,
+                    args.input_codec if inp_src else None,
+                    args.revalidate,
+                    args.rtsp_transport,
+                )
+            ):
+                sys.exit(1)
+            src_params: dict[str, Any] = dict(
+                zip(("inp_type", "inp_src", "inp_codec", "codec_elems"), inp_src_info)
             )
-        ):
-            sys.exit(1)
-        gst_params["inp_type"], gst_params["inp_src"], gst_params["inp_codec"], gst_params["codec_elems"] = (
-            inp_src_info
-        )
+            src_params["inp_w"], src_params["inp_h"] = gst_params.get("inp_w"), gst_params.get("inp_h")
+            if src_params["inp_type"] == InputType.FILE and not src_params["inp_w"]:
+                if file_info := get_video_file_info(src_params["inp_src"]):
+                    src_params["inp_w"], src_params["inp_h"] = file_info[1:]
+            sources.append(src_params)
+        gst_params.update(sources[0])
+        gst_params["sources"] = sources
+        gst_params["split_output"] = args.split_output
 
-        gst_params["inf_model"] = get_inf_model(args.model)
+        if args.target_fps is None and sources[0]["inp_type"] == InputType.FILE and len(sources) == 1:
+            # hold the file's own frame rate, other sources are resolved from the display caps while running
+            gst_params["target_fps"] = get_video_file_fps(sources[0]["inp_src"])
+        if args.model and os.path.isdir(args.model):
+            target_fps = gst_params["target_fps"] or ADAPTIVE_DEFAULT_FPS
+            if not (selection := select_model(args.model, target_fps, args.max_skip)):
+                sys.exit(1)
+            args.model, args.inference_skip = selection
+        gst_params["inf_model"] = get_inf_model(args.model, args.revalidate)
         model_inp_dims = get_model_input_dims(
             gst_params["inf_model"]
         )
         if not model_inp_dims:
             sys.exit(1)
         gst_params["inf_w"], gst_params["inf_h"] = model_inp_dims
+        gst_params["label_file"] = get_model_label_file(gst_params["inf_model"])
         gst_params["inf_skip"] = get_int_prop(
             "How many frames to skip between each inference",
             args.inference_skip if args.model else None,
@@ -65,10 +163,31 @@ def main(args: argparse.Namespace) -> None:
         print("\nExiting...")
         sys.exit()
 
+    if args.save_profile:
+        # save the resolved answers, so that the profile starts without prompts or input detection
+        resolved: dict[str, Any] = {
+            **vars(args),
+            "input": [src["inp_src"] for src in sources],
+            "model": gst_params["inf_model"],
+            "inference_skip": gst_params["inf_skip"],
+            "num_inferences": gst_params["inf_max"],
+            "confidence_threshold": gst_params["inf_thresh"],
+            "fullscreen": gst_params["fullscreen"],
+        }
+        if len(sources) == 1 and sources[0]["inp_codec"]:
+            resolved["input_codec"] = sources[0]["inp_codec"]
+        save_run_profile(args.save_profile, resolved)
+
     gen: GstPipelineGenerator = GstPipelineGenerator(gst_params)
 
     gen.make_pipeline()
-    gen.pipeline.run()
+    if args.dry_run:
+        print("\nPlanned conversions:")
+        for note in gen.conversion_plan.notes:
+            print(f"  {note}")
+        print(f"\nPipeline:\ngst-launch-1.0 {gen.pipeline}")
+        return
+    gen.run()
 
 
 if __name__ == "__main__":
@@ -80,8 +199,9 @@ if __name__ == "__main__":
         "-i",
         "--input",
         type=str,
+        nargs="+",
         metavar="SRC",
-        help="Input source (file / camera / RTSP)",
+        help="Input source (file / camera / RTSP), multiple sources share a single inference model",
     )
     parser.add_argument(
         "-d",
@@ -94,8 +214,20 @@ if __name__ == "__main__":
         "-c",
         "--input_codec",
         type=str,
-        default="h264",
-        help="Input codec for file/RTSP (default: %(default)s)",
+        default="auto",
+        help="Input codec for file/RTSP (default: %(default)s, detected for files and h264 for RTSP)",
+    )
+    parser.add_argument(
+        "--split_output",
+        action="store_true",
+        default=False,
+        help="Show each input source in its own window instead of a combined view when using multiple sources",
+    )
+    parser.add_argument(
+        "--decoder",
+        type=str,
+        metavar="[CODEC=]ELEMENT",
+        help="GStreamer decoder to use instead of the best installed one, optionally only for CODEC",
     )
     parser.add_argument(
         "--fullscreen",
@@ -103,10 +235,153 @@ if __name__ == "__main__":
         default=None,
         help="Launch demo in fullscreen",
     )
+    parser.add_argument(
+        "--backend",
+        type=str,
+        choices=BACKENDS,
+        help="Run pipeline with gst-launch-1.0 or in-process with the GStreamer Python bindings "
+        "(default: auto with --stats, --supervise, --adaptive_skip, --export, --frame_hook, --tiles, --roi, "
+        "--motion_gate, --track, --record or several inputs, which need or benefit from in-process runs; "
+        "subprocess otherwise)",
+    )
+    parser.add_argument(
+        "--stats",
+        type=str,
+        nargs="?",
+        const="",
+        metavar="FILE",
+        help="Print frame rate, frame interval, dropped frame and inference rate stats on exit, "
+        "and optionally save them to FILE as JSON",
+    )
+    parser.add_argument(
+        "--tuning",
+        type=str,
+        default=DEFAULT_TUNING,
+        choices=TUNING_PROFILES,
+        help="Queue, display sink and RTSP latency settings: drop stale frames of live inputs for the lowest "
+        "latency, or never drop frames for the highest throughput (default: %(default)s, GStreamer's defaults)",
+    )
+    rtsp_group = parser.add_argument_group("RTSP parameters")
+    rtsp_group.add_argument(
+        "--rtsp_latency",
+        type=int,
+        metavar="MS",
+        help="RTSP jitterbuffer latency (default: set by --tuning)",
+    )
+    rtsp_group.add_argument(
+        "--rtsp_transport",
+        type=str,
+        default="auto",
+        choices=RTSP_TRANSPORTS,
+        help="Transport protocol for RTSP streams (default: %(default)s)",
+    )
+    rtsp_group.add_argument(
+        "--rtsp_reconnect",
+        type=float,
+        default=10,
+        metavar="SECONDS",
+        help="How long to keep reconnecting a dropped RTSP stream, 0 to exit instead. Each attempt restarts the "
+        "whole pipeline, including loading the model (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--export",
+        type=str,
+        metavar="TARGET",
+        help="Export detections of every frame as JSON Lines to TARGET, a file or unix:<socket path>",
+    )
+    frame_group = parser.add_argument_group("Frame access")
+    frame_group.add_argument(
+        "--frame_hook",
+        type=str,
+        metavar="MODULE:FUNCTION",
+        help="Call FUNCTION(frame, info) from MODULE with every frame, as a read-only NumPy array or memoryview",
+    )
+    frame_group.add_argument(
+        "--frame_format",
+        type=str,
+        metavar="FORMAT",
+        help="Convert frames for --frame_hook to FORMAT, e.g. RGB (default: source format)",
+    )
+    frame_group.add_argument(
+        "--frame_queue",
+        type=int,
+        default=2,
+        metavar="N_FRAMES",
+        help="Frames held for a slow --frame_hook before dropping the oldest, 0 to never drop (default: %(default)s)",
+    )
+    rec_group = parser.add_argument_group("Recording parameters")
+    rec_group.add_argument(
+        "--record",
+        type=str,
+        metavar="FILE",
+        help="Also record the annotated video to FILE (.mp4 / .mkv)",
+    )
+    rec_group.add_argument(
+        "--record_segment",
+        type=float,
+        metavar="SECONDS",
+        help="Start a new recording file every SECONDS, numbered after FILE",
+    )
+    rec_group.add_argument(
+        "--record_max_mb",
+        type=float,
+        metavar="MB",
+        help="Start a new recording file once the current one reaches MB megabytes",
+    )
+    sup_group = parser.add_argument_group("Supervisor parameters")
+    sup_group.add_argument(
+        "--supervise",
+        action="store_true",
+        default=False,
+        help="Restart the pipeline with exponential backoff if it fails or stalls, for unattended runs",
+    )
+    sup_group.add_argument(
+        "--stall_timeout",
+        type=float,
+        default=10,
+        metavar="SECONDS",
+        help="Restart a supervised pipeline if no frames arrive for this long, 0 to disable (default: %(default)s)",
+    )
+    sup_group.add_argument(
+        "--heartbeat",
+        type=str,
+        metavar="FILE",
+        help="Write supervisor status and restart counters to FILE as JSON every second",
+    )
+    sup_group.add_argument(
+        "--max_restarts",
+        type=int,
+        metavar="N",
+        help="Give up after N restarts (default: restart forever)",
+    )
+    parser.add_argument(
+        "--convert",
+        type=str,
+        default="auto",
+        choices=("auto", "legacy"),
+        help="Plan video conversions from the source, model and display formats, "
+        "or convert at every stage (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--dry_run",
+        action="store_true",
+        default=False,
+        help="Print the planned conversions and pipeline without running it",
+    )
+    parser.add_argument(
+        "--revalidate",
+        action="store_true",
+        default=False,
+        help="Validate the input source and model even if they passed validation before",
+    )
 
     inf_group = parser.add_argument_group("Inference parameters")
     inf_group.add_argument(
-        "-m", "--model", type=str, metavar="FILE", help="SyNAP model file location"
+        "-m",
+        "--model",
+        type=str,
+        metavar="PATH",
+        help="SyNAP model file location, or a directory of models to select from based on --target_fps",
     )
     inf_group.add_argument(
         "-s",
@@ -132,6 +407,99 @@ if __name__ == "__main__":
         default=0.5,
         help="Confidence threshold for inferences (default: %(default)s)"
     )
+    inf_group.add_argument(
+        "--adaptive_skip",
+        action="store_true",
+        default=False,
+        help="Adjust the inference skip while running to hold --target_fps, starting from --inference_skip",
+    )
+    inf_group.add_argument(
+        "--target_fps",
+        type=float,
+        metavar="FPS",
+        help="Display frame rate to hold with --adaptive_skip, or to select a model for "
+        f"(default: the source frame rate, or {ADAPTIVE_DEFAULT_FPS} if unknown)",
+    )
+    inf_group.add_argument(
+        "--max_skip",
+        type=int,
+        metavar="N_FRAMES",
+        default=8,
+        help="Largest inference skip used by --adaptive_skip or model selection (default: %(default)s)",
+    )
+    inf_group.add_argument(
+        "--skip_log",
+        type=str,
+        metavar="FILE",
+        help="Append every --adaptive_skip decision to FILE as JSON lines",
+    )
+    inf_group.add_argument(
+        "--tiles",
+        type=validate_tile_grid,
+        metavar="COLSxROWS",
+        help="Split each frame into a grid of overlapping tiles and infer on every tile scaled to the model input, "
+        "for small objects in high resolution inputs (requires --input_dims for RTSP)",
+    )
+    inf_group.add_argument(
+        "--tile_overlap",
+        type=float,
+        metavar="FRACTION",
+        default=0.2,
+        help="Overlap between neighbouring --tiles, as a fraction of the tile size (default: %(default)s)",
+    )
+    inf_group.add_argument(
+        "--roi",
+        type=validate_roi,
+        action="append",
+        metavar="X,Y,WIDTH,HEIGHT",
+        help="Infer only on this region of the input, in input pixels, instead of the whole frame (repeatable)",
+    )
+    inf_group.add_argument(
+        "--motion_gate",
+        action="store_true",
+        default=False,
+        help="Only infer while the scene changes, for fixed cameras watching mostly static scenes",
+    )
+    inf_group.add_argument(
+        "--motion_threshold",
+        type=float,
+        metavar="PERCENT",
+        default=1.0,
+        help="Percentage of changed pixels that counts as motion for --motion_gate (default: %(default)s)",
+    )
+    inf_group.add_argument(
+        "--motion_keepalive",
+        type=float,
+        metavar="SECONDS",
+        default=5.0,
+        help="Infer at least once every SECONDS with --motion_gate, 0 to never infer on a static scene "
+        "(default: %(default)s)",
+    )
+    inf_group.add_argument(
+        "--track",
+        action="store_true",
+        default=False,
+        help="Track detections with persistent IDs and move their boxes on frames between inferences, "
+        "for smooth boxes with a higher --inference_skip (requires NumPy)",
+    )
+    profile_group = parser.add_argument_group("Run profiles")
+    profile_group.add_argument(
+        "--profile",
+        type=str,
+        metavar="NAME",
+        help="Start with the settings saved in profile NAME, other arguments override the saved ones",
+    )
+    profile_group.add_argument(
+        "--save_profile",
+        type=str,
+        metavar="NAME",
+        help="Save the settings of this run, including answers to prompts, as profile NAME",
+    )
     args = parser.parse_args()
+    if args.profile:
+        if (profile := load_run_profile(args.profile)) is None:
+            sys.exit(1)
+        parser.set_defaults(**{k: v for k, v in profile.items() if k in vars(args)})
+        args = parser.parse_args()
 
     main(args)
@@ -49,10 +49,10 @@ FULLSCREEN = False
 def main():
     try:
         inp_w, inp_h = [int(d) for d in args.input_dims.split("x")]
-        inp_src_info = get_inp_src_info(inp_w, inp_h, args.input, None)
+        inp_src_info = get_inp_src_info(inp_w, inp_h, args.input, None, args.revalidate)
         if not inp_src_info:
             sys.exit(1)
-        model = get_inf_model(args.model)
+        model = get_inf_model(args.model, args.revalidate)
         model_inp_dims = get_model_input_dims(model)
         if not model_inp_dims:
             sys.exit(1)
@@ -68,6 +68,8 @@ def main():
             "inf_max": args.num_inferences,
             "inf_thresh": args.confidence_threshold,
             "fullscreen": args.fullscreen,
+            "backend": "auto" if args.stats is not None else "subprocess",
+            "stats": args.stats,
         }
     except KeyboardInterrupt:
         print("\nExiting...")
@@ -76,7 +78,7 @@ def main():
     gen: GstPipelineGenerator = GstPipelineGenerator(gst_params)
 
     gen.make_pipeline()
-    gen.pipeline.run()
+    gen.run()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -130,6 +132,21 @@ if __name__ == "__main__":
         default=FULLSCREEN,
         help="Launch demo in fullscreen",
     )
+    parser.add_argument(
+        "--revalidate",
+        action="store_true",
+        default=False,
+        help="Validate the input source and model even if they passed validation before",
+    )
+    parser.add_argument(
+        "--stats",
+        type=str,
+        nargs="?",
+        const="",
+        metavar="FILE",
+        help="Print frame rate, frame interval, dropped frame and inference rate stats on exit, "
+        "and optionally save them to FILE as JSON",
+    )
     args = parser.parse_args()
     main()
 
@@ -7,6 +7,7 @@ import sys
 from typing import Any
 
 from gst.pipeline import GstPipelineGenerator
+from gst.tuning import DEFAULT_TUNING, TUNING_PROFILES
 from utils.model_info import get_model_input_dims
 from utils.user_input import get_inp_src_info, get_inf_model, validate_inp_dims
 from utils.common import InputType
@@ -23,6 +24,21 @@ RTSP_URL = ""
 # Try using a different codec if the demo fails to run
 VIDEO_CODEC = "h264"
 
+# Queue, display sink and RTSP latency settings: standard, low-latency, balanced or throughput.
+TUNING = DEFAULT_TUNING
+
+# RTSP jitterbuffer latency in milliseconds, None to use the latency of TUNING.
+# Lower values reduce delay but may cause stutter on unreliable networks.
+LATENCY = None
+
+# Transport protocol for the stream: auto, tcp or udp.
+# Try "tcp" if the stream doesn't play over a firewall or NAT.
+TRANSPORT = "auto"
+
+# How many seconds to keep trying to reconnect if the stream drops, 0 to exit instead.
+# Each attempt restarts the whole pipeline, including loading the model.
+RECONNECT = 10
+
 # The path to the inference model to use. Must be a vaild SyNAP model with a ".synap" file extension.
 MODEL = "/usr/share/synap/models/object_detection/coco/model/yolov8s-640x384/model.synap"
 
@@ -47,10 +63,12 @@ FULLSCREEN = False
 def main():
     try:
         inp_w, inp_h = [int(d) for d in args.input_dims.split("x")] if args.input_dims else (None, None)
-        inp_src_info = get_inp_src_info(inp_w, inp_h, args.input, args.input_codec)
+        inp_src_info = get_inp_src_info(
+            inp_w, inp_h, args.input, args.input_codec, args.revalidate, args.transport
+        )
         if not inp_src_info:
             sys.exit(1)
-        model = get_inf_model(args.model)
+        model = get_inf_model(args.model, args.revalidate)
         model_inp_dims = get_model_input_dims(model)
         if not model_inp_dims:
             sys.exit(1)
@@ -68,6 +86,12 @@ def main():
             "inf_max": args.num_inferences,
             "inf_thresh": args.confidence_threshold,
             "fullscreen": args.fullscreen,
+            "backend": "auto" if args.stats is not None else "subprocess",
+            "stats": args.stats,
+            "tuning": args.tuning,
+            "rtsp_latency": args.latency,
+            "rtsp_transport": args.transport,
+            "rtsp_reconnect": args.reconnect,
         }
     except KeyboardInterrupt:
         print("\nExiting...")
@@ -76,7 +100,7 @@ def main():
     gen: GstPipelineGenerator = GstPipelineGenerator(gst_params)
 
     gen.make_pipeline()
-    gen.pipeline.run()
+    gen.run()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -101,6 +125,35 @@ if __name__ == "__main__":
         metavar="CODEC",
         help="RTSP stream input codec (default: %(default)s)",
     )
+    parser.add_argument(
+        "--tuning",
+        type=str,
+        default=TUNING,
+        choices=TUNING_PROFILES,
+        help="Queue, display sink and RTSP latency settings (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--latency",
+        type=int,
+        default=LATENCY,
+        metavar="MS",
+        help="RTSP jitterbuffer latency (default: set by --tuning)",
+    )
+    parser.add_argument(
+        "--transport",
+        type=str,
+        default=TRANSPORT,
+        choices=("auto", "tcp", "udp"),
+        help="RTSP transport protocol (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--reconnect",
+        type=float,
+        default=RECONNECT,
+        metavar="SECONDS",
+        help="How long to keep reconnecting a dropped stream by restarting the pipeline, 0 to exit instead "
+        "(default: %(default)s)",
+    )
     parser.add_argument(
         "-m", "--model",
         type=str,
@@ -137,6 +190,21 @@ if __name__ == "__main__":
         default=FULLSCREEN,
         help="Launch demo in fullscreen",
     )
+    parser.add_argument(
+        "--revalidate",
+        action="store_true",
+        default=False,
+        help="Validate the input source and model even if they passed validation before",
+    )
+    parser.add_argument(
+        "--stats",
+        type=str,
+        nargs="?",
+        const="",
+        metavar="FILE",
+        help="Print frame rate, frame interval, dropped frame and inference rate stats on exit, "
+        "and optionally save them to FILE as JSON",
+    )
     args = parser.parse_args()
     main()
 
@@ -19,9 +19,9 @@ from utils.common import InputType
 VIDEO_FILE = ""
 
 # The codec used to compress the video file.
-# Must be one of: av1, h264, h265
-# Try using a different codec if the demo fails to run
-VIDEO_CODEC = "h264"
+# Must be one of: auto, av1, h264, h265
+# "auto" reads the codec from the file, try setting it explicitly if the demo fails to run
+VIDEO_CODEC = "auto"
 
 # The path to the inference model to use. Must be a vaild SyNAP model with a ".synap" file extension.
 MODEL = "/usr/share/synap/models/object_detection/coco/model/yolov8s-640x384/model.synap"
@@ -46,10 +46,10 @@ FULLSCREEN = False
 
 def main():
     try:
-        inp_src_info = get_inp_src_info(None, None, args.input, args.input_codec)
+        inp_src_info = get_inp_src_info(None, None, args.input, args.input_codec, args.revalidate)
         if not inp_src_info:
             sys.exit(1)
-        model = get_inf_model(args.model)
+        model = get_inf_model(args.model, args.revalidate)
         model_inp_dims = get_model_input_dims(model)
         if not model_inp_dims:
             sys.exit(1)
@@ -65,6 +65,8 @@ def main():
             "inf_max": args.num_inferences,
             "inf_thresh": args.confidence_threshold,
             "fullscreen": args.fullscreen,
+            "backend": "auto" if args.stats is not None else "subprocess",
+            "stats": args.stats,
         }
     except KeyboardInterrupt:
         print("\nExiting...")
@@ -73,7 +75,7 @@ def main():
     gen: GstPipelineGenerator = GstPipelineGenerator(gst_params)
 
     gen.make_pipeline()
-    gen.pipeline.run()
+    gen.run()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -127,6 +129,21 @@ if __name__ == "__main__":
         default=FULLSCREEN,
         help="Launch demo in fullscreen",
     )
+    parser.add_argument(
+        "--revalidate",
+        action="store_true",
+        default=False,
+        help="Validate the input source and model even if they passed validation before",
+    )
+    parser.add_argument(
+        "--stats",
+        type=str,
+        nargs="?",
+        const="",
+        metavar="FILE",
+        help="Print frame rate, frame interval, dropped frame and inference rate stats on exit, "
+        "and optionally save them to FILE as JSON",
+    )
     args = parser.parse_args()
     main()
 
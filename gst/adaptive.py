@@ -0,0 +1,165 @@
+from array import array
+from math import ceil
+from typing import Any, Optional
+import json
+import time
+
+from gst.inprocess import GLib, Gst, GstInProcessRunner, PipelineHook
+from gst.stats import STATS_DISPLAY, STATS_INFER, PadCounter
+
+# how often the display rate is measured and the inference skip adjusted (s)
+ADAPTIVE_WINDOW_S = 2
+
+# display rate below this fraction of the target is too slow, above `ADAPTIVE_RECOVER` there is headroom
+ADAPTIVE_SLOW = 0.9
+ADAPTIVE_RECOVER = 0.97
+
+# consecutive windows with headroom needed before inferring more often, to avoid oscillating
+ADAPTIVE_STABLE_WINDOWS = 3
+
+# display frame rate held when no target is given and the display caps have no frame rate
+ADAPTIVE_DEFAULT_FPS = 30
+
+
+class AdaptiveSkip(PipelineHook):
+    """
+    Adjusts the inference skip (synapinfer `frameinterval`) of a running demo pipeline to hold a target display frame rate.
+
+    Every `ADAPTIVE_WINDOW_S` seconds the display frame rate, display frame drops and inference latency are
+    measured. The skip is increased as soon as the display falls behind `target_fps` or drops frames, and
+    decreased only after several windows with headroom, and only if inference at that skip would keep up with
+    `target_fps` given the measured inference latency. Without a `target_fps`, the frame rate negotiated by the
+    display is held, or `ADAPTIVE_DEFAULT_FPS` if it has none.
+
+    Changes to the skip are printed and kept in `changes`, and every decision is appended to `log_file` as a
+    JSON line if given.
+    """
+
+    def __init__(
+        self,
+        inf_skip: int,
+        target_fps: Optional[float] = None,
+        min_skip: int = 1,
+        max_skip: int = 8,
+        log_file: Optional[str] = None,
+    ) -> None:
+        self._min_skip = max(min_skip, 1)
+        self._max_skip = max(max_skip, self._min_skip)
+        self._requested_fps = target_fps
+        self._target_fps: float = target_fps or ADAPTIVE_DEFAULT_FPS
+        self._log_file = log_file
+        self._infer: Optional["Gst.Element"] = None
+        self._display: Optional[PadCounter] = None
+        self._arrivals: dict[int, float] = {}
+        self._latencies: array = array("d")
+        self._sink_dropped: int = 0
+        self._last_count: int = 0
+        self._last_dropped: int = 0
+        self._last_latency: int = 0
+        self._headroom: int = 0
+        self._tick_id: Optional[int] = None
+        self.skip: int = min(max(inf_skip, self._min_skip), self._max_skip)
+        self.changes: list[dict[str, Any]] = []
+
+    def on_start(self, runner: GstInProcessRunner) -> None:
+        pipeline = runner.pipeline
+        self._infer = pipeline.get_by_name(STATS_INFER)
+        display = pipeline.get_by_name(STATS_DISPLAY) or next(iter(pipeline.iterate_sinks()), None)
+        if not self._infer or not display:
+            print("Adaptive inference skip: inference or display element not found, disabled")
+            return
+        if not self._infer.find_property("frameinterval"):
+            # e.g. the relay of tiled inference, which has no inference interval of its own
+            print("Adaptive inference skip: inference element has no frame interval, disabled")
+            self._infer = None
+            return
+        self._arrivals.clear()
+        self._latencies = array("d")
+        self._sink_dropped = self._last_count = self._last_dropped = self._last_latency = self._headroom = 0
+        PadCounter(self._infer.get_static_pad("sink"), arrivals=self._arrivals)
+        PadCounter(self._infer.get_static_pad("src"), arrivals=self._arrivals, latencies=self._latencies)
+        self._display = PadCounter(display.get_static_pad("sink"))
+        self._infer.set_property("frameinterval", self.skip)
+        self._tick_id = GLib.timeout_add_seconds(ADAPTIVE_WINDOW_S, self._on_window)
+
+    def on_message(self, runner: GstInProcessRunner, msg: "Gst.Message") -> None:
+        if msg.type == Gst.MessageType.QOS and msg.src.get_name().startswith(STATS_DISPLAY):
+            _, _, dropped = msg.parse_qos_stats()
+            self._sink_dropped = max(self._sink_dropped, dropped)
+
+    def on_stop(self, runner: GstInProcessRunner) -> None:
+        if self._tick_id is not None:
+            GLib.source_remove(self._tick_id)
+            self._tick_id = None
+        self._infer = self._display = None
+
+    def _on_window(self) -> bool:
+        count = self._display.count
+        first_window = self._last_count == 0
+        fps = (count - self._last_count) / ADAPTIVE_WINDOW_S
+        dropped = self._sink_dropped - self._last_dropped
+        # only inferred frames reach the src pad, the slowest one bounds how often inference can run
+        latency = max(self._latencies[self._last_latency :], default=None)
+        self._last_count, self._last_dropped, self._last_latency = count, self._sink_dropped, len(self._latencies)
+        if first_window:
+            # the pipeline may still be starting up, but the display caps are known once frames arrived
+            if not self._requested_fps:
+                self._target_fps = self._display_fps() or ADAPTIVE_DEFAULT_FPS
+            return True
+
+        skip = self.skip
+        if fps < self._target_fps * ADAPTIVE_SLOW or dropped:
+            self._headroom = 0
+            skip = min(skip + 1, self._max_skip)
+            reason = f"display behind target ({dropped} dropped)" if dropped else "display behind target"
+        elif fps >= self._target_fps * ADAPTIVE_RECOVER and skip > self._min_skip:
+            self._headroom += 1
+            # inferring every `skip - 1` frames at the target rate must not take longer than the frames themselves
+            sustainable = latency is None or ceil(latency * self._target_fps) <= skip - 1
+            if self._headroom >= ADAPTIVE_STABLE_WINDOWS and sustainable:
+                self._headroom = 0
+                skip -= 1
+                reason = "display at target with headroom"
+            else:
+                reason = "display at target"
+        else:
+            self._headroom = 0
+            reason = "display at target" if skip == self._min_skip else "display close to target"
+        self._log(fps, dropped, latency, skip, reason)
+        return True
+
+    def _display_fps(self) -> Optional[float]:
+        """
+        Gets the frame rate negotiated by the display sink, or None if it is unknown or variable.
+        """
+        caps = self._display.pad.get_current_caps()
+        if not caps or caps.is_empty():
+            return None
+        ok, num, den = caps.get_structure(0).get_fraction("framerate")
+        return num / den if ok and num > 0 and den > 0 else None
+
+    def _log(self, fps: float, dropped: int, latency: Optional[float], skip: int, reason: str) -> None:
+        decision: dict[str, Any] = {
+            "time": round(time.time(), 3),
+            "display_fps": round(fps, 2),
+            "dropped": dropped,
+            "inference_latency_ms": round(latency * 1000, 2) if latency is not None else None,
+            "skip": self.skip,
+            "new_skip": skip,
+            "reason": reason,
+        }
+        if skip != self.skip:
+            self.changes.append(decision)
+            self._infer.set_property("frameinterval", skip)
+            self.skip = skip
+            print(
+                f"Adaptive inference skip: {decision['skip']} -> {skip} ({reason}, {fps:.1f}/{self._target_fps:g} fps, "
+                f"inference {decision['inference_latency_ms'] or '-'} ms)"
+            )
+        if self._log_file:
+            try:
+                with open(self._log_file, "a") as f:
+                    f.write(json.dumps(decision) + "\n")
+            except OSError as e:
+                print(f"\nERROR: Failed to write adaptive skip log: {e}\n")
+                self._log_file = None
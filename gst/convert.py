@@ -0,0 +1,126 @@
+from typing import NamedTuple, Optional
+
+from gst.elements import element_exists, get_pad_formats
+
+# hardware converters that scale and convert colour in one pass, ranked by preference
+HW_CONVERTERS: tuple[str, ...] = ("v4l2convert",)
+
+# format synapinfer expects its input in
+INFER_FORMAT = "RGB"
+
+
+class ConversionPlan(NamedTuple):
+    """Conversion elements for each part of a demo pipeline, and the reasoning behind them"""
+
+    splitter: list[str]  # before the tee
+    infer: list[str]  # inference branch, before the model input caps
+    overlay: list[str]  # display branch, before synapoverlay
+    display: list[str]  # before the display sink
+    notes: list[str]
+
+
+LEGACY_PLAN = ConversionPlan(
+    splitter=["videoconvert"],
+    infer=["videoconvert", "videoscale"],
+    overlay=[],
+    display=["videoconvert"],
+    notes=["converting at every stage"],
+)
+
+
+def _find_hw_converter(in_format: str, out_format: str) -> Optional[str]:
+    """
+    Finds the preferred hardware converter whose pad templates declare both `in_format` input and `out_format` output.
+    """
+    for hw in HW_CONVERTERS:
+        if not element_exists(hw):
+            continue
+        sink_formats, src_formats = get_pad_formats(hw, "SINK"), get_pad_formats(hw, "SRC")
+        if sink_formats and in_format in sink_formats and src_formats and out_format in src_formats:
+            return hw
+    return None
+
+
+def _plan_infer_conversion(
+    src_format: str,
+    src_dims: Optional[tuple[int, int]],
+    inf_dims: tuple[int, int],
+    notes: list[str],
+) -> list[str]:
+    need_scale = src_dims != inf_dims
+    need_csc = src_format != INFER_FORMAT
+    if not need_scale and not need_csc:
+        notes.append(f"inference: source is already {INFER_FORMAT} {inf_dims[0]}x{inf_dims[1]}, no conversion")
+        return []
+    if hw := _find_hw_converter(src_format, INFER_FORMAT):
+        notes.append(f"inference: {src_format} -> {INFER_FORMAT} with hardware converter {hw}")
+        return [hw]
+    if need_scale and need_csc and element_exists("videoconvertscale"):
+        notes.append(f"inference: {src_format} -> {INFER_FORMAT} scaled in a single pass with videoconvertscale")
+        return ["videoconvertscale"]
+    if not need_csc:
+        notes.append("inference: scaling only")
+        return ["videoscale"]
+    if not need_scale:
+        notes.append(f"inference: {src_format} -> {INFER_FORMAT}, no scaling")
+        return ["videoconvert"]
+    # convert colour on whichever frame is smaller
+    if src_dims and src_dims[0] * src_dims[1] < inf_dims[0] * inf_dims[1]:
+        notes.append(f"inference: {src_format} -> {INFER_FORMAT} before upscaling")
+        return ["videoconvert", "videoscale"]
+    notes.append(f"inference: downscaling before {src_format} -> {INFER_FORMAT}")
+    return ["videoscale", "videoconvert"]
+
+
+def plan_conversions(
+    src_format: Optional[str],
+    src_dims: Optional[tuple[int, int]],
+    inf_dims: tuple[int, int],
+    headless: bool = False,
+) -> ConversionPlan:
+    """
+    Plans the conversion elements needed between a source, the inference model and the display.
+
+    Converters are only added where the formats accepted by the next element (as reported by `gst-inspect-1.0`)
+    don't include the format arriving there. If the source format or element capabilities aren't known,
+    converters are kept as in `LEGACY_PLAN`. `src_format` must be certain, e.g. from fixed caps or a decoder that
+    only produces one format, since converters are dropped based on it.
+
+    Args:
+        src_format (str): raw video format produced by the source, e.g. "NV12" from a V4L2 decoder
+        src_dims (tuple[int, int]): source width and height, if known
+        inf_dims (tuple[int, int]): model input width and height
+        headless (bool): whether the display sink is a fakesink that accepts any format
+    """
+    if not src_format:
+        return LEGACY_PLAN._replace(notes=["source format unknown, converting at every stage"])
+    notes: list[str] = []
+    infer = _plan_infer_conversion(src_format, src_dims, inf_dims, notes)
+
+    overlay_formats = get_pad_formats("synapoverlay", "SINK")
+    if overlay_formats is None:
+        overlay = ["videoconvert"]
+        notes.append("overlay: accepted formats unknown, converting")
+    elif src_format in overlay_formats:
+        overlay = []
+        notes.append(f"overlay: draws on {src_format} directly")
+    else:
+        overlay = ["videoconvert"]
+        notes.append(f"overlay: {src_format} not supported, converting")
+
+    if headless:
+        display = []
+        notes.append("display: fakesink accepts any format")
+    elif (sink_formats := get_pad_formats("waylandsink", "SINK")) is None:
+        display = ["videoconvert"]
+        notes.append("display: accepted formats unknown, converting")
+    elif (not overlay and src_format in sink_formats) or (
+        overlay and set(overlay_formats or []) & set(sink_formats)
+    ):
+        display = []
+        notes.append("display: overlay output is accepted by the sink, no conversion")
+    else:
+        display = ["videoconvert"]
+        notes.append("display: overlay output not accepted by the sink, converting")
+
+    return ConversionPlan(splitter=[], infer=infer, overlay=overlay, display=display, notes=notes)
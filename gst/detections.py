@@ -0,0 +1,133 @@
+from typing import Any, NamedTuple, Optional
+import json
+
+# class labels of the default COCO detection models, also drawn by synapoverlay
+DEFAULT_LABEL_FILE = "/usr/share/synap/models/object_detection/coco/info.json"
+
+
+class Detection(NamedTuple):
+    """A detected object, with its bounding box in model input pixels and its track ID if tracked"""
+
+    x: float
+    y: float
+    w: float
+    h: float
+    class_index: int
+    score: float
+    track_id: int = -1
+
+
+def parse_detections(data: bytes | str) -> list[Detection]:
+    """
+    Parses detections from a synapinfer result buffer, which holds a SyNAP detector result as JSON.
+
+    Items without a bounding box are skipped. Returns an empty list if the result can't be parsed.
+    """
+    try:
+        result: Any = json.loads(data)
+    except (ValueError, UnicodeDecodeError):
+        return []
+    items = result.get("items", []) if isinstance(result, dict) else result
+    detections: list[Detection] = []
+    for item in items if isinstance(items, list) else []:
+        try:
+            box = item["bounding_box"]
+            detections.append(
+                Detection(
+                    x=float(box["origin"]["x"]),
+                    y=float(box["origin"]["y"]),
+                    w=float(box["size"]["x"]),
+                    h=float(box["size"]["y"]),
+                    class_index=int(item.get("class_index", -1)),
+                    score=float(item.get("confidence", 0.0)),
+                    track_id=int(item.get("track_id", -1)),
+                )
+            )
+        except (KeyError, TypeError, ValueError):
+            continue
+    return detections
+
+
+def load_labels(label_file: str = DEFAULT_LABEL_FILE) -> Optional[list[str]]:
+    """
+    Loads class labels from a SyNAP model info file, or returns None if unavailable.
+    """
+    try:
+        with open(label_file, "r") as f:
+            labels = json.load(f).get("labels")
+        return [str(label) for label in labels] if isinstance(labels, list) else None
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def get_stream_id(
+    det: Detection,
+    inf_dims: tuple[int, int],
+    layout: list[tuple[int, int, int, int]],
+    frame_dims: tuple[int, int],
+) -> int:
+    """
+    Finds which stream of a combined multi-source frame a detection belongs to, by the centre of its box.
+
+    `layout` holds the (x, y, width, height) of each stream in the `frame_dims` sized frame, see
+    `GstPipelineGenerator.stream_layout`. Returns 0 for single stream pipelines.
+    """
+    if len(layout) < 2:
+        return 0
+    cx = (det.x + det.w / 2) * frame_dims[0] / inf_dims[0]
+    cy = (det.y + det.h / 2) * frame_dims[1] / inf_dims[1]
+    for i, (x, y, w, h) in enumerate(layout):
+        if x <= cx < x + w and y <= cy < y + h:
+            return i
+    return -1
+
+
+def iou(a: Detection, b: Detection) -> float:
+    """
+    Computes the intersection over union of two detection boxes.
+    """
+    iw = min(a.x + a.w, b.x + b.w) - max(a.x, b.x)
+    ih = min(a.y + a.h, b.y + b.h) - max(a.y, b.y)
+    if iw <= 0 or ih <= 0:
+        return 0.0
+    inter = iw * ih
+    return inter / (a.w * a.h + b.w * b.h - inter)
+
+
+def nms(detections: list[Detection], iou_thresh: float = 0.5, max_detections: Optional[int] = None) -> list[Detection]:
+    """
+    Suppresses detections overlapping a higher scoring detection of the same class by more than `iou_thresh`.
+
+    Returns at most `max_detections` of the remaining detections, highest score first.
+    """
+    kept: list[Detection] = []
+    for det in sorted(detections, key=lambda d: d.score, reverse=True):
+        if all(k.class_index != det.class_index or iou(k, det) <= iou_thresh for k in kept):
+            kept.append(det)
+            if max_detections and len(kept) >= max_detections:
+                break
+    return kept
+
+
+def detections_to_json(detections: list[Detection]) -> str:
+    """
+    Formats detections as a SyNAP detector result, as produced by synapinfer and drawn by synapoverlay.
+    """
+    return json.dumps(
+        {
+            "items": [
+                {
+                    "bounding_box": {
+                        "origin": {"x": round(det.x), "y": round(det.y)},
+                        "size": {"x": round(det.w), "y": round(det.h)},
+                    },
+                    "class_index": det.class_index,
+                    "confidence": round(det.score, 4),
+                    "landmarks": {"points": []},
+                    **({"track_id": det.track_id} if det.track_id >= 0 else {}),
+                }
+                for det in detections
+            ],
+            "success": True,
+        }
+    )
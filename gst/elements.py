@@ -0,0 +1,173 @@
+from typing import Optional
+import re
+import subprocess
+
+from utils.cache import JsonCache
+
+# codec -> (parser, decoders ranked by preference)
+# hardware (stateful and stateless V4L2) decoders are preferred over software decoders
+DECODERS: dict[str, tuple[str, tuple[str, ...]]] = {
+    "av1": ("av1parse", ("v4l2av1dec", "v4l2slav1dec", "dav1ddec", "av1dec")),
+    "h264": ("h264parse", ("v4l2h264dec", "v4l2slh264dec", "avdec_h264", "openh264dec")),
+    "h265": ("h265parse", ("v4l2h265dec", "v4l2slh265dec", "avdec_h265", "libde265dec")),
+}
+
+# H.264 encoders ranked by preference, with their settings for live recording
+# the hardware (V4L2) encoder is preferred over software encoders
+ENCODERS: dict[str, list[str]] = {
+    "v4l2h264enc": [],
+    "x264enc": ["tune=zerolatency", "speed-preset=ultrafast"],
+    "openh264enc": ["complexity=low"],
+}
+
+# used if installed elements can't be inspected
+DEFAULT_ENCODER = "x264enc"
+
+# used if installed elements can't be inspected
+DEFAULT_DECODERS: dict[str, str] = {
+    "av1": "v4l2av1dec",
+    "h264": "avdec_h264",
+    "h265": "avdec_h265",
+}
+
+_element_cache = JsonCache("gst_elements", max_entries=4)
+_formats_cache = JsonCache("gst_formats", max_entries=4)
+_gst_version: Optional[str] = None
+_installed: Optional[dict[str, bool]] = None
+_pad_formats: Optional[dict[str, Optional[list[str]]]] = None
+_decoder_overrides: dict[Optional[str], str] = {}
+
+
+def get_gst_version() -> str:
+    """
+    Returns the installed GStreamer version as reported by `gst-inspect-1.0`, or "" if unavailable.
+    """
+    global _gst_version
+    if _gst_version is None:
+        try:
+            out = subprocess.run(
+                ["gst-inspect-1.0", "--version"], check=True, capture_output=True, text=True
+            ).stdout
+            _gst_version = next(
+                (line.split()[-1] for line in out.splitlines() if line.startswith("GStreamer")), ""
+            )
+        except (OSError, subprocess.CalledProcessError):
+            _gst_version = ""
+    return _gst_version
+
+
+def element_exists(element: str) -> Optional[bool]:
+    """
+    Checks if a GStreamer element is installed.
+
+    Results are cached on disk per GStreamer version.
+    Returns None if elements can't be inspected on this system.
+    """
+    global _installed
+    if not (version := get_gst_version()):
+        return None
+    if _installed is None:
+        _installed = _element_cache.get(version) or {}
+    if element not in _installed:
+        try:
+            res = subprocess.run(["gst-inspect-1.0", "--exists", element], capture_output=True)
+            _installed[element] = res.returncode == 0
+        except OSError:
+            return None
+        _element_cache.set(version, _installed)
+    return _installed[element]
+
+
+def find_element(candidates: tuple[str, ...]) -> Optional[str]:
+    """
+    Returns the first installed element out of `candidates`.
+
+    Returns None if none of the candidates are installed or elements can't be inspected.
+    """
+    for element in candidates:
+        if element_exists(element):
+            return element
+    return None
+
+
+def _parse_pad_formats(inspect_out: str, direction: str) -> list[str]:
+    """
+    Extracts raw video formats of the `direction` ("SINK" / "SRC") pad templates from `gst-inspect-1.0` output.
+    """
+    formats: list[str] = []
+    in_template = raw_caps = False
+    for line in inspect_out.splitlines():
+        if "template:" in line:
+            in_template = line.strip().startswith(f"{direction} template")
+            raw_caps = False
+        elif line and not line[0].isspace():
+            in_template = False
+        elif in_template and (media := re.match(r"\s+([a-z]+/[\w.+-]+(\(.*\))?)\s*$", line)):
+            # only system memory caps, other memory types need matching upstream allocators
+            raw_caps = media.group(1) == "video/x-raw"
+        elif in_template and raw_caps and (fmt := re.match(r"\s+format:\s*(.+)$", line)):
+            for name in re.findall(r"[A-Za-z0-9_]+", fmt.group(1).replace("(string)", "")):
+                if name not in formats:
+                    formats.append(name)
+    return formats
+
+
+def get_pad_formats(element: str, direction: str) -> Optional[list[str]]:
+    """
+    Gets the raw video formats an element accepts ("SINK") or produces ("SRC"), in the element's order of preference.
+
+    Results are cached on disk per GStreamer version.
+    Returns None if the element can't be inspected or doesn't declare its formats.
+    """
+    global _pad_formats
+    if not (version := get_gst_version()):
+        return None
+    if _pad_formats is None:
+        _pad_formats = _formats_cache.get(version) or {}
+    key = f"{element}:{direction}"
+    if key not in _pad_formats:
+        try:
+            out = subprocess.run(
+                ["gst-inspect-1.0", element], check=True, capture_output=True, text=True
+            ).stdout
+            _pad_formats[key] = _parse_pad_formats(out, direction) or None
+        except (OSError, subprocess.CalledProcessError):
+            _pad_formats[key] = None
+        _formats_cache.set(version, _pad_formats)
+    return _pad_formats[key]
+
+
+def set_decoder_override(decoder: str, codec: Optional[str] = None) -> None:
+    """
+    Forces a specific decoder element to be used for `codec`, or for any codec if `codec` is None.
+    """
+    if codec is not None and codec not in DECODERS:
+        raise KeyError(codec)
+    _decoder_overrides[codec] = decoder
+
+
+def get_encoder_elem() -> list[str]:
+    """
+    Gets the best installed H.264 encoder element, with its properties.
+    """
+    encoder = find_element(tuple(ENCODERS)) or DEFAULT_ENCODER
+    return [encoder, *ENCODERS[encoder]]
+
+
+def get_codec_elems(codec: str) -> tuple[str, str]:
+    """
+    Gets GStreamer parser and decoder elements for a codec.
+
+    The best installed decoder is chosen unless overridden with `set_decoder_override`.
+
+    Raises:
+        KeyError: if `codec` is not supported
+    """
+    parser, decoders = DECODERS[codec]
+    decoder = (
+        _decoder_overrides.get(codec)
+        or _decoder_overrides.get(None)
+        or find_element(decoders)
+        or DEFAULT_DECODERS[codec]
+    )
+    return parser, decoder
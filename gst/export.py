@@ -0,0 +1,202 @@
+from collections import deque
+from typing import Any, Optional, TextIO
+import json
+import os
+import socket
+import threading
+import time
+
+from gst.detections import get_stream_id, load_labels, parse_detections
+from gst.inprocess import Gst, GstInProcessRunner, PipelineHook
+from gst.stats import STATS_INFER
+
+# prefix of export targets that are Unix-domain sockets rather than files
+EXPORT_SOCKET_PREFIX = "unix:"
+
+# records written together, and the longest a record waits for its batch to fill (s)
+EXPORT_BATCH_SIZE = 32
+EXPORT_FLUSH_S = 0.1
+
+# records held for a slow reader before the oldest are dropped
+EXPORT_MAX_PENDING = 4096
+
+# how long a socket client may block a write before it is disconnected (s)
+EXPORT_CLIENT_TIMEOUT_S = 1.0
+
+
+class _SocketServer:
+    """Sends data to every client connected to a Unix-domain socket"""
+
+    def __init__(self, path: str) -> None:
+        if os.path.exists(path):
+            os.unlink(path)
+        self._path = path
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(path)
+        self._server.listen()
+        self._server.setblocking(False)
+        self._clients: list[socket.socket] = []
+
+    def write(self, data: str) -> None:
+        while True:
+            try:
+                client, _ = self._server.accept()
+            except BlockingIOError:
+                break
+            client.settimeout(EXPORT_CLIENT_TIMEOUT_S)
+            self._clients.append(client)
+        payload = data.encode()
+        for client in list(self._clients):
+            try:
+                client.sendall(payload)
+            except OSError:
+                client.close()
+                self._clients.remove(client)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        for client in self._clients:
+            client.close()
+        self._server.close()
+        os.unlink(self._path)
+
+
+class MetadataExporter(PipelineHook):
+    """
+    Exports the detections of every inferred frame as JSON Lines, to a file or to clients of a Unix-domain socket.
+
+    Detections are read from the synapinfer output in the pipeline and written in batches by a background thread,
+    so slow storage or readers never hold back the pipeline. If more than `max_pending` records are waiting, the
+    oldest are dropped and counted in `dropped`.
+
+    Each record holds the buffer timestamp ("pts_ns"), the wall clock time ("time") and the detections, each with
+    its box in model input pixels, class, label if known, score, the stream it was found in and its track if tracked.
+
+    Args:
+        target (str): JSON Lines file, or "unix:<path>" to serve the records on a Unix-domain socket
+        inf_dims (tuple[int, int]): model input width and height
+        label_file (str): SyNAP model info file with the class labels
+        batch_size (int): records written at once
+        max_pending (int): records held before dropping the oldest
+        source (str): element whose output holds the detections, e.g. the tracking relay to export track IDs
+    """
+
+    def __init__(
+        self,
+        target: str,
+        inf_dims: tuple[int, int],
+        label_file: Optional[str] = None,
+        batch_size: int = EXPORT_BATCH_SIZE,
+        max_pending: int = EXPORT_MAX_PENDING,
+        source: str = STATS_INFER,
+    ) -> None:
+        self._target = target
+        self._source = source
+        self._inf_dims = inf_dims
+        self._labels: Optional[list[str]] = load_labels(label_file) if label_file else None
+        self._batch_size = max(batch_size, 1)
+        self._pending: deque[dict[str, Any]] = deque(maxlen=max_pending)
+        self._wakeup = threading.Event()
+        self._running: bool = False
+        self._writer: Optional[threading.Thread] = None
+        self._output: Optional[TextIO | _SocketServer] = None
+        self._layout: list[tuple[int, int, int, int]] = []
+        self._frame_dims: tuple[int, int] = inf_dims
+        self.exported: int = 0
+        self.dropped: int = 0
+
+    def set_stream_layout(self, layout: list[tuple[int, int, int, int]], frame_dims: tuple[int, int]) -> None:
+        """
+        Sets the position of each stream in a combined multi-source frame, used to tag detections with their stream.
+        """
+        self._layout = layout
+        self._frame_dims = frame_dims
+
+    def _on_buffer(self, pad: "Gst.Pad", info: "Gst.PadProbeInfo") -> "Gst.PadProbeReturn":
+        buffer = info.get_buffer()
+        ok, map_info = buffer.map(Gst.MapFlags.READ)
+        if not ok:
+            return Gst.PadProbeReturn.OK
+        try:
+            detections = parse_detections(bytes(map_info.data))
+        finally:
+            buffer.unmap(map_info)
+        record: dict[str, Any] = {
+            "pts_ns": buffer.pts if buffer.pts != Gst.CLOCK_TIME_NONE else None,
+            "time": round(time.time(), 3),
+            "detections": [
+                {
+                    "stream": get_stream_id(det, self._inf_dims, self._layout, self._frame_dims),
+                    "box": [round(det.x, 1), round(det.y, 1), round(det.w, 1), round(det.h, 1)],
+                    "class": det.class_index,
+                    **(
+                        {"label": self._labels[det.class_index]}
+                        if self._labels and 0 <= det.class_index < len(self._labels)
+                        else {}
+                    ),
+                    "score": round(det.score, 3),
+                    **({"track": det.track_id} if det.track_id >= 0 else {}),
+                }
+                for det in detections
+            ],
+        }
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1
+        self._pending.append(record)
+        if len(self._pending) >= self._batch_size:
+            self._wakeup.set()
+        return Gst.PadProbeReturn.OK
+
+    def _write_pending(self) -> None:
+        lines: list[str] = []
+        while self._pending:
+            lines.append(json.dumps(self._pending.popleft()) + "\n")
+        if lines:
+            self._output.write("".join(lines))
+            self._output.flush()
+            self.exported += len(lines)
+
+    def _write_loop(self) -> None:
+        while self._running:
+            self._wakeup.wait(EXPORT_FLUSH_S)
+            self._wakeup.clear()
+            try:
+                self._write_pending()
+            except OSError as e:
+                print(f"\nERROR: Failed to export detections: {e}\n")
+                self._running = False
+
+    def on_start(self, runner: GstInProcessRunner) -> None:
+        infer = runner.pipeline.get_by_name(self._source)
+        if not infer:
+            print("Detection export: inference element not found, disabled")
+            return
+        try:
+            if self._target.startswith(EXPORT_SOCKET_PREFIX):
+                self._output = _SocketServer(self._target.removeprefix(EXPORT_SOCKET_PREFIX))
+            else:
+                self._output = open(self._target, "a")
+        except OSError as e:
+            print(f"\nERROR: Failed to open detection export {self._target}: {e}\n")
+            return
+        infer.get_static_pad("src").add_probe(Gst.PadProbeType.BUFFER, self._on_buffer)
+        self._running = True
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def on_stop(self, runner: GstInProcessRunner) -> None:
+        if not self._writer:
+            return
+        self._running = False
+        self._wakeup.set()
+        self._writer.join()
+        self._writer = None
+        try:
+            self._write_pending()
+        except OSError:
+            pass
+        self._output.close()
+        self._output = None
+        print(f"Exported detections of {self.exported} frames to {self._target}, dropped {self.dropped}")
@@ -0,0 +1,169 @@
+from array import array
+from typing import Any, Callable, NamedTuple, Optional
+import sys
+import time
+
+from gst.inprocess import Gst, GstInProcessRunner, PipelineHook
+from gst.stats import QueueDropCounter, summarize_intervals
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# named elements of the frame access branch
+FRAMES_QUEUE = "q_frames"
+FRAMES_SINK = "frames"
+
+# bytes per pixel of packed formats that frames can be shaped into height x width (x channels) arrays
+PACKED_FORMATS: dict[str, int] = {
+    "GRAY8": 1,
+    "RGB": 3,
+    "BGR": 3,
+    "RGBA": 4,
+    "BGRA": 4,
+    "RGBx": 4,
+    "BGRx": 4,
+}
+
+
+class FrameInfo(NamedTuple):
+    """Details of a frame passed to a frame callback"""
+
+    pts_ns: Optional[int]
+    width: int
+    height: int
+    format: str
+
+
+FrameCallback = Callable[[Any, FrameInfo], None]
+
+
+def frame_elems(video_format: Optional[str] = None, max_pending: int = 2) -> list[str | list[str]]:
+    """
+    Gets GStreamer elements of a branch from the `t_data` tee that hands frames to a `FrameHook`.
+
+    Frames are converted to `video_format` if given, otherwise passed on in the source format.
+    Once `max_pending` frames are waiting for the callback, the oldest are dropped. With `max_pending` 0 frames
+    are never dropped, and a slow callback slows down the whole pipeline instead.
+    """
+    queue = [
+        "queue",
+        f"name={FRAMES_QUEUE}",
+        f"max-size-buffers={max(max_pending, 1)}",
+        "max-size-bytes=0",
+        "max-size-time=0",
+    ]
+    if max_pending > 0:
+        queue.append("leaky=downstream")
+    return [
+        "t_data.",
+        queue,
+        *(["videoconvert", f"video/x-raw,format={video_format}"] if video_format else []),
+        ["appsink", f"name={FRAMES_SINK}", "emit-signals=true", "sync=false", "max-buffers=1"],
+    ]
+
+
+class FrameHook(PipelineHook):
+    """
+    Calls `callback(frame, info)` for every frame reaching the frame access branch of a pipeline, see `frame_elems`.
+
+    `frame` is a read-only view of the mapped buffer, without copying it: a NumPy array if `as_numpy` is set and
+    NumPy is installed, otherwise a memoryview. Frames in packed formats (`PACKED_FORMATS`) without row padding are
+    shaped as height x width (x channels) arrays.
+
+    WARNING: the buffer is unmapped as soon as the callback returns, so the view must not be used afterwards.
+    Copy the frame (e.g. `frame.copy()` or `bytes(frame)`) to keep it. The memoryview is released after the call,
+    so a kept memoryview raises on access, while a kept NumPy array can't be invalidated and is reported instead.
+
+    The callback runs on the appsink's streaming thread, so a slow callback holds back the frame access branch.
+    Its duration is measured, and a summary of callback latency and the frames dropped by the branch queue is
+    printed when the pipeline stops.
+    """
+
+    def __init__(self, callback: FrameCallback, as_numpy: bool = True) -> None:
+        self._callback = callback
+        self._as_numpy = as_numpy and np is not None
+        self._durations: array = array("d")
+        self._drops: Optional[QueueDropCounter] = None
+        self._errors: int = 0
+        self._kept: bool = False
+        self.frames: int = 0
+
+    def _make_frame(self, view: memoryview, width: int, height: int, fmt: str) -> Any:
+        if not self._as_numpy:
+            return view
+        frame = np.frombuffer(view, dtype=np.uint8)
+        if (bpp := PACKED_FORMATS.get(fmt)) and frame.size == width * height * bpp:
+            frame = frame.reshape((height, width, bpp) if bpp > 1 else (height, width))
+        return frame
+
+    def _on_sample(self, sink: "Gst.Element") -> "Gst.FlowReturn":
+        sample = sink.emit("pull-sample")
+        if sample is None:
+            return Gst.FlowReturn.EOS
+        buffer = sample.get_buffer()
+        caps = sample.get_caps().get_structure(0)
+        info = FrameInfo(
+            pts_ns=buffer.pts if buffer.pts != Gst.CLOCK_TIME_NONE else None,
+            width=caps.get_value("width"),
+            height=caps.get_value("height"),
+            format=caps.get_value("format"),
+        )
+        ok, map_info = buffer.map(Gst.MapFlags.READ)
+        if not ok:
+            return Gst.FlowReturn.OK
+        view = memoryview(map_info.data).toreadonly()
+        frame = self._make_frame(view, info.width, info.height, info.format)
+        try:
+            start = time.monotonic()
+            self._callback(frame, info)
+            self._durations.append(time.monotonic() - start)
+        except Exception as e:
+            # a failing callback shouldn't stop the demo, report it once
+            if not self._errors:
+                print(f"\nERROR: Frame callback failed: {e!r}\n")
+            self._errors += 1
+        finally:
+            # only this function and getrefcount should still refer to the frame
+            if self._as_numpy:
+                # arrays of the frame, e.g. slices, all refer to the flat array of the buffer
+                root = frame.base if isinstance(frame.base, np.ndarray) else frame
+                frame = None
+                kept = sys.getrefcount(root) > 2
+                root = None
+            else:
+                frame = None
+                kept = sys.getrefcount(view) > 2
+            try:
+                view.release()
+            except BufferError:
+                kept = True
+            if kept and not self._kept:
+                # the frame outlived the callback and will read unmapped memory
+                print("\nERROR: Frame callback kept a frame after returning, copy frames to keep them\n")
+            self._kept = self._kept or kept
+            buffer.unmap(map_info)
+            self.frames += 1
+        return Gst.FlowReturn.OK
+
+    def on_start(self, runner: GstInProcessRunner) -> None:
+        self._durations = array("d")
+        self._errors = self.frames = 0
+        self._kept = False
+        sink = runner.pipeline.get_by_name(FRAMES_SINK)
+        queue = runner.pipeline.get_by_name(FRAMES_QUEUE)
+        if not sink or not queue:
+            print("Frame callback: frame access branch not found, disabled")
+            return
+        self._drops = QueueDropCounter(queue)
+        sink.connect("new-sample", self._on_sample)
+
+    def on_stop(self, runner: GstInProcessRunner) -> None:
+        if not self.frames:
+            return
+        latency = summarize_intervals(self._durations)
+        print(
+            f"Frame callback: {self.frames} frames, {self._drops.dropped} dropped, {self._errors} errors, "
+            f"latency avg/p50/p99: {latency.get('avg_ms', '-')}/{latency.get('p50_ms', '-')}/{latency.get('p99_ms', '-')} ms"
+        )
@@ -0,0 +1,157 @@
+from typing import Any, Optional
+import os
+import time
+
+try:
+    import gi
+
+    gi.require_version("Gst", "1.0")
+    from gi.repository import GLib, Gst
+except (ImportError, ValueError):
+    GLib = Gst = None
+
+# whether the GStreamer GObject introspection bindings are installed
+HAVE_GST_BINDINGS: bool = Gst is not None
+
+# how long to wait for EOS to propagate through the pipeline on shutdown
+EOS_TIMEOUT_S = 5
+
+
+class PipelineHook:
+    """
+    Observes or controls a pipeline run by `GstInProcessRunner`.
+
+    Subclasses override the callbacks they need, all of which run on the main loop thread.
+    """
+
+    def on_start(self, runner: "GstInProcessRunner") -> None:
+        """Called after the pipeline is built, before it is set to PLAYING"""
+
+    def on_message(self, runner: "GstInProcessRunner", msg: Any) -> None:
+        """Called for every message posted on the pipeline bus"""
+
+    def on_stop(self, runner: "GstInProcessRunner") -> None:
+        """Called after the pipeline has stopped, before it is released"""
+
+
+class GstInProcessRunner:
+    """Runs a `gst-launch-1.0` style pipeline description in-process through the GStreamer Python bindings"""
+
+    _initialized: bool = False
+
+    def __init__(self, description: str, hooks: Optional[list[PipelineHook]] = None) -> None:
+        if not HAVE_GST_BINDINGS:
+            raise RuntimeError("GStreamer Python bindings are not installed")
+        self._description = description
+        self._hooks: list[PipelineHook] = hooks or []
+        self._pipeline: Optional[Gst.Pipeline] = None
+        self._loop: Optional[GLib.MainLoop] = None
+        self._error: Optional[str] = None
+        self._start_time: float = 0.0
+        self._timeout_id: Optional[int] = None
+        self.interrupted: bool = False
+        self.state_timings: dict[str, float] = {}
+
+    @classmethod
+    def init(cls, env: Optional[dict[str, str]] = None) -> None:
+        """
+        Initializes GStreamer once per process, applying `env` first so that sinks see it.
+        """
+        if cls._initialized:
+            return
+        if env:
+            os.environ.update(env)
+        Gst.init(None)
+        cls._initialized = True
+
+    @property
+    def pipeline(self) -> Optional["Gst.Pipeline"]:
+        """The running pipeline, or None if the runner is not running"""
+        return self._pipeline
+
+    @property
+    def error(self) -> Optional[str]:
+        return self._error
+
+    def stop(self, error: Optional[str] = None) -> None:
+        """
+        Stops the main loop, recording `error` as the reason if given.
+        """
+        if error and not self._error:
+            self._error = error
+        if self._loop:
+            self._loop.quit()
+
+    def _on_message(self, bus: "Gst.Bus", msg: "Gst.Message") -> None:
+        if msg.type == Gst.MessageType.EOS:
+            self.stop()
+        elif msg.type == Gst.MessageType.ERROR:
+            err, debug = msg.parse_error()
+            self.stop(f"{msg.src.get_name()}: {err.message}\n{debug or ''}".strip())
+        elif msg.type == Gst.MessageType.STATE_CHANGED and msg.src == self._pipeline:
+            _, new_state, _ = msg.parse_state_changed()
+            self.state_timings[new_state.value_nick] = time.monotonic() - self._start_time
+        for hook in self._hooks:
+            hook.on_message(self, msg)
+
+    def _send_eos(self) -> None:
+        """
+        Sends EOS and waits for it to reach the sinks, so that e.g. muxers can finalize files.
+        """
+        self._pipeline.send_event(Gst.Event.new_eos())
+        self._pipeline.get_bus().timed_pop_filtered(
+            EOS_TIMEOUT_S * Gst.SECOND, Gst.MessageType.EOS | Gst.MessageType.ERROR
+        )
+
+    def _on_timeout(self) -> bool:
+        self._pipeline.send_event(Gst.Event.new_eos())
+        self._timeout_id = None
+        return False
+
+    def run(self, timeout: Optional[float] = None) -> bool:
+        """
+        Builds the pipeline with `Gst.parse_launch` and runs it until EOS, an error or a KeyboardInterrupt.
+
+        If `timeout` is given, EOS is sent after `timeout` seconds to end the run.
+
+        Returns:
+            bool: True if pipeline executed successfully, False if there was an error.
+        """
+        self._error = None
+        self.interrupted = False
+        self.state_timings.clear()
+        try:
+            self._pipeline = Gst.parse_launch(self._description)
+        except GLib.Error as e:
+            self._error = e.message
+            return False
+        self._loop = GLib.MainLoop()
+        bus = self._pipeline.get_bus()
+        bus.add_signal_watch()
+        bus.connect("message", self._on_message)
+        try:
+            for hook in self._hooks:
+                hook.on_start(self)
+            self._start_time = time.monotonic()
+            if self._pipeline.set_state(Gst.State.PLAYING) == Gst.StateChangeReturn.FAILURE:
+                self._error = self._error or "Failed to set pipeline to PLAYING"
+            else:
+                if timeout:
+                    self._timeout_id = GLib.timeout_add(int(timeout * 1000), self._on_timeout)
+                try:
+                    self._loop.run()
+                except KeyboardInterrupt:
+                    self.interrupted = True
+                    print("\nShutting down pipeline...")
+                    self._send_eos()
+        finally:
+            if self._timeout_id is not None:
+                GLib.source_remove(self._timeout_id)
+                self._timeout_id = None
+            for hook in self._hooks:
+                hook.on_stop(self)
+            bus.remove_signal_watch()
+            self._pipeline.set_state(Gst.State.NULL)
+            self._pipeline = None
+            self._loop = None
+        return self._error is None
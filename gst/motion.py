@@ -0,0 +1,169 @@
+from typing import Any
+import time
+
+from gst.inprocess import Gst, GstInProcessRunner, PipelineHook
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# named elements of the motion detection branch
+MOTION_QUEUE = "q_motion"
+MOTION_SINK = "motion"
+
+# size of the grayscale copy motion is detected on
+MOTION_WIDTH = 160
+MOTION_HEIGHT = 90
+
+# brightness change of a pixel (0-255) that counts as motion, ignoring sensor noise and compression artifacts
+MOTION_PIXEL_DELTA = 25
+
+# how quickly the background follows the scene, as the weight of each new frame
+MOTION_BACKGROUND_RATE = 0.05
+
+# how long inference keeps running after the last motion (s), so objects that briefly stop are still detected
+MOTION_HOLD_S = 1.0
+
+# every nth pixel compared when NumPy isn't available
+MOTION_FALLBACK_STRIDE = 4
+
+# queue feeding inference, also for tiled inference, whose tiles are cropped after it
+MOTION_GATED_QUEUE = "q_infer"
+
+
+def motion_elems() -> list[str | list[str]]:
+    """
+    Gets GStreamer elements of a branch from the `t_data` tee that hands low resolution grayscale frames to a
+    `MotionGate`. Only the newest frame is kept, so motion detection never holds back the pipeline.
+    """
+    return [
+        "t_data.",
+        [
+            "queue",
+            f"name={MOTION_QUEUE}",
+            "leaky=downstream",
+            "max-size-buffers=1",
+            "max-size-bytes=0",
+            "max-size-time=0",
+        ],
+        "videoscale",
+        "videoconvert",
+        f"video/x-raw,width={MOTION_WIDTH},height={MOTION_HEIGHT},format=GRAY8",
+        ["appsink", f"name={MOTION_SINK}", "emit-signals=true", "sync=false", "max-buffers=1", "drop=true"],
+    ]
+
+
+class MotionGate(PipelineHook):
+    """
+    Passes frames to inference only while the scene changes, see `motion_elems`.
+
+    Each frame of the motion branch is compared against a slowly updated background. Once more than `threshold`
+    percent of its pixels differ, the inference queue is opened for at least `MOTION_HOLD_S`. While the scene is
+    static, frames are dropped as they enter the queue, except for one every `keepalive` seconds so that
+    objects that appear without moving are still detected. Every frame is decided on once, as it enters the queue.
+
+    synapoverlay draws the last results it received on every frame, so to the overlay, gated frames look like
+    frames skipped by synapinfer's `frameinterval`, and the boxes of the last inferred frame stay on screen.
+
+    Gate changes are printed, and the frames passed and skipped are reported when the pipeline stops.
+
+    Args:
+        threshold (float): percentage of changed pixels that counts as motion
+        keepalive (float): longest time between inferred frames (s), 0 to never infer on a static scene
+    """
+
+    def __init__(self, threshold: float = 1.0, keepalive: float = 5.0) -> None:
+        self._threshold = threshold / 100
+        self._keepalive = keepalive
+        self._background: Any = None
+        self._open_until: float = 0.0
+        self._last_passed: float = 0.0
+        self.is_open: bool = True
+        self.motion: float = 0.0
+        self.passed: int = 0
+        self.skipped: int = 0
+        self.keepalives: int = 0
+        self.events: int = 0
+
+    def _changed_fraction(self, data: bytes) -> float:
+        """
+        Compares a frame with the background and updates the background.
+        """
+        if np is not None:
+            frame = np.frombuffer(data, dtype=np.uint8).astype(np.float32)
+            if self._background is None or self._background.shape != frame.shape:
+                self._background = frame
+                return 0.0
+            changed = float(np.count_nonzero(np.abs(frame - self._background) > MOTION_PIXEL_DELTA)) / frame.size
+            self._background += (frame - self._background) * MOTION_BACKGROUND_RATE
+            return changed
+        frame = data[::MOTION_FALLBACK_STRIDE]
+        if self._background is None or len(self._background) != len(frame):
+            self._background = frame
+            return 0.0
+        changed = sum(abs(a - b) > MOTION_PIXEL_DELTA for a, b in zip(frame, self._background)) / max(len(frame), 1)
+        # without NumPy the previous frame is the background
+        self._background = frame
+        return changed
+
+    def _on_sample(self, sink: "Gst.Element") -> "Gst.FlowReturn":
+        sample = sink.emit("pull-sample")
+        if sample is None:
+            return Gst.FlowReturn.EOS
+        buffer = sample.get_buffer()
+        ok, map_info = buffer.map(Gst.MapFlags.READ)
+        if not ok:
+            return Gst.FlowReturn.OK
+        try:
+            self.motion = self._changed_fraction(bytes(map_info.data))
+        finally:
+            buffer.unmap(map_info)
+        now = time.monotonic()
+        if self.motion > self._threshold:
+            self._open_until = now + MOTION_HOLD_S
+        is_open = now < self._open_until
+        if is_open != self.is_open:
+            self.is_open = is_open
+            if is_open:
+                self.events += 1
+            print(f"Motion gate: {'open' if is_open else 'closed'} ({self.motion * 100:.1f}% changed)")
+        return Gst.FlowReturn.OK
+
+    def _on_infer_buffer(self, pad: "Gst.Pad", info: "Gst.PadProbeInfo") -> "Gst.PadProbeReturn":
+        now = time.monotonic()
+        if self.is_open or (self._keepalive and now - self._last_passed >= self._keepalive):
+            if not self.is_open:
+                self.keepalives += 1
+            self._last_passed = now
+            self.passed += 1
+            return Gst.PadProbeReturn.OK
+        self.skipped += 1
+        return Gst.PadProbeReturn.DROP
+
+    def on_start(self, runner: GstInProcessRunner) -> None:
+        self._background = None
+        # infer on the first frames until the background is known
+        self._open_until = time.monotonic() + MOTION_HOLD_S
+        self._last_passed = 0.0
+        self.is_open = True
+        self.motion = 0.0
+        self.passed = self.skipped = self.keepalives = self.events = 0
+        sink = runner.pipeline.get_by_name(MOTION_SINK)
+        queue = runner.pipeline.get_by_name(MOTION_GATED_QUEUE)
+        if not sink or not queue:
+            print("Motion gate: motion or inference branch not found, disabled")
+            return
+        if np is None:
+            print("Motion gate: NumPy not found, comparing a subset of pixels to the previous frame")
+        queue.get_static_pad("sink").add_probe(Gst.PadProbeType.BUFFER, self._on_infer_buffer)
+        sink.connect("new-sample", self._on_sample)
+
+    def on_stop(self, runner: GstInProcessRunner) -> None:
+        total = self.passed + self.skipped
+        if not total:
+            return
+        print(
+            f"Motion gate: {self.passed} of {total} frames passed to inference ({self.skipped / total:.0%} skipped), "
+            f"{self.events} motion events, {self.keepalives} keepalive frames"
+        )
@@ -1,8 +1,35 @@
+from importlib.util import find_spec
+from math import ceil, sqrt
 from os import environ
-from typing import Any
+from typing import Any, Optional
+import re
+import signal
 import subprocess
 
-from utils.common import InputType, CAM_DEFAULT_WIDTH, CAM_DEFAULT_HEIGHT
+from gst.adaptive import AdaptiveSkip
+from gst.convert import INFER_FORMAT, LEGACY_PLAN, ConversionPlan, plan_conversions
+from gst.detections import DEFAULT_LABEL_FILE
+from gst.elements import get_codec_elems, get_pad_formats
+from gst.export import MetadataExporter
+from gst.frames import FrameHook, frame_elems
+from gst.inprocess import EOS_TIMEOUT_S, HAVE_GST_BINDINGS, GstInProcessRunner, PipelineHook
+from gst.motion import MotionGate, motion_elems
+from gst.record import record_elems
+from gst.rtsp import RtspReconnector, rtsp_src_elems
+from gst.stats import STATS_INFER, PipelineStats
+from gst.streams import STREAM_INFER, StreamScheduler, stream_infer_elems
+from gst.supervisor import PipelineSupervisor
+from gst.tiling import (
+    TILE_DEFAULT_OVERLAP,
+    TILE_INFER,
+    TILE_MAX_COUNT,
+    TiledInference,
+    make_tiles,
+    tiled_infer_elems,
+)
+from gst.tracker import TRACK_RELAY, TrackingRelay
+from gst.tuning import DEFAULT_TUNING, TUNING_PROFILES, TuningProfile, paced_queue
+from utils.common import InputType, CAM_FORMAT, CAM_DEFAULT_WIDTH, CAM_DEFAULT_HEIGHT
 
 
 def get_env() -> dict[str, str]:
@@ -18,12 +45,35 @@ def get_env() -> dict[str, str]:
     return env
 
 
+def is_pad_ref(elem: str | list[str]) -> bool:
+    """
+    Checks if a pipeline element is a reference to a named element or pad, e.g. "t_data." or "comp.sink_0".
+    """
+    return isinstance(elem, str) and re.fullmatch(r"[A-Za-z_][\w-]*\.[\w%-]*", elem) is not None
+
+
+# size and frame rate of the combined frame for multiple input sources
+MOSAIC_DEFAULT_WIDTH = 1280
+MOSAIC_DEFAULT_HEIGHT = 720
+MOSAIC_DEFAULT_FPS = 30
+
+# ways of running a pipeline, "auto" runs in-process if the GStreamer Python bindings are installed
+BACKENDS: tuple[str, ...] = ("subprocess", "inprocess", "auto")
+
+
 class GstPipeline:
     """Abstraction of a GStreamer pipeline"""
 
-    def __init__(self) -> None:
+    def __init__(self, backend: str = "subprocess") -> None:
+        if backend not in BACKENDS:
+            raise ValueError(f'Invalid pipeline backend "{backend}"')
         self._elems: list[str, list[str]] = []
         self._pipeline: list[str] = []
+        self._backend: str = backend
+        self._hooks: list[PipelineHook] = []
+        self._state_timings: dict[str, float] = {}
+        self._interrupted: bool = False
+        self._error: Optional[str] = None
 
     def __repr__(self) -> str:
         """
@@ -41,20 +91,53 @@ class GstPipeline:
     def _format_pipeline(self) -> None:
         """
         Updates pipeline by adding link operators between elements.
+
+        Pad references split the pipeline into chains: a bare element reference such as "t_data." starts a
+        new chain from that element, and a pad reference such as "overlay.inference_sink" ends the current
+        chain, so the next element starts a new one. A sink element such as "appsink" ends its chain as well.
         """
         self._pipeline.clear()
-        self._pipeline.extend(self._elems[0])
-        for elem in self._elems[1:]:
-            if isinstance(elem, list):
-                self._pipeline.extend(["!", *elem])
+        chain_open = False
+        for elem in self._elems:
+            elem_args = elem if isinstance(elem, list) else [elem]
+            if not chain_open or is_pad_ref(elem) and elem.endswith("."):
+                self._pipeline.extend(elem_args)
+                chain_open = True
             else:
-                if elem != "t_data.":
-                    self._pipeline.append("!")
-                self._pipeline.append(elem)
+                self._pipeline.extend(["!", *elem_args])
+                chain_open = not is_pad_ref(elem) and not elem_args[0].endswith("sink")
+
+    @property
+    def backend(self) -> str:
+        """The backend the pipeline will run with, with "auto" resolved"""
+        if self._backend == "auto":
+            return "inprocess" if HAVE_GST_BINDINGS else "subprocess"
+        return self._backend
+
+    @property
+    def interrupted(self) -> bool:
+        """Whether the last run was stopped by a KeyboardInterrupt"""
+        return self._interrupted
+
+    @property
+    def error(self) -> Optional[str]:
+        """Error message of the last run, or None if it succeeded"""
+        return self._error
+
+    @property
+    def state_timings(self) -> dict[str, float]:
+        """Seconds from start until the pipeline reached each state in its last in-process run"""
+        return self._state_timings
 
     def add_elements(self, *elements: str | list[str]) -> None:
         self._elems.extend(elements)
 
+    def add_hook(self, hook: PipelineHook) -> None:
+        """
+        Attaches a hook to the pipeline, only used by the in-process backend.
+        """
+        self._hooks.append(hook)
+
     def reset(self) -> None:
         self._elems.clear()
         self._pipeline.clear()
@@ -63,48 +146,102 @@ class GstPipeline:
         self,
         run_prompt: str = "Running pipeline...",
         print_err: bool = True,
+        timeout: Optional[float] = None,
     ) -> bool:
         """
-        Attempts to run current pipeline with `gst-launch-1.0` through a subprocess.
+        Attempts to run current pipeline.
 
-        An erroneous pipeline will cause the subprocess to terminate with an exit message.
-
-        Pipeline can be shutdown with a SIGINT (KeyboardInterrupt) in which case a graceful exit is attempted.
-        The pipeline is forcefully shut down if the exit fails.
+        The pipeline runs in-process if the in-process backend is selected and the GStreamer Python bindings
+        are installed, otherwise with `gst-launch-1.0` through a subprocess.
+        If `timeout` is given, the pipeline is stopped after `timeout` seconds.
 
         Returns:
             bool: True if pipeline executed successfully, False if there was an error.
         """
         self._format_pipeline()
+        self._interrupted = False
+        self._error = None
+        if self._backend == "inprocess" and not HAVE_GST_BINDINGS:
+            print("GStreamer Python bindings not found, running pipeline with gst-launch-1.0")
+            self._backend = "subprocess"
+        if self.backend == "inprocess":
+            return self._run_inprocess(run_prompt, print_err, timeout)
+        if self._hooks:
+            print("Pipeline measurements and controls require the in-process backend, ignoring")
+        return self._run_subprocess(run_prompt, print_err, timeout)
+
+    def _run_inprocess(self, run_prompt: str, print_err: bool, timeout: Optional[float]) -> bool:
+        """
+        Runs current pipeline in-process with `Gst.parse_launch`, watching the pipeline bus for errors and EOS.
+
+        Pipeline can be shutdown with a SIGINT (KeyboardInterrupt), in which case EOS is sent so that
+        elements can finish cleanly before the pipeline is stopped.
+        """
+        GstInProcessRunner.init(get_env())
+        runner = GstInProcessRunner(" ".join(self._pipeline), self._hooks)
+        if run_prompt:
+            print(run_prompt)
+        ok = runner.run(timeout)
+        self._state_timings = dict(runner.state_timings)
+        self._interrupted = runner.interrupted
+        self._error = runner.error
+        if run_prompt and "playing" in self._state_timings:
+            print(f"Pipeline started in {self._state_timings['playing'] * 1000:.0f} ms")
+        if not ok and print_err:
+            print(f"Pipeline failed with error: {runner.error}")
+        return ok
+
+    def _run_subprocess(self, run_prompt: str, print_err: bool, timeout: Optional[float]) -> bool:
+        """
+        Runs current pipeline with `gst-launch-1.0` through a subprocess.
+
+        An erroneous pipeline will cause the subprocess to terminate with an exit message.
+
+        Pipeline can be shutdown with a SIGINT (KeyboardInterrupt) in which case a graceful exit is attempted:
+        `gst-launch-1.0` runs with `-e`, so it sends EOS on SIGINT and e.g. recordings are finalized.
+        The pipeline is terminated if it hasn't exited after `EOS_TIMEOUT_S`, and forcefully killed if that fails.
+        """
         process = None
         try:
             if run_prompt:
                 print(run_prompt)
             process = subprocess.Popen(
-                ["gst-launch-1.0", *self._pipeline],
+                ["gst-launch-1.0", "-e", *self._pipeline],
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 env=get_env(),
             )
-            stdout, stderr = process.communicate()
+            try:
+                stdout, stderr = process.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                # gst-launch-1.0 stops the pipeline cleanly on SIGINT
+                process.send_signal(signal.SIGINT)
+                stdout, stderr = process.communicate()
+                return True
             if process.returncode != 0:
                 raise subprocess.CalledProcessError(
                     process.returncode, process.args, output=stdout, stderr=stderr
                 )
         except subprocess.CalledProcessError as e:
+            self._error = e.stderr.decode().strip()
             if print_err:
                 print(f"Pipeline failed with error: {e.stderr.decode()}")
             return False
         except KeyboardInterrupt:
+            self._interrupted = True
             print("\nShutting down pipeline...")
             if process:
-                process.terminate()
                 try:
-                    process.wait(timeout=5)
+                    # the SIGINT also reached gst-launch-1.0, give EOS time to reach the sinks
+                    process.communicate(timeout=EOS_TIMEOUT_S)
                 except subprocess.TimeoutExpired:
-                    print("Shutdown failed, forcefully killing pipeline...")
-                    process.kill()
-                    process.wait()
+                    process.terminate()
+                    try:
+                        process.wait(timeout=5)
+                    except subprocess.TimeoutExpired:
+                        print("Shutdown failed, forcefully killing pipeline...")
+                        process.kill()
+                        process.wait()
         return True
 
 
@@ -121,110 +258,479 @@ class GstPipelineGenerator:
         self._inp_src: str = gst_params["inp_src"]
         self._inp_codec: str = gst_params.get("inp_codec", None)
         self._codec_elems: tuple[str, str] = gst_params.get("codec_elems", None)
+        if not self._codec_elems and self._inp_codec and self._inp_type != InputType.CAMERA:
+            self._codec_elems = get_codec_elems(self._inp_codec)
         self._inf_model: str = gst_params["inf_model"]
         self._inf_w: int = gst_params["inf_w"]
         self._inf_h: int = gst_params["inf_h"]
         self._inf_skip: int = gst_params["inf_skip"]
         self._inf_max: int = gst_params["inf_max"]
         self._inf_thresh: float = gst_params["inf_thresh"]
+        # class labels of the model drawn by the overlay, the COCO labels unless the model comes with its own
+        self._label_file: str = gst_params.get("label_file") or DEFAULT_LABEL_FILE
         self._fullscreen: bool = gst_params["fullscreen"]
-        self._pipeline: GstPipeline = GstPipeline()
+        self._headless: bool = gst_params.get("headless", False)
+        self._scale_input: bool = gst_params.get("scale_input", False)
+        self._sources: list[dict[str, Any]] = gst_params.get("sources") or []
+        self._split_output: bool = gst_params.get("split_output", False)
+        self._mosaic_w: int = gst_params.get("mosaic_w", MOSAIC_DEFAULT_WIDTH)
+        self._mosaic_h: int = gst_params.get("mosaic_h", MOSAIC_DEFAULT_HEIGHT)
+        self._mosaic_fps: int = gst_params.get("mosaic_fps", MOSAIC_DEFAULT_FPS)
+        self._stream_layout: list[tuple[int, int, int, int]] = []
+        self._rtsp_latency: Optional[int] = gst_params.get("rtsp_latency")
+        self._rtsp_transport: str = gst_params.get("rtsp_transport", "auto")
+        self._rtsp_reconnect: float = gst_params.get("rtsp_reconnect", 0)
+        self._record: Optional[str] = gst_params.get("record")
+        self._record_segment_s: Optional[float] = gst_params.get("record_segment_s")
+        self._record_segment_mb: Optional[float] = gst_params.get("record_segment_mb")
+        self._frame_hook: Optional[FrameHook] = None
+        self._frame_format: Optional[str] = gst_params.get("frame_format")
+        self._frame_queue: int = gst_params.get("frame_queue", 2)
+        self._src_dims: Optional[tuple[int, int]] = None
+        self._rois: list[tuple[int, int, int, int]] = gst_params.get("rois") or []
+        self._tile_grid: Optional[tuple[int, int]] = gst_params.get("tiles")
+        self._tile_overlap: float = gst_params.get("tile_overlap", TILE_DEFAULT_OVERLAP)
+        self._supervise: bool = gst_params.get("supervise", False)
+        self._stall_timeout: float = gst_params.get("stall_timeout", 10)
+        self._heartbeat_file: Optional[str] = gst_params.get("heartbeat_file")
+        self._max_restarts: Optional[int] = gst_params.get("max_restarts")
+        self._supervisor: Optional[PipelineSupervisor] = None
+        self._pipeline: GstPipeline = GstPipeline(gst_params.get("backend", "subprocess"))
+        # streams of multiple sources are inferred one after another, which needs the in-process backend
+        self._stream_sched: bool = (
+            len(self._sources) > 1
+            and not (self._tile_grid or self._rois)
+            and self._pipeline.backend == "inprocess"
+            and HAVE_GST_BINDINGS
+        )
+        self._scheduler: Optional[StreamScheduler] = None
+        if self._stream_sched:
+            self._scheduler = StreamScheduler([], (0, 0), (self._inf_w, self._inf_h), self._inf_skip)
+            self._pipeline.add_hook(self._scheduler)
+        self._tiler: Optional[TiledInference] = None
+        if self._tile_grid or self._rois:
+            if not HAVE_GST_BINDINGS:
+                raise SystemExit("Fatal: tiled inference requires the GStreamer Python bindings (python3-gi)")
+            self._tiler = TiledInference([], (0, 0), (self._inf_w, self._inf_h), self._inf_skip, self._inf_max)
+            self._pipeline.add_hook(self._tiler)
+        self._stats: Optional[PipelineStats] = None
+        if gst_params.get("stats") is not None:
+            self._stats = PipelineStats(
+                self._inf_skip, gst_params["stats"] or None, gst_params.get("stats_verbose", True)
+            )
+            self._pipeline.add_hook(self._stats)
+        self._tracking: bool = gst_params.get("tracking", False)
+        if self._tracking:
+            if not HAVE_GST_BINDINGS or find_spec("numpy") is None:
+                raise SystemExit("Fatal: tracking requires NumPy and the GStreamer Python bindings (python3-gi)")
+            self._pipeline.add_hook(TrackingRelay())
+        self._exporter: Optional[MetadataExporter] = None
+        if gst_params.get("export"):
+            self._exporter = MetadataExporter(
+                gst_params["export"],
+                (self._inf_w, self._inf_h),
+                self._label_file,
+                # tracked boxes carry their track IDs
+                source=TRACK_RELAY if self._tracking else STATS_INFER,
+            )
+            self._pipeline.add_hook(self._exporter)
+        if gst_params.get("frame_callback"):
+            self._frame_hook = FrameHook(gst_params["frame_callback"], gst_params.get("frame_numpy", True))
+            self._pipeline.add_hook(self._frame_hook)
+        self._motion_gate: Optional[MotionGate] = None
+        if gst_params.get("motion_gate"):
+            self._motion_gate = MotionGate(
+                gst_params.get("motion_threshold", 1.0), gst_params.get("motion_keepalive", 5.0)
+            )
+            self._pipeline.add_hook(self._motion_gate)
+        if gst_params.get("adaptive_skip"):
+            self._pipeline.add_hook(
+                AdaptiveSkip(
+                    self._inf_skip,
+                    gst_params.get("target_fps"),
+                    max_skip=gst_params.get("max_skip", 8),
+                    log_file=gst_params.get("skip_log"),
+                )
+            )
 
-        # GStreamer elements
+        self._convert_mode: str = gst_params.get("convert", "auto")
+        self._tuning: TuningProfile = TUNING_PROFILES[gst_params.get("tuning") or DEFAULT_TUNING]
+        # live sources can't be slowed down, so stale frames are dropped instead of blocking them
+        self._live: bool = any(
+            src["inp_type"] != InputType.FILE for src in self._sources or [gst_params]
+        )
+        self._conversion_plan: ConversionPlan = LEGACY_PLAN
+        self._build_elems()
+
+    def _build_elems(self) -> None:
+        """
+        Builds the GStreamer elements shared by all input types, using the current conversion plan.
+        """
+        plan = self._conversion_plan
+        tuning = self._tuning
+        # file inputs are paced by the pipeline, their queues are sized by the profile but never leaky
+        infer_queue = tuning.infer_queue if self._live else paced_queue(tuning.infer_queue)
+        display_queue = tuning.display_queue if self._live else paced_queue(tuning.display_queue)
         self._splitter_elems: list[str, list[str]] = [
-            "videoconvert",
+            *plan.splitter,
             ["tee", "name=t_data"],
         ]
         self._infer_elems: list[str, list[str]] = [
             "t_data.",
-            "queue",
-            "videoconvert",
-            "videoscale",
-            f"video/x-raw,width={self._inf_w},height={self._inf_h},format=RGB",
-            [
-                "synapinfer",
-                "mode=detector",
-                f"model={self._inf_model}",
-                f"threshold={self._inf_thresh}",
-                f"numinference={self._inf_max}",
-                f"frameinterval={self._inf_skip}",
-                "name=infer",
-            ],
+            ["queue", "name=q_infer", *infer_queue],
+            *plan.infer,
+            f"video/x-raw,width={self._inf_w},height={self._inf_h},format={INFER_FORMAT}",
+            self._synapinfer_elem(STATS_INFER),
             "overlay.inference_sink",
         ]
+        if self._tiler and self._src_dims:
+            self._infer_elems = self._tiled_infer_elems(infer_queue)
+        elif self._scheduler and self._stream_layout:
+            self._scheduler.layout, self._scheduler.frame_dims = self._stream_layout, self._src_dims
+            self._infer_elems = stream_infer_elems(
+                self._stream_layout,
+                self._src_dims,
+                f"video/x-raw,width={self._inf_w},height={self._inf_h},format={INFER_FORMAT}",
+                self._synapinfer_elem(STREAM_INFER, frameinterval=1),
+                infer_queue,
+            )
+        if self._tracking:
+            # inference results end here, the overlay draws the boxes predicted for each frame instead
+            self._infer_elems[-1:] = [
+                ["fakesink", "sync=false", "async=false"],
+                ["appsrc", f"name={TRACK_RELAY}", "format=time", "is-live=true", "do-timestamp=false"],
+                "overlay.inference_sink",
+            ]
         self._overlay_elems: list[str, list[str]] = [
             "t_data.",
-            "queue",
+            ["queue", "name=q_overlay", *display_queue],
+            *plan.overlay,
             [
                 "synapoverlay",
                 "name=overlay",
-                "label=/usr/share/synap/models/object_detection/coco/info.json",
+                f"label={self._label_file}",
             ],
         ]
         self._display_elems: list[str, list[str]] = [
-            "videoconvert",
-            ["waylandsink", f"fullscreen={str(self._fullscreen).lower()}"],
+            *plan.display,
+            ["waylandsink", "name=display", f"fullscreen={str(self._fullscreen).lower()}", *tuning.sink],
+        ]
+        if self._headless:
+            # measure pipeline throughput without display or clock synchronization
+            self._display_elems = [["fakesink", "name=display", "sync=false"]]
+        # recording branches off after the overlay, so annotated frames are encoded without decoding twice
+        self._record_elems: list[str, list[str]] = []
+        if self._record:
+            # every tee branch needs its own queue, otherwise the display can't preroll without the recording
+            self._overlay_elems.extend([["tee", "name=t_rec"], "queue"])
+            self._record_elems = record_elems(self._record, self._record_segment_s, self._record_segment_mb)
+        self._frame_elems: list[str, list[str]] = []
+        if self._frame_hook:
+            self._frame_elems = frame_elems(self._frame_format, self._frame_queue)
+        self._motion_elems: list[str, list[str]] = motion_elems() if self._motion_gate else []
+        self._scale_elems: list[str, list[str]] = []
+        if self._scale_input and self._inp_w and self._inp_h:
+            self._scale_elems = ["videoscale", f"video/x-raw,width={self._inp_w},height={self._inp_h}"]
+
+    def _synapinfer_elem(self, name: str, frameinterval: Optional[int] = None) -> list[str]:
+        return [
+            "synapinfer",
+            "mode=detector",
+            f"model={self._inf_model}",
+            f"threshold={self._inf_thresh}",
+            f"numinference={self._inf_max}",
+            f"frameinterval={frameinterval or self._inf_skip}",
+            f"name={name}",
         ]
 
+    def _tiled_infer_elems(self, queue: list[str]) -> list[str, list[str]]:
+        """
+        Builds an inference branch that runs the model on each tile (or region of interest) of the source frame.
+        """
+        src_w, src_h = self._src_dims
+        if self._rois:
+            tiles = self._rois
+            if len(tiles) > TILE_MAX_COUNT:
+                raise SystemExit(f"Fatal: {len(tiles)} regions of interest exceed the limit of {TILE_MAX_COUNT}")
+            for x, y, w, h in tiles:
+                if x + w > src_w or y + h > src_h:
+                    raise SystemExit(f"Fatal: region of interest {x},{y},{w},{h} is outside the {src_w}x{src_h} input")
+        else:
+            try:
+                tiles = make_tiles(self._src_dims, self._tile_grid, self._tile_overlap)
+            except ValueError as e:
+                raise SystemExit(f"Fatal: {e}")
+        self._tiler.tiles, self._tiler.frame_dims = tiles, self._src_dims
+        return tiled_infer_elems(
+            tiles,
+            self._src_dims,
+            f"video/x-raw,width={self._inf_w},height={self._inf_h},format={INFER_FORMAT}",
+            self._synapinfer_elem(TILE_INFER, frameinterval=1),
+            queue,
+        )
+
     @property
     def pipeline(self) -> GstPipeline:
         return self._pipeline
 
-    def make_file_pipeline(self, video_file: str, codec_elems: tuple[str, str]) -> None:
-        self._pipeline.reset()
+    @property
+    def conversion_plan(self) -> ConversionPlan:
+        """Conversions used by the last generated pipeline"""
+        return self._conversion_plan
+
+    def _plan_conversions(self, src_format: Optional[str], src_dims: Optional[tuple[int, int]]) -> None:
+        """
+        Replans conversion elements for a source, unless conversions are fixed with the "convert" parameter.
+        """
+        self._src_dims = src_dims
+        if self._tiler and not src_dims:
+            raise SystemExit("Fatal: tiled inference needs the input size, set it with --input_dims")
+        if self._convert_mode == "legacy":
+            self._conversion_plan = LEGACY_PLAN
+        else:
+            self._conversion_plan = plan_conversions(
+                src_format, src_dims, (self._inf_w, self._inf_h), self._headless
+            )
+        self._build_elems()
+
+    def _decoder_format(self, codec_elems: Optional[tuple[str, str]]) -> Optional[str]:
+        """
+        Gets the format a decoder outputs, if certain: decoders offering several formats (or any) may negotiate
+        a different one than their first, so no format is assumed for them.
+        """
+        if not codec_elems or not (formats := get_pad_formats(codec_elems[-1], "SRC")) or len(formats) != 1:
+            return None
+        return formats[0]
+
+    @property
+    def stats(self) -> Optional[PipelineStats]:
+        """Measurements of the last run, if enabled with the "stats" parameter"""
+        return self._stats
+
+    def _file_src_elems(
+        self, video_file: str, codec_elems: tuple[str, str], demux_name: str = "demux"
+    ) -> list[str | list[str]]:
         if not codec_elems:
             raise SystemExit(
                 "Fatal: codec information not provided to pipeline generator"
             )
-        self._pipeline.add_elements(
+        return [
             ["filesrc", f'location="{video_file}"'],
-            ["qtdemux", "name=demux", "demux.video_0"],
+            ["qtdemux", f"name={demux_name}", f"{demux_name}.video_0"],
             "queue",
             *codec_elems,
+        ]
+
+    def _cam_src_elems(
+        self, cam_device: str, inp_w: Optional[int] = None, inp_h: Optional[int] = None
+    ) -> list[str | list[str]]:
+        return [
+            ["v4l2src", f"device={cam_device}"],
+            f"video/x-raw,framerate=30/1,format={CAM_FORMAT},width={inp_w or CAM_DEFAULT_WIDTH},height={inp_h or CAM_DEFAULT_HEIGHT}",
+        ]
+
+    def _rtsp_src_elems(
+        self,
+        rtsp_url: str,
+        inp_codec: str,
+        codec_elems: tuple[str, str],
+        inp_w: Optional[int] = None,
+        inp_h: Optional[int] = None,
+    ) -> list[str | list[str]]:
+        if not inp_codec or not codec_elems:
+            raise SystemExit(
+                "Fatal: codec information not provided to pipeline generator"
+            )
+        return rtsp_src_elems(
+            rtsp_url,
+            inp_codec,
+            codec_elems,
+            inp_w,
+            inp_h,
+            self._rtsp_latency if self._rtsp_latency is not None else self._tuning.rtsp_latency,
+            self._rtsp_transport,
+        )
+
+    def make_file_pipeline(self, video_file: str, codec_elems: tuple[str, str]) -> None:
+        self._pipeline.reset()
+        src_dims = (self._inp_w, self._inp_h) if self._inp_w and self._inp_h else None
+        self._plan_conversions(self._decoder_format(codec_elems), src_dims)
+        self._pipeline.add_elements(
+            *self._file_src_elems(video_file, codec_elems),
+            *self._scale_elems,
             *self._splitter_elems,
             *self._infer_elems,
             *self._overlay_elems,
             *self._display_elems,
+            *self._record_elems,
+            *self._frame_elems,
+            *self._motion_elems,
         )
 
     def make_cam_pipeline(self, cam_device: str) -> None:
         self._pipeline.reset()
+        self._plan_conversions(
+            CAM_FORMAT, (self._inp_w or CAM_DEFAULT_WIDTH, self._inp_h or CAM_DEFAULT_HEIGHT)
+        )
         self._pipeline.add_elements(
-            ["v4l2src", f"device={cam_device}"],
-            f"video/x-raw,framerate=30/1,format=YUY2,width={self._inp_w or CAM_DEFAULT_WIDTH},height={self._inp_h or CAM_DEFAULT_HEIGHT}",
+            *self._cam_src_elems(cam_device, self._inp_w, self._inp_h),
             *self._splitter_elems,
             *self._infer_elems,
             *self._overlay_elems,
             *self._display_elems,
+            *self._record_elems,
+            *self._frame_elems,
+            *self._motion_elems,
         )
 
     def make_rtsp_pipeline(
         self, rtsp_url: str, inp_codec: str, codec_elems: tuple[str, str]
     ) -> None:
         self._pipeline.reset()
-        if not inp_codec or not codec_elems:
-            raise SystemExit(
-                "Fatal: codec information not provided to pipeline generator"
-            )
+        src_dims = (self._inp_w, self._inp_h) if self._inp_w and self._inp_h else None
+        self._plan_conversions(self._decoder_format(codec_elems), src_dims)
         self._pipeline.add_elements(
-            ["rtspsrc", f'location="{rtsp_url}"', "latency=2000"],
-            "rtpjitterbuffer",
-            ["rtph264depay", "wait-for-keyframe=true"],
-            f"video/x-{inp_codec},width={self._inp_w},height={self._inp_h}" if (self._inp_w and self._inp_h) else f"video/x-{inp_codec}",
-            *codec_elems,
+            *self._rtsp_src_elems(rtsp_url, inp_codec, codec_elems, self._inp_w, self._inp_h),
             *self._splitter_elems,
             *self._infer_elems,
             *self._overlay_elems,
             *self._display_elems,
+            *self._record_elems,
+            *self._frame_elems,
+            *self._motion_elems,
         )
 
+    @property
+    def stream_layout(self) -> list[tuple[int, int, int, int]]:
+        """Position and size (x, y, width, height) of each input stream in the inference frame"""
+        return self._stream_layout
+
+    def _make_stream_layout(self, n_streams: int) -> None:
+        cols = ceil(sqrt(n_streams))
+        rows = ceil(n_streams / cols)
+        cell_w, cell_h = self._mosaic_w // cols // 2 * 2, self._mosaic_h // rows // 2 * 2
+        self._stream_layout = [
+            ((i % cols) * cell_w, (i // cols) * cell_h, cell_w, cell_h) for i in range(n_streams)
+        ]
+
+    def make_multi_pipeline(self, sources: list[dict[str, Any]]) -> None:
+        """
+        Creates a pipeline that runs a single inference stage on several input sources.
+
+        Sources are scaled into a grid by a compositor at a fixed output rate. With live sources it outputs the
+        latest frame of every stream; file sources are read at a common pace, so a slow file holds back the others.
+        With the in-process backend, the streams are cropped from the combined frame and inferred in turn at the
+        model's full input size (see `StreamScheduler`). Otherwise inference runs once on the combined frame, so each
+        of N streams only gets about 1/N of the model's input size.
+        The result is shown as one combined view, or cropped back into one sink per stream if `split_output` is set.
+
+        Args:
+            sources (list[dict]): input parameters ("inp_type", "inp_src", "inp_codec", "codec_elems", "inp_w",
+                "inp_h") of each source, and optionally its "max_fps"
+        """
+        self._pipeline.reset()
+        if not self._scheduler and not self._tiler:
+            print(
+                "Multiple sources: in-process backend unavailable, inferring on the combined view "
+                f"(each stream at about 1/{len(sources)} of the model input size)"
+            )
+        self._make_stream_layout(len(sources))
+        self._plan_conversions(None, (self._mosaic_w, self._mosaic_h))
+        # source chains go first, each ends by linking to the compositor declared after them
+        for i, (src, (_, _, w, h)) in enumerate(zip(sources, self._stream_layout)):
+            inp_type: InputType = src["inp_type"]
+            codec_elems = src.get("codec_elems") or (
+                get_codec_elems(src["inp_codec"]) if inp_type != InputType.CAMERA else None
+            )
+            if inp_type == InputType.FILE:
+                src_elems = self._file_src_elems(src["inp_src"], codec_elems, f"demux_{i}")
+            elif inp_type == InputType.CAMERA:
+                src_elems = self._cam_src_elems(src["inp_src"], src.get("inp_w"), src.get("inp_h"))
+            elif inp_type == InputType.RTSP:
+                src_elems = self._rtsp_src_elems(
+                    src["inp_src"], src["inp_codec"], codec_elems, src.get("inp_w"), src.get("inp_h")
+                )
+            else:
+                raise SystemExit(f"Fatal: invalid input type {inp_type}")
+            self._pipeline.add_elements(
+                *src_elems,
+                ["videorate", "drop-only=true", f"max-rate={src.get('max_fps') or self._mosaic_fps}"],
+                "videoconvert",
+                "videoscale",
+                f"video/x-raw,width={w},height={h},pixel-aspect-ratio=1/1",
+                # keep only the newest frame, the compositor takes it on its next output frame
+                ["queue", "leaky=downstream", "max-size-buffers=1", "max-size-bytes=0", "max-size-time=0"],
+                f"comp.sink_{i}",
+            )
+
+        comp_elem = ["compositor", "name=comp", "background=black"]
+        for i, (x, y, _, _) in enumerate(self._stream_layout):
+            comp_elem.extend([f"sink_{i}::xpos={x}", f"sink_{i}::ypos={y}"])
+        self._pipeline.add_elements(
+            comp_elem,
+            f"video/x-raw,width={self._mosaic_w},height={self._mosaic_h},framerate={self._mosaic_fps}/1",
+            *self._splitter_elems,
+            *self._infer_elems,
+            *self._overlay_elems,
+        )
+        if self._split_output and not self._headless:
+            self._pipeline.add_elements(["tee", "name=t_out"])
+            for i, (x, y, w, h) in enumerate(self._stream_layout):
+                self._pipeline.add_elements(
+                    "t_out.",
+                    "queue",
+                    [
+                        "videocrop",
+                        f"left={x}",
+                        f"top={y}",
+                        f"right={self._mosaic_w - x - w}",
+                        f"bottom={self._mosaic_h - y - h}",
+                    ],
+                    "videoconvert",
+                    # split outputs aren't synchronized to the clock unless a profile says otherwise
+                    ["waylandsink", f"name=display_{i}", *(self._tuning.sink or ["sync=false"])],
+                )
+        else:
+            self._pipeline.add_elements(*self._display_elems)
+        self._pipeline.add_elements(*self._record_elems, *self._frame_elems, *self._motion_elems)
+
+    def run(self) -> bool:
+        """
+        Runs the generated pipeline.
+
+        With the "supervise" parameter the pipeline is restarted whenever it fails or stalls, see `PipelineSupervisor`.
+        Otherwise dropped RTSP streams are reconnected if enabled with the "rtsp_reconnect" parameter.
+
+        Returns:
+            bool: True if pipeline executed successfully, False if there was an error.
+        """
+        has_rtsp = any(src["inp_type"] == InputType.RTSP for src in self._sources) or (
+            self._inp_type == InputType.RTSP
+        )
+        if self._supervise:
+            # the supervisor attaches itself to the pipeline, so it is only created once
+            if self._supervisor is None:
+                self._supervisor = PipelineSupervisor(
+                    self._pipeline,
+                    self._stall_timeout,
+                    self._heartbeat_file,
+                    self._max_restarts,
+                    restart_on_eos=self._live,
+                )
+            return self._supervisor.run()
+        if has_rtsp and self._rtsp_reconnect > 0:
+            return RtspReconnector(self._pipeline, self._rtsp_reconnect).run()
+        return self._pipeline.run()
+
     def make_pipeline(self) -> None:
         """
         Automatically creates correct pipeline based on input type.
         """
 
         try:
-            if self._inp_type == InputType.FILE:
+            if len(self._sources) > 1:
+                self.make_multi_pipeline(self._sources)
+            elif self._inp_type == InputType.FILE:
                 self.make_file_pipeline(self._inp_src, self._codec_elems)
             elif self._inp_type == InputType.CAMERA:
                 self.make_cam_pipeline(self._inp_src)
@@ -238,3 +744,5 @@ class GstPipelineGenerator:
                 raise SystemExit(f"Fatal: invalid input type {self._inp_type}")
         except KeyError as e:
             raise SystemExit(f'Fatal: missing pipeline paramemeter "{e.args[0]}"')
+        if self._exporter and len(self._sources) > 1:
+            self._exporter.set_stream_layout(self._stream_layout, (self._mosaic_w, self._mosaic_h))
@@ -0,0 +1,64 @@
+from pathlib import Path
+from typing import Optional
+
+from gst.elements import get_encoder_elem
+
+# containers for recordings by file extension, mp4 is fragmented so that a recording cut short stays playable
+RECORD_MUXERS: dict[str, list[str]] = {
+    ".mkv": ["muxer-factory=matroskamux"],
+    ".mp4": ["muxer-factory=mp4mux", 'muxer-properties="properties,fragment-duration=1000"'],
+}
+
+# raw frames buffered for the encoder, older frames are dropped once full so the display is never held back
+RECORD_QUEUE_SIZE = 30
+
+
+def get_record_location(location: str, segmented: bool) -> str:
+    """
+    Gets the `splitmuxsink` location for a recording, adding a segment number to the file name if segmented.
+
+    Raises:
+        ValueError: if the file extension isn't one of `RECORD_MUXERS`
+    """
+    path = Path(location)
+    if path.suffix.lower() not in RECORD_MUXERS:
+        raise ValueError(f'Unsupported recording format "{path.suffix}", use one of {", ".join(RECORD_MUXERS)}')
+    if segmented and "%" not in path.name:
+        path = path.with_name(f"{path.stem}_%05d{path.suffix}")
+    return str(path)
+
+
+def record_elems(
+    location: str,
+    segment_s: Optional[float] = None,
+    segment_mb: Optional[float] = None,
+    tee_name: str = "t_rec",
+) -> list[str | list[str]]:
+    """
+    Gets GStreamer elements of a recording branch from the tee `tee_name`, encoding to H.264 in MP4 or MKV files.
+
+    A new file is started every `segment_s` seconds or `segment_mb` megabytes, if given.
+    """
+    segmented = bool(segment_s or segment_mb)
+    sink = ["splitmuxsink", f'location="{get_record_location(location, segmented)}"', "async-finalize=true"]
+    if segment_s:
+        sink.append(f"max-size-time={int(segment_s * 1_000_000_000)}")
+    if segment_mb:
+        sink.append(f"max-size-bytes={int(segment_mb * 1_000_000)}")
+    sink.extend(RECORD_MUXERS[Path(location).suffix.lower()])
+    return [
+        f"{tee_name}.",
+        [
+            "queue",
+            "name=q_record",
+            "leaky=downstream",
+            f"max-size-buffers={RECORD_QUEUE_SIZE}",
+            "max-size-bytes=0",
+            "max-size-time=0",
+        ],
+        # passthrough if the encoder accepts the overlay output as is
+        "videoconvert",
+        get_encoder_elem(),
+        "h264parse",
+        sink,
+    ]
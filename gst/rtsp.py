@@ -0,0 +1,113 @@
+from typing import Optional
+import time
+
+# RTP depayloaders for each codec
+RTSP_DEPAYLOADERS: dict[str, list[str]] = {
+    "av1": ["rtpav1depay"],
+    "h264": ["rtph264depay", "wait-for-keyframe=true"],
+    "h265": ["rtph265depay"],
+}
+
+# lower level transport for RTP data, "auto" lets rtspsrc try UDP first and fall back to TCP
+RTSP_TRANSPORTS: tuple[str, ...] = ("auto", "tcp", "udp")
+
+# jitterbuffer latency used when none is given (ms)
+RTSP_DEFAULT_LATENCY = 500
+
+# how long to wait for data before considering the stream dropped (s)
+RTSP_TIMEOUT_S = 5
+
+# a run shorter than this is a failed reconnection attempt rather than a new drop (s)
+RTSP_STABLE_RUN_S = 5
+
+# errors reconnecting can't fix, matched against the pipeline error message
+RTSP_FATAL_ERRORS: tuple[str, ...] = (
+    "Unauthorized",
+    "Forbidden",
+    "Not Found",
+    "No valid RTSP URL",
+    "Invalid URI",
+    "no element",
+    "could not link",
+)
+
+
+def rtsp_src_elems(
+    rtsp_url: str,
+    inp_codec: str,
+    codec_elems: tuple[str, str],
+    inp_w: Optional[int] = None,
+    inp_h: Optional[int] = None,
+    latency: int = RTSP_DEFAULT_LATENCY,
+    transport: str = "auto",
+) -> list[str | list[str]]:
+    """
+    Gets GStreamer elements to receive and decode an RTSP stream.
+
+    The depayloader is chosen based on `inp_codec`, and `latency` (ms) sets the size of rtspsrc's jitterbuffer.
+    """
+    if inp_codec not in RTSP_DEPAYLOADERS:
+        raise KeyError(inp_codec)
+    src = [
+        "rtspsrc",
+        f'location="{rtsp_url}"',
+        f"latency={latency}",
+        f"timeout={RTSP_TIMEOUT_S * 1_000_000}",
+        f"tcp-timeout={RTSP_TIMEOUT_S * 1_000_000}",
+    ]
+    if transport != "auto":
+        src.append(f"protocols={transport}")
+    return [
+        src,
+        RTSP_DEPAYLOADERS[inp_codec],
+        f"video/x-{inp_codec},width={inp_w},height={inp_h}" if (inp_w and inp_h) else f"video/x-{inp_codec}",
+        *codec_elems,
+    ]
+
+
+class RtspReconnector:
+    """
+    Reruns an RTSP pipeline when the stream drops, until it comes back or `timeout` seconds have passed.
+
+    Each attempt rebuilds and restarts the whole pipeline, not just the RTSP source, so the model is loaded again
+    and every reconnect takes about as long as the demo's startup.
+
+    Every failed run's error is printed. Errors in `RTSP_FATAL_ERRORS`, such as a rejected URL or credentials,
+    end the run right away instead of being retried.
+    """
+
+    def __init__(self, pipeline: "GstPipeline", timeout: float, interval: float = 1.0) -> None:
+        self._pipeline = pipeline
+        self._timeout = timeout
+        self._interval = interval
+
+    def run(self) -> bool:
+        """
+        Runs the pipeline, reconnecting on errors or end of stream.
+
+        Returns:
+            bool: True if the pipeline was stopped by the user, False if the stream could not be recovered.
+        """
+        dropped_at: Optional[float] = None
+        run_prompt = "Running pipeline..."
+        while True:
+            start = time.monotonic()
+            ok = self._pipeline.run(run_prompt)
+            if self._pipeline.interrupted:
+                return True
+            error = self._pipeline.error or ""
+            if not ok and any(fatal.lower() in error.lower() for fatal in RTSP_FATAL_ERRORS):
+                print("\nERROR: RTSP stream failed with an error reconnecting can't fix\n")
+                return False
+            now = time.monotonic()
+            if dropped_at is None or now - start > RTSP_STABLE_RUN_S:
+                dropped_at = now
+                print("RTSP stream dropped, reconnecting...")
+            if now - dropped_at > self._timeout:
+                print(f"\nERROR: RTSP stream did not recover within {self._timeout:g} s\n")
+                return False
+            try:
+                time.sleep(self._interval)
+            except KeyboardInterrupt:
+                return True
+            run_prompt = ""
@@ -0,0 +1,226 @@
+from array import array
+from typing import Any, Optional
+import json
+import statistics
+import time
+
+from gst.inprocess import Gst, GstInProcessRunner, PipelineHook
+
+# named elements measured by `PipelineStats`, see `GstPipelineGenerator`
+STATS_SOURCE = "t_data"
+STATS_BRANCHES: dict[str, str] = {
+    "inference": "q_infer",
+    "display": "q_overlay",
+}
+STATS_INFER = "infer"
+STATS_DISPLAY = "display"
+
+# frames in flight tracked for latency, more means frames are never reaching the display
+MAX_PENDING_LATENCY = 256
+
+
+def summarize_intervals(intervals: array) -> dict[str, float]:
+    """
+    Summarizes intervals (seconds) as average, p50 and p99 in milliseconds.
+    """
+    if len(intervals) < 2:
+        return {}
+    pcts = statistics.quantiles(intervals, n=100, method="inclusive")
+    return {
+        "avg_ms": round(statistics.fmean(intervals) * 1000, 2),
+        "p50_ms": round(pcts[49] * 1000, 2),
+        "p99_ms": round(pcts[98] * 1000, 2),
+    }
+
+
+class PadCounter:
+    """
+    Counts buffers passing a pad and records the intervals between them.
+
+    If `arrivals` is given, buffer arrival times are stored in it by PTS. If `latencies` is given,
+    the time since arrival of the buffer with the same PTS is recorded in it instead.
+    """
+
+    def __init__(
+        self,
+        pad: "Gst.Pad",
+        intervals: bool = False,
+        arrivals: Optional[dict[int, float]] = None,
+        latencies: Optional[array] = None,
+    ) -> None:
+        self.pad: "Gst.Pad" = pad
+        self.count: int = 0
+        self.first: Optional[float] = None
+        self.last: Optional[float] = None
+        self.intervals: Optional[array] = array("d") if intervals else None
+        self._arrivals = arrivals
+        self._latencies = latencies
+        pad.add_probe(Gst.PadProbeType.BUFFER, self._on_buffer)
+
+    def _on_buffer(self, pad: "Gst.Pad", info: "Gst.PadProbeInfo") -> "Gst.PadProbeReturn":
+        now = time.monotonic()
+        if self.last is None:
+            self.first = now
+        elif self.intervals is not None:
+            self.intervals.append(now - self.last)
+        self.last = now
+        self.count += 1
+        if self._arrivals is not None:
+            pts = info.get_buffer().pts
+            if self._latencies is None:
+                if len(self._arrivals) >= MAX_PENDING_LATENCY:
+                    self._arrivals.clear()
+                self._arrivals[pts] = now
+            elif (arrival := self._arrivals.pop(pts, None)) is not None:
+                self._latencies.append(now - arrival)
+        return Gst.PadProbeReturn.OK
+
+    @property
+    def rate(self) -> float:
+        if self.count < 2 or self.last == self.first:
+            return 0.0
+        return (self.count - 1) / (self.last - self.first)
+
+
+class QueueDropCounter:
+    """
+    Counts buffers a leaky queue drops, from its "overrun" signal.
+
+    A leaky queue emits "overrun" for every buffer that finds it full, and then drops a buffer to make room.
+    Other queues block instead of dropping, so nothing is counted for them.
+    """
+
+    def __init__(self, queue: "Gst.Element") -> None:
+        self.dropped: int = 0
+        self.leaky: bool = int(queue.get_property("leaky")) != 0
+        if self.leaky:
+            queue.connect("overrun", self._on_overrun)
+
+    def _on_overrun(self, queue: "Gst.Element") -> None:
+        self.dropped += 1
+
+
+class PipelineStats(PipelineHook):
+    """
+    Measures frame rate, frame intervals, latency, dropped frames and inference rate of a running demo pipeline.
+
+    Latency is measured from the tee to the display sink. Frames dropped by the leaky branch queues and by the
+    display sink (QoS) are reported as dropped, frames still in a branch queue when the pipeline stops as queued.
+
+    The expected inference rate uses the inference element's `frameinterval` when the pipeline stops, so it follows
+    changes made while running (see `AdaptiveSkip`), and `inf_skip` for elements without one, such as relays.
+
+    A summary is printed when the pipeline stops unless `verbose` is False, and also saved as JSON if `output` is given.
+    """
+
+    def __init__(self, inf_skip: int, output: Optional[str] = None, verbose: bool = True) -> None:
+        self._inf_skip = max(inf_skip, 1)
+        self._output = output
+        self._verbose = verbose
+        self._infer: Optional["Gst.Element"] = None
+        self._counters: dict[str, PadCounter] = {}
+        self._queue_drops: dict[str, QueueDropCounter] = {}
+        self._arrivals: dict[int, float] = {}
+        self._latencies: array = array("d")
+        self._sink_dropped: int = 0
+        self._start: float = 0.0
+        self.summary: dict[str, Any] = {}
+
+    def _watch(self, runner: GstInProcessRunner, key: str, elem_name: str, pad_name: str, **kwargs: Any) -> None:
+        elem = runner.pipeline.get_by_name(elem_name)
+        if elem and (pad := elem.get_static_pad(pad_name)):
+            self._counters[key] = PadCounter(pad, **kwargs)
+
+    def on_start(self, runner: GstInProcessRunner) -> None:
+        self._counters.clear()
+        self._queue_drops.clear()
+        self._arrivals.clear()
+        self._latencies = array("d")
+        self._sink_dropped = 0
+        self._start = time.monotonic()
+        self._watch(runner, "source", STATS_SOURCE, "sink", intervals=True, arrivals=self._arrivals)
+        for branch, queue in STATS_BRANCHES.items():
+            self._watch(runner, f"{branch}_in", queue, "sink")
+            self._watch(runner, f"{branch}_out", queue, "src")
+            if elem := runner.pipeline.get_by_name(queue):
+                self._queue_drops[branch] = QueueDropCounter(elem)
+        self._watch(runner, "inference", STATS_INFER, "src")
+        infer = runner.pipeline.get_by_name(STATS_INFER)
+        self._infer = infer if infer and infer.find_property("frameinterval") else None
+        self._watch(
+            runner, "display", STATS_DISPLAY, "sink",
+            intervals=True, arrivals=self._arrivals, latencies=self._latencies,
+        )
+
+    def on_message(self, runner: GstInProcessRunner, msg: "Gst.Message") -> None:
+        if msg.type == Gst.MessageType.QOS and msg.src.get_name() == STATS_DISPLAY:
+            _, _, dropped = msg.parse_qos_stats()
+            self._sink_dropped = max(self._sink_dropped, dropped)
+
+    def on_stop(self, runner: GstInProcessRunner) -> None:
+        self.summary = self.make_summary()
+        self._infer = None
+        if self._verbose:
+            self.print_summary()
+        if self._output:
+            try:
+                with open(self._output, "w") as f:
+                    json.dump(self.summary, f, indent=2)
+                print(f"Saved pipeline stats to {self._output}")
+            except OSError as e:
+                print(f"\nERROR: Failed to save pipeline stats: {e}\n")
+
+    def _current_skip(self) -> int:
+        if self._infer is None:
+            return self._inf_skip
+        return max(self._infer.get_property("frameinterval"), 1)
+
+    def make_summary(self) -> dict[str, Any]:
+        counters = self._counters
+        summary: dict[str, Any] = {"duration_s": round(time.monotonic() - self._start, 2)}
+        if src := counters.get("source"):
+            summary["source"] = {"frames": src.count, "fps": round(src.rate, 2), **summarize_intervals(src.intervals)}
+        if disp := counters.get("display"):
+            summary["display"] = {"frames": disp.count, "fps": round(disp.rate, 2), **summarize_intervals(disp.intervals)}
+        if latency := summarize_intervals(self._latencies):
+            summary["latency"] = latency
+        dropped: dict[str, int] = {branch: drops.dropped for branch, drops in self._queue_drops.items()}
+        dropped["display"] = dropped.get("display", 0) + self._sink_dropped
+        summary["dropped_frames"] = dropped
+        queued: dict[str, int] = {}
+        for branch in STATS_BRANCHES:
+            if (b_in := counters.get(f"{branch}_in")) and (b_out := counters.get(f"{branch}_out")):
+                queued[branch] = max(b_in.count - b_out.count - dropped.get(branch, 0), 0)
+        summary["queued_frames"] = queued
+        if infer := counters.get("inference"):
+            src_fps = src.rate if src else 0.0
+            inf_skip = self._current_skip()
+            summary["inference"] = {
+                "count": infer.count,
+                "rate": round(infer.rate, 2),
+                "expected_rate": round(src_fps / inf_skip, 2),
+                "inf_skip": inf_skip,
+            }
+        return summary
+
+    def print_summary(self) -> None:
+        s = self.summary
+        print(f"\nPipeline stats ({s['duration_s']} s):")
+        for stage in ("source", "display"):
+            if stage in s:
+                st = s[stage]
+                print(
+                    f"  {stage:<10}{st['frames']} frames, {st['fps']} fps, "
+                    f"interval avg/p50/p99: {st.get('avg_ms', '-')}/{st.get('p50_ms', '-')}/{st.get('p99_ms', '-')} ms"
+                )
+        if lat := s.get("latency"):
+            print(f"  {'latency':<10}avg/p50/p99: {lat['avg_ms']}/{lat['p50_ms']}/{lat['p99_ms']} ms")
+        drops = ", ".join(f"{branch}: {n}" for branch, n in s["dropped_frames"].items())
+        print(f"  {'dropped':<10}{drops}")
+        if queued := ", ".join(f"{branch}: {n}" for branch, n in s["queued_frames"].items()):
+            print(f"  {'queued':<10}{queued}")
+        if inf := s.get("inference"):
+            print(
+                f"  {'inference':<10}{inf['count']} results, {inf['rate']}/s "
+                f"(expected {inf['expected_rate']}/s with inference skip {inf['inf_skip']})"
+            )
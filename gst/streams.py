@@ -0,0 +1,170 @@
+from collections import deque
+from typing import Optional
+import threading
+
+from gst.detections import Detection, detections_to_json, parse_detections
+from gst.inprocess import Gst, GstInProcessRunner, PipelineHook
+from gst.stats import STATS_INFER
+
+# named elements of the per-stream inference branch, the relay takes the place of the single synapinfer
+STREAM_QUEUE = "q_infer"
+STREAM_CROP = "stream_crop"
+STREAM_INFER = "infer_streams"
+STREAM_SINK = "stream_results"
+STREAM_RELAY = STATS_INFER
+
+# inferred frames whose results may still be on their way through synapinfer
+STREAM_MAX_PENDING = 4
+
+
+def _crop_props(cell: tuple[int, int, int, int], frame_dims: tuple[int, int]) -> dict[str, int]:
+    (x, y, w, h), (fw, fh) = cell, frame_dims
+    return {"left": x, "top": y, "right": fw - x - w, "bottom": fh - y - h}
+
+
+def stream_infer_elems(
+    layout: list[tuple[int, int, int, int]],
+    frame_dims: tuple[int, int],
+    infer_caps: str,
+    synapinfer: list[str],
+    queue: list[str],
+) -> list[str | list[str]]:
+    """
+    Gets GStreamer elements of an inference branch from the `t_data` tee that infers one stream of a combined
+    multi-source frame at a time.
+
+    A single videocrop cuts the scheduled stream's cell (see `layout`) out of each inferred frame, which is scaled
+    to the model input (`infer_caps`) and inferred by `synapinfer` (named `STREAM_INFER`, inferring every buffer).
+    `StreamScheduler` moves the crop between cells and passes the results to the overlay through the relay appsrc.
+    """
+    crop = ["videocrop", f"name={STREAM_CROP}"]
+    crop.extend(f"{prop}={value}" for prop, value in _crop_props(layout[0], frame_dims).items())
+    return [
+        "t_data.",
+        ["queue", f"name={STREAM_QUEUE}", *queue],
+        crop,
+        "videoconvert",
+        "videoscale",
+        infer_caps,
+        synapinfer,
+        ["appsink", f"name={STREAM_SINK}", "emit-signals=true", "sync=false"],
+        ["appsrc", f"name={STREAM_RELAY}", "format=time", "is-live=true", "do-timestamp=false"],
+        "overlay.inference_sink",
+    ]
+
+
+class StreamScheduler(PipelineHook):
+    """
+    Infers the streams of a combined multi-source frame in turn, for the branch of `stream_infer_elems`.
+
+    Every `inf_skip`th frame is inferred, each time for the next stream, whose cell is cropped from the frame and
+    inferred at the model's full input size. Each stream keeps its latest results, moved from its cell to
+    combined frame coordinates, and the results of all streams are pushed into the appsrc linked to the overlay
+    after every inference. With N streams, each is inferred every N-th inferred frame, for the cost of a single
+    inference per frame.
+
+    Args:
+        layout (list[tuple[int, int, int, int]]): x, y, width and height of each stream in the combined frame
+        frame_dims (tuple[int, int]): width and height of the combined frame
+        inf_dims (tuple[int, int]): model input width and height
+        inf_skip (int): infer every `inf_skip`th frame
+    """
+
+    def __init__(
+        self,
+        layout: list[tuple[int, int, int, int]],
+        frame_dims: tuple[int, int],
+        inf_dims: tuple[int, int],
+        inf_skip: int = 1,
+    ) -> None:
+        self.layout = layout
+        self.frame_dims = frame_dims
+        self._inf_dims = inf_dims
+        self._inf_skip = max(inf_skip, 1)
+        self._crop: Optional["Gst.Element"] = None
+        self._relay: Optional["Gst.Element"] = None
+        self._frames: int = 0
+        self._sent: deque[tuple[int, int]] = deque(maxlen=STREAM_MAX_PENDING)
+        self._latest: dict[int, list[Detection]] = {}
+        self._last_pts: int = -1
+        self._lock = threading.Lock()
+
+    def _to_frame(self, det: Detection, cell: tuple[int, int, int, int]) -> Detection:
+        """
+        Moves a detection from cell model input coordinates to combined frame model input coordinates.
+        """
+        cx, cy, cw, ch = cell
+        (iw, ih), (fw, fh) = self._inf_dims, self.frame_dims
+        sx, sy = cw / iw, ch / ih
+        return det._replace(
+            x=(cx + det.x * sx) * iw / fw,
+            y=(cy + det.y * sy) * ih / fh,
+            w=det.w * sx * iw / fw,
+            h=det.h * sy * ih / fh,
+        )
+
+    def _on_frame(self, pad: "Gst.Pad", info: "Gst.PadProbeInfo") -> "Gst.PadProbeReturn":
+        self._frames += 1
+        if (self._frames - 1) % self._inf_skip:
+            return Gst.PadProbeReturn.DROP
+        if (crop := self._crop) is None:
+            return Gst.PadProbeReturn.OK
+        stream = ((self._frames - 1) // self._inf_skip) % len(self.layout)
+        # the crop runs on this thread right after the probe, so it applies to this frame
+        for prop, value in _crop_props(self.layout[stream], self.frame_dims).items():
+            crop.set_property(prop, value)
+        with self._lock:
+            self._sent.append((info.get_buffer().pts, stream))
+        return Gst.PadProbeReturn.OK
+
+    def _on_sample(self, sink: "Gst.Element") -> "Gst.FlowReturn":
+        sample = sink.emit("pull-sample")
+        if sample is None:
+            return Gst.FlowReturn.EOS
+        buffer = sample.get_buffer()
+        with self._lock:
+            # frames sent before this result's frame never got a result
+            while self._sent and self._sent[0][0] != buffer.pts:
+                self._sent.popleft()
+            if not self._sent:
+                return Gst.FlowReturn.OK
+            _, stream = self._sent.popleft()
+        ok, map_info = buffer.map(Gst.MapFlags.READ)
+        if not ok:
+            return Gst.FlowReturn.OK
+        try:
+            dets = [self._to_frame(det, self.layout[stream]) for det in parse_detections(bytes(map_info.data))]
+        finally:
+            buffer.unmap(map_info)
+        with self._lock:
+            self._latest[stream] = dets
+            if buffer.pts <= self._last_pts:
+                return Gst.FlowReturn.OK
+            self._last_pts = buffer.pts
+            merged = [det for results in self._latest.values() for det in results]
+        if (relay := self._relay) is None:
+            return Gst.FlowReturn.OK
+        result = Gst.Buffer.new_wrapped(detections_to_json(merged).encode())
+        result.pts = buffer.pts
+        if relay.get_property("caps") is None:
+            relay.set_property("caps", sample.get_caps())
+        relay.emit("push-buffer", result)
+        return Gst.FlowReturn.OK
+
+    def on_start(self, runner: GstInProcessRunner) -> None:
+        self._frames = 0
+        self._sent.clear()
+        self._latest.clear()
+        self._last_pts = -1
+        pipeline = runner.pipeline
+        queue, sink = pipeline.get_by_name(STREAM_QUEUE), pipeline.get_by_name(STREAM_SINK)
+        self._crop, self._relay = pipeline.get_by_name(STREAM_CROP), pipeline.get_by_name(STREAM_RELAY)
+        if not queue or not sink or not self._crop or not self._relay:
+            print("Per-stream inference: stream branch not found, disabled")
+            self._crop = self._relay = None
+            return
+        queue.get_static_pad("src").add_probe(Gst.PadProbeType.BUFFER, self._on_frame)
+        sink.connect("new-sample", self._on_sample)
+
+    def on_stop(self, runner: GstInProcessRunner) -> None:
+        self._crop = self._relay = None
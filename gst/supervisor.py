@@ -0,0 +1,171 @@
+from pathlib import Path
+from typing import Any, Optional
+import json
+import os
+import tempfile
+import time
+
+from gst.inprocess import HAVE_GST_BINDINGS, GLib, Gst, GstInProcessRunner, PipelineHook
+
+# restart delay after the first failure, doubled after each consecutive failure up to the maximum (s)
+SUPERVISOR_BACKOFF_MIN_S = 1.0
+SUPERVISOR_BACKOFF_MAX_S = 60.0
+
+# a run lasting longer than this resets the restart delay (s)
+SUPERVISOR_STABLE_RUN_S = 60.0
+
+# how often buffer flow is checked and the heartbeat file is updated (s)
+SUPERVISOR_TICK_S = 1
+
+
+class PipelineSupervisor(PipelineHook):
+    """
+    Keeps a pipeline running unattended, restarting it with exponential backoff when it fails.
+
+    When run in-process, buffers reaching the pipeline sinks are watched and the pipeline is restarted if none
+    arrive for `stall_timeout` seconds. If `heartbeat_file` is given, the supervisor status and restart counters
+    are written to it as JSON every second while the pipeline runs, and on every restart.
+
+    Stall detection and the heartbeat file need the in-process backend. With `gst-launch-1.0`, failed pipelines
+    are still restarted, but a heartbeat file is refused, since it would only be updated on restarts.
+
+    Args:
+        pipeline (GstPipeline): pipeline to supervise, the supervisor attaches itself to it as a hook
+        stall_timeout (float): seconds without buffers before the pipeline is considered stalled, 0 to disable
+        heartbeat_file (str): path of the heartbeat file, if any
+        max_restarts (int): number of restarts before giving up, None to restart forever
+        restart_on_eos (bool): whether end of stream also restarts the pipeline, e.g. for live sources
+    """
+
+    def __init__(
+        self,
+        pipeline: "GstPipeline",
+        stall_timeout: float = 10,
+        heartbeat_file: Optional[str] = None,
+        max_restarts: Optional[int] = None,
+        restart_on_eos: bool = False,
+    ) -> None:
+        self._pipeline = pipeline
+        self._stall_timeout = stall_timeout
+        self._heartbeat_file: Optional[Path] = Path(heartbeat_file) if heartbeat_file else None
+        self._max_restarts = max_restarts
+        self._restart_on_eos = restart_on_eos
+        self._started: float = time.time()
+        self._last_buffer: float = 0.0
+        self._stalled: bool = False
+        self._tick_id: Optional[int] = None
+        self.status: str = "starting"
+        self.restarts: int = 0
+        self.stalls: int = 0
+        self.errors: int = 0
+        self.last_error: Optional[str] = None
+        pipeline.add_hook(self)
+
+    def _on_buffer(self, pad: "Gst.Pad", info: "Gst.PadProbeInfo") -> "Gst.PadProbeReturn":
+        self._last_buffer = time.monotonic()
+        return Gst.PadProbeReturn.OK
+
+    def _on_tick(self, runner: GstInProcessRunner) -> bool:
+        if self._stall_timeout and time.monotonic() - self._last_buffer > self._stall_timeout:
+            self._stalled = True
+            self._tick_id = None
+            runner.stop(f"No buffers received for {self._stall_timeout:g} s")
+            return False
+        self.write_heartbeat()
+        return True
+
+    def on_start(self, runner: GstInProcessRunner) -> None:
+        self._stalled = False
+        # startup counts towards the stall timeout, so a pipeline that never produces a frame is restarted too
+        self._last_buffer = time.monotonic()
+        for sink in runner.pipeline.iterate_sinks():
+            if pad := sink.get_static_pad("sink"):
+                pad.add_probe(Gst.PadProbeType.BUFFER, self._on_buffer)
+        self._tick_id = GLib.timeout_add_seconds(SUPERVISOR_TICK_S, self._on_tick, runner)
+
+    def on_stop(self, runner: GstInProcessRunner) -> None:
+        if self._tick_id is not None:
+            GLib.source_remove(self._tick_id)
+            self._tick_id = None
+
+    def write_heartbeat(self) -> None:
+        """
+        Atomically replaces the heartbeat file with the current supervisor status, if enabled.
+        """
+        if not self._heartbeat_file:
+            return
+        heartbeat: dict[str, Any] = {
+            "pid": os.getpid(),
+            "time": time.time(),
+            "status": self.status,
+            "uptime_s": round(time.time() - self._started, 1),
+            "restarts": self.restarts,
+            "stalls": self.stalls,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+        if self.status == "running" and self._last_buffer:
+            heartbeat["last_buffer_age_s"] = round(time.monotonic() - self._last_buffer, 2)
+        try:
+            fd, tmp = tempfile.mkstemp(
+                dir=self._heartbeat_file.parent, prefix=self._heartbeat_file.name
+            )
+            with os.fdopen(fd, "w") as f:
+                json.dump(heartbeat, f, indent=2)
+            os.replace(tmp, self._heartbeat_file)
+        except OSError as e:
+            print(f"\nERROR: Failed to write heartbeat file: {e}\n")
+            self._heartbeat_file = None
+
+    def run(self) -> bool:
+        """
+        Runs the pipeline until it is stopped by the user, ends normally or runs out of restarts.
+
+        Returns:
+            bool: True if the pipeline was stopped by the user or ended normally, False if it gave up restarting.
+        """
+        if self._pipeline.backend != "inprocess" or not HAVE_GST_BINDINGS:
+            if self._heartbeat_file:
+                raise SystemExit("Fatal: a heartbeat file requires the in-process backend (GStreamer Python bindings)")
+            print("Stall detection requires the in-process backend, only failed pipelines are restarted")
+        failures = 0
+        run_prompt = "Running pipeline under supervision..."
+        while True:
+            self.status = "running"
+            self.write_heartbeat()
+            start = time.monotonic()
+            ok = self._pipeline.run(run_prompt)
+            if self._pipeline.interrupted or (ok and not self._stalled and not self._restart_on_eos):
+                self.status = "stopped"
+                self.write_heartbeat()
+                return True
+            if self._stalled:
+                self.stalls += 1
+                reason = "stalled"
+                self.last_error = f"no buffers received for {self._stall_timeout:g} s"
+            elif ok:
+                reason = self.last_error = "end of stream"
+            else:
+                self.errors += 1
+                reason = "failed"
+                self.last_error = self._pipeline.error or "pipeline error"
+            if time.monotonic() - start > SUPERVISOR_STABLE_RUN_S:
+                failures = 0
+            if self._max_restarts is not None and self.restarts >= self._max_restarts:
+                print(f"\nERROR: Pipeline failed after {self.restarts} restarts, giving up\n")
+                self.status = "failed"
+                self.write_heartbeat()
+                return False
+            delay = min(SUPERVISOR_BACKOFF_MIN_S * 2**failures, SUPERVISOR_BACKOFF_MAX_S)
+            failures += 1
+            self.restarts += 1
+            self.status = "restarting"
+            self.write_heartbeat()
+            print(f"Pipeline {reason}, restarting in {delay:g} s (restart {self.restarts})")
+            try:
+                time.sleep(delay)
+            except KeyboardInterrupt:
+                self.status = "stopped"
+                self.write_heartbeat()
+                return True
+            run_prompt = ""
@@ -0,0 +1,229 @@
+from collections import deque
+from typing import Optional
+import threading
+
+from gst.detections import Detection, detections_to_json, nms, parse_detections
+from gst.inprocess import Gst, GstInProcessRunner, PipelineHook
+from gst.stats import STATS_INFER
+
+# overlap between neighbouring tiles, as a fraction of the tile size
+TILE_DEFAULT_OVERLAP = 0.2
+
+# every tile is one more inference per frame, larger tilings can't keep up with live video
+TILE_MAX_COUNT = 9
+
+# detections of the same class overlapping more than this across tiles are merged
+TILE_NMS_IOU = 0.5
+
+# frames with incomplete tile results held before the oldest is merged as is
+TILE_MAX_PENDING = 4
+
+# named elements of the tiled inference branch, the relay takes the place of the single synapinfer
+TILE_QUEUE = "q_infer"
+TILE_FUNNEL = "tiles"
+TILE_INFER = "infer_tiles"
+TILE_SINK = "tile_results"
+TILE_RELAY = STATS_INFER
+
+
+def _even(value: float) -> int:
+    # crops of subsampled YUV formats must start and end on even pixels
+    return int(value) & ~1
+
+
+def _tile_spans(size: int, count: int, overlap: float) -> list[tuple[int, int]]:
+    if count <= 1:
+        return [(0, size)]
+    tile = _even(size / (count - (count - 1) * overlap))
+    # evenly spaced, the last tile ends at the edge
+    return [(_even(i * (size - tile) / (count - 1)), tile) for i in range(count)]
+
+
+def make_tiles(
+    frame_dims: tuple[int, int], grid: tuple[int, int], overlap: float = TILE_DEFAULT_OVERLAP
+) -> list[tuple[int, int, int, int]]:
+    """
+    Covers a frame with a grid of `grid` (columns, rows) equally sized tiles, overlapping by `overlap`.
+
+    Raises:
+        ValueError: if the grid has more than `TILE_MAX_COUNT` tiles
+
+    Returns:
+        list[tuple[int, int, int, int]]: x, y, width and height of each tile
+    """
+    (fw, fh), (cols, rows) = frame_dims, grid
+    if cols * rows > TILE_MAX_COUNT:
+        raise ValueError(f"{cols}x{rows} tiles exceed the limit of {TILE_MAX_COUNT} tiles")
+    return [
+        (x, y, w, h)
+        for y, h in _tile_spans(fh, rows, overlap)
+        for x, w in _tile_spans(fw, cols, overlap)
+    ]
+
+
+def tiled_infer_elems(
+    tiles: list[tuple[int, int, int, int]],
+    frame_dims: tuple[int, int],
+    infer_caps: str,
+    synapinfer: list[str],
+    queue: list[str],
+) -> list[str | list[str]]:
+    """
+    Gets GStreamer elements of an inference branch from the `t_data` tee that runs one synapinfer on every tile.
+
+    Each tile is cropped from the frame and scaled to the model input (`infer_caps`). The tee feeding the tiles has
+    no queues, so the tiles of a frame are pushed one after another through a funnel into the single `synapinfer`
+    (named `TILE_INFER`, inferring every buffer), whose results are merged by `TiledInference` and passed to the
+    overlay through the relay appsrc.
+    """
+    fw, fh = frame_dims
+    elems: list[str | list[str]] = ["t_data.", ["queue", f"name={TILE_QUEUE}", *queue], ["tee", "name=t_tiles"]]
+    for i, (x, y, w, h) in enumerate(tiles):
+        elems.extend(
+            [
+                "t_tiles.",
+                ["videocrop", f"left={x}", f"top={y}", f"right={fw - x - w}", f"bottom={fh - y - h}"],
+                "videoconvert",
+                "videoscale",
+                infer_caps,
+                f"{TILE_FUNNEL}.sink_{i}",
+            ]
+        )
+    elems.extend(
+        [
+            ["funnel", f"name={TILE_FUNNEL}"],
+            synapinfer,
+            ["appsink", f"name={TILE_SINK}", "emit-signals=true", "sync=false"],
+            ["appsrc", f"name={TILE_RELAY}", "format=time", "is-live=true", "do-timestamp=false"],
+            "overlay.inference_sink",
+        ]
+    )
+    return elems
+
+
+class TiledInference(PipelineHook):
+    """
+    Skips frames for the branch of `tiled_infer_elems`, routes its results back to their tiles and merges them.
+
+    Only every `inf_skip`th frame is passed on to the tiles, since the tiled synapinfer sees several buffers per
+    frame and can't skip frames itself. The tiles of a frame reach synapinfer in sequence, and its results come
+    out in the same order, so each result is matched to the tile sent with the same timestamp. Results are moved
+    from tile to full frame coordinates, merged across tiles with NMS once every tile has reported for a frame,
+    and pushed into the appsrc linked to the overlay. A frame some tiles never report for is merged with the
+    results it has once newer frames are waiting.
+
+    Args:
+        tiles (list[tuple[int, int, int, int]]): x, y, width and height of each tile in the frame
+        frame_dims (tuple[int, int]): width and height of the tiled frame
+        inf_dims (tuple[int, int]): model input width and height
+        inf_skip (int): infer every `inf_skip`th frame
+        max_detections (int): detections kept per frame after merging
+    """
+
+    def __init__(
+        self,
+        tiles: list[tuple[int, int, int, int]],
+        frame_dims: tuple[int, int],
+        inf_dims: tuple[int, int],
+        inf_skip: int = 1,
+        max_detections: Optional[int] = None,
+    ) -> None:
+        self.tiles = tiles
+        self.frame_dims = frame_dims
+        self._inf_dims = inf_dims
+        self._inf_skip = max(inf_skip, 1)
+        self._max_detections = max_detections
+        self._relay: Optional["Gst.Element"] = None
+        self._frames: int = 0
+        self._sent: deque[tuple[int, int]] = deque()
+        self._pending: dict[int, dict[int, list[Detection]]] = {}
+        self._last_pts: int = -1
+        self._lock = threading.Lock()
+
+    def _to_frame(self, det: Detection, tile: tuple[int, int, int, int]) -> Detection:
+        """
+        Moves a detection from tile model input coordinates to full frame model input coordinates.
+        """
+        tx, ty, tw, th = tile
+        (iw, ih), (fw, fh) = self._inf_dims, self.frame_dims
+        sx, sy = tw / iw, th / ih
+        return det._replace(
+            x=(tx + det.x * sx) * iw / fw,
+            y=(ty + det.y * sy) * ih / fh,
+            w=det.w * sx * iw / fw,
+            h=det.h * sy * ih / fh,
+        )
+
+    def _on_frame(self, pad: "Gst.Pad", info: "Gst.PadProbeInfo") -> "Gst.PadProbeReturn":
+        self._frames += 1
+        if (self._frames - 1) % self._inf_skip:
+            return Gst.PadProbeReturn.DROP
+        return Gst.PadProbeReturn.OK
+
+    def _on_tile_sent(self, pad: "Gst.Pad", info: "Gst.PadProbeInfo", tile_idx: int) -> "Gst.PadProbeReturn":
+        with self._lock:
+            self._sent.append((info.get_buffer().pts, tile_idx))
+        return Gst.PadProbeReturn.OK
+
+    def _push(self, pts: int, results: dict[int, list[Detection]], caps: "Gst.Caps") -> None:
+        if pts <= self._last_pts:
+            # results arriving after a newer frame was shown are stale
+            return
+        self._last_pts = pts
+        merged = nms([det for dets in results.values() for det in dets], TILE_NMS_IOU, self._max_detections)
+        buffer = Gst.Buffer.new_wrapped(detections_to_json(merged).encode())
+        buffer.pts = pts
+        if self._relay.get_property("caps") is None:
+            self._relay.set_property("caps", caps)
+        self._relay.emit("push-buffer", buffer)
+
+    def _on_sample(self, sink: "Gst.Element") -> "Gst.FlowReturn":
+        sample = sink.emit("pull-sample")
+        if sample is None:
+            return Gst.FlowReturn.EOS
+        buffer = sample.get_buffer()
+        with self._lock:
+            # tiles sent before this result's tile never got a result
+            while self._sent and self._sent[0][0] != buffer.pts:
+                self._sent.popleft()
+            if not self._sent:
+                return Gst.FlowReturn.OK
+            _, tile_idx = self._sent.popleft()
+        ok, map_info = buffer.map(Gst.MapFlags.READ)
+        if not ok:
+            return Gst.FlowReturn.OK
+        try:
+            dets = [self._to_frame(det, self.tiles[tile_idx]) for det in parse_detections(bytes(map_info.data))]
+        finally:
+            buffer.unmap(map_info)
+        ready: list[tuple[int, dict[int, list[Detection]]]] = []
+        with self._lock:
+            self._pending.setdefault(buffer.pts, {})[tile_idx] = dets
+            if len(self._pending[buffer.pts]) == len(self.tiles):
+                ready.append((buffer.pts, self._pending.pop(buffer.pts)))
+            while len(self._pending) > TILE_MAX_PENDING:
+                oldest = min(self._pending)
+                ready.append((oldest, self._pending.pop(oldest)))
+            for pts, results in sorted(ready, key=lambda r: r[0]):
+                self._push(pts, results, sample.get_caps())
+        return Gst.FlowReturn.OK
+
+    def on_start(self, runner: GstInProcessRunner) -> None:
+        self._frames = 0
+        self._sent = deque(maxlen=len(self.tiles) * TILE_MAX_PENDING)
+        self._pending.clear()
+        self._last_pts = -1
+        pipeline = runner.pipeline
+        self._relay = pipeline.get_by_name(TILE_RELAY)
+        queue, funnel, sink = (pipeline.get_by_name(name) for name in (TILE_QUEUE, TILE_FUNNEL, TILE_SINK))
+        if not self._relay or not queue or not funnel or not sink:
+            print("Tiled inference: tile branch not found, disabled")
+            return
+        queue.get_static_pad("src").add_probe(Gst.PadProbeType.BUFFER, self._on_frame)
+        for i in range(len(self.tiles)):
+            if pad := funnel.get_static_pad(f"sink_{i}"):
+                pad.add_probe(Gst.PadProbeType.BUFFER, self._on_tile_sent, i)
+        sink.connect("new-sample", self._on_sample)
+
+    def on_stop(self, runner: GstInProcessRunner) -> None:
+        self._relay = None
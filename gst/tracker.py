@@ -0,0 +1,230 @@
+from typing import Optional
+import threading
+
+from gst.detections import Detection, detections_to_json, parse_detections
+from gst.inprocess import Gst, GstInProcessRunner, PipelineHook
+from gst.stats import STATS_INFER
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# named elements of the tracking stage, the relay passes tracked boxes to the overlay in place of synapinfer
+TRACK_RELAY = "track"
+TRACK_FRAMES = "q_overlay"
+
+# smallest overlap of a predicted track and a detection of the same class to be associated
+TRACK_IOU = 0.3
+
+# inference results in a row a track may go unmatched in, it is dropped when it misses one more
+TRACK_MAX_MISSES = 2
+
+# weight of the newest measurement in a track's velocity, lower values smooth out detection jitter
+TRACK_VELOCITY_RATE = 0.5
+
+# longest time a box is moved ahead of its last detection (s), it is held in place after that
+TRACK_MAX_PREDICT_S = 1.0
+
+NS_PER_S = 1_000_000_000
+
+
+class IouTracker:
+    """
+    Tracks detections across frames by IoU association with constant-velocity prediction.
+
+    Tracks are held in NumPy arrays as centre and size boxes with a velocity, all in model input pixels. On each
+    inference result, tracks are moved to the result's time and greedily matched with the detections of the same
+    class they overlap most. Matched tracks take the detected box, and their velocity is set from the first
+    displacement, then blended with each new one. Unmatched detections start new tracks with a new ID, and tracks
+    left unmatched by more than `max_misses` results in a row are dropped.
+    Between inference results, `predict` moves every track along its velocity.
+
+    Args:
+        iou_thresh (float): smallest IoU for a detection to continue a track
+        max_misses (int): inference results in a row a track may be missing from and still be kept
+    """
+
+    def __init__(self, iou_thresh: float = TRACK_IOU, max_misses: int = TRACK_MAX_MISSES) -> None:
+        if np is None:
+            raise RuntimeError("NumPy is not installed")
+        self._iou_thresh = iou_thresh
+        self._max_misses = max_misses
+        self.reset()
+
+    def reset(self) -> None:
+        self._boxes = np.zeros((0, 4), dtype=np.float64)  # cx, cy, w, h
+        self._velocities = np.zeros((0, 4), dtype=np.float64)  # per second
+        self._updated = np.zeros(0, dtype=np.int64)  # pts of the last detection (ns)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._classes = np.zeros(0, dtype=np.int64)
+        self._scores = np.zeros(0, dtype=np.float64)
+        self._misses = np.zeros(0, dtype=np.int64)
+        self._hits = np.zeros(0, dtype=np.int64)  # detections matched since the track started
+        self._next_id: int = 1
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def started(self) -> int:
+        """Tracks started since the last reset"""
+        return self._next_id - 1
+
+    def _predict_boxes(self, pts: int) -> "np.ndarray":
+        dt = np.clip((pts - self._updated) / NS_PER_S, 0.0, TRACK_MAX_PREDICT_S)
+        boxes = self._boxes + self._velocities * dt[:, None]
+        boxes[:, 2:] = np.maximum(boxes[:, 2:], 1.0)
+        return boxes
+
+    @staticmethod
+    def _iou_matrix(a: "np.ndarray", b: "np.ndarray") -> "np.ndarray":
+        """
+        Computes the IoU of every centre and size box in `a` with every box in `b`.
+        """
+        a_min, a_max = a[:, None, :2] - a[:, None, 2:] / 2, a[:, None, :2] + a[:, None, 2:] / 2
+        b_min, b_max = b[None, :, :2] - b[None, :, 2:] / 2, b[None, :, :2] + b[None, :, 2:] / 2
+        inter = np.prod(np.clip(np.minimum(a_max, b_max) - np.maximum(a_min, b_min), 0, None), axis=2)
+        union = np.prod(a[:, 2:], axis=1)[:, None] + np.prod(b[:, 2:], axis=1)[None, :] - inter
+        return inter / np.maximum(union, 1e-9)
+
+    def update(self, detections: list[Detection], pts: int) -> None:
+        """
+        Associates the detections of an inference result taken at `pts` (ns) with the current tracks.
+        """
+        dets = np.array(
+            [[d.x + d.w / 2, d.y + d.h / 2, d.w, d.h] for d in detections], dtype=np.float64
+        ).reshape(-1, 4)
+        det_classes = np.array([d.class_index for d in detections], dtype=np.int64)
+        det_scores = np.array([d.score for d in detections], dtype=np.float64)
+
+        predicted = self._predict_boxes(pts)
+        ious = self._iou_matrix(predicted, dets)
+        ious[self._classes[:, None] != det_classes[None, :]] = 0.0
+        track_idx, det_idx = [], []
+        # greedy association, best overlap first
+        while ious.size:
+            t, d = np.unravel_index(np.argmax(ious), ious.shape)
+            if ious[t, d] < self._iou_thresh:
+                break
+            track_idx.append(t)
+            det_idx.append(d)
+            ious[t, :] = 0.0
+            ious[:, d] = 0.0
+        track_idx, det_idx = np.array(track_idx, dtype=np.int64), np.array(det_idx, dtype=np.int64)
+
+        if len(track_idx):
+            dt = np.maximum((pts - self._updated[track_idx]) / NS_PER_S, 1e-3)[:, None]
+            measured = (dets[det_idx] - self._boxes[track_idx]) / dt
+            # a new track has no velocity to blend with yet, it starts from its first displacement
+            rate = np.where(self._hits[track_idx] > 0, TRACK_VELOCITY_RATE, 1.0)[:, None]
+            self._velocities[track_idx] += (measured - self._velocities[track_idx]) * rate
+            self._hits[track_idx] += 1
+            self._boxes[track_idx] = dets[det_idx]
+            self._updated[track_idx] = pts
+            self._scores[track_idx] = det_scores[det_idx]
+        matched = np.zeros(len(self), dtype=bool)
+        matched[track_idx] = True
+        self._misses[matched] = 0
+        self._misses[~matched] += 1
+
+        keep = self._misses <= self._max_misses
+        new = np.ones(len(dets), dtype=bool)
+        new[det_idx] = False
+        n_new = int(np.count_nonzero(new))
+        self._boxes = np.concatenate([self._boxes[keep], dets[new]])
+        self._velocities = np.concatenate([self._velocities[keep], np.zeros((n_new, 4))])
+        self._updated = np.concatenate([self._updated[keep], np.full(n_new, pts, dtype=np.int64)])
+        self._ids = np.concatenate([self._ids[keep], np.arange(self._next_id, self._next_id + n_new, dtype=np.int64)])
+        self._classes = np.concatenate([self._classes[keep], det_classes[new]])
+        self._scores = np.concatenate([self._scores[keep], det_scores[new]])
+        self._misses = np.concatenate([self._misses[keep], np.zeros(n_new, dtype=np.int64)])
+        self._hits = np.concatenate([self._hits[keep], np.zeros(n_new, dtype=np.int64)])
+        self._next_id += n_new
+
+    def predict(self, pts: int) -> list[Detection]:
+        """
+        Gets the box of every track at `pts` (ns), moved along its velocity since its last detection.
+        """
+        boxes = self._predict_boxes(pts)
+        return [
+            Detection(
+                x=float(cx - w / 2),
+                y=float(cy - h / 2),
+                w=float(w),
+                h=float(h),
+                class_index=int(cls),
+                score=float(score),
+                track_id=int(track_id),
+            )
+            for (cx, cy, w, h), cls, score, track_id in zip(boxes, self._classes, self._scores, self._ids)
+        ]
+
+
+class TrackingRelay(PipelineHook):
+    """
+    Shows tracked boxes on every frame, instead of the boxes of the last inferred frame.
+
+    Inference results are read from the synapinfer output and update an `IouTracker`. For every frame going to
+    the overlay, the tracks are predicted at the frame's timestamp and pushed into the appsrc linked to the overlay,
+    with their track ID in each item's "track_id".
+    """
+
+    def __init__(self, iou_thresh: float = TRACK_IOU, max_misses: int = TRACK_MAX_MISSES) -> None:
+        self.tracker = IouTracker(iou_thresh, max_misses)
+        self._relay: Optional["Gst.Element"] = None
+        self._caps: Optional["Gst.Caps"] = None
+        self._lock = threading.Lock()
+        self.updates: int = 0
+        self.predictions: int = 0
+
+    def _on_result(self, pad: "Gst.Pad", info: "Gst.PadProbeInfo") -> "Gst.PadProbeReturn":
+        buffer = info.get_buffer()
+        ok, map_info = buffer.map(Gst.MapFlags.READ)
+        if not ok:
+            return Gst.PadProbeReturn.OK
+        try:
+            detections = parse_detections(bytes(map_info.data))
+        finally:
+            buffer.unmap(map_info)
+        with self._lock:
+            if self._caps is None:
+                self._caps = pad.get_current_caps()
+            self.tracker.update(detections, buffer.pts)
+            self.updates += 1
+        return Gst.PadProbeReturn.OK
+
+    def _on_frame(self, pad: "Gst.Pad", info: "Gst.PadProbeInfo") -> "Gst.PadProbeReturn":
+        pts = info.get_buffer().pts
+        with self._lock:
+            if self._caps is None or self._relay is None or pts == Gst.CLOCK_TIME_NONE:
+                return Gst.PadProbeReturn.OK
+            if self._relay.get_property("caps") is None:
+                self._relay.set_property("caps", self._caps)
+            result = Gst.Buffer.new_wrapped(detections_to_json(self.tracker.predict(pts)).encode())
+            result.pts = pts
+            self.predictions += 1
+        self._relay.emit("push-buffer", result)
+        return Gst.PadProbeReturn.OK
+
+    def on_start(self, runner: GstInProcessRunner) -> None:
+        self.tracker.reset()
+        self._caps = None
+        self.updates = self.predictions = 0
+        infer = runner.pipeline.get_by_name(STATS_INFER)
+        frames = runner.pipeline.get_by_name(TRACK_FRAMES)
+        self._relay = runner.pipeline.get_by_name(TRACK_RELAY)
+        if not infer or not frames or not self._relay:
+            print("Tracking: inference, overlay or relay element not found, disabled")
+            self._relay = None
+            return
+        infer.get_static_pad("src").add_probe(Gst.PadProbeType.BUFFER, self._on_result)
+        frames.get_static_pad("src").add_probe(Gst.PadProbeType.BUFFER, self._on_frame)
+
+    def on_stop(self, runner: GstInProcessRunner) -> None:
+        self._relay = None
+        if self.updates:
+            print(
+                f"Tracking: {self.predictions} frames from {self.updates} inference results, "
+                f"{self.tracker.started} tracks"
+            )
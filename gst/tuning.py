@@ -0,0 +1,55 @@
+from typing import NamedTuple
+
+
+class TuningProfile(NamedTuple):
+    """Queue, sink and RTSP settings that trade latency against throughput"""
+
+    infer_queue: list[str]  # queue properties of the inference branch
+    display_queue: list[str]  # queue properties of the display branch
+    sink: list[str]  # display sink properties
+    rtsp_latency: int  # RTSP jitterbuffer latency (ms)
+
+
+# queue size is limited by buffers only
+_BUFFERS_ONLY = ["max-size-bytes=0", "max-size-time=0"]
+
+TUNING_PROFILES: dict[str, TuningProfile] = {
+    # GStreamer's default queues and sink settings, with a generous RTSP jitterbuffer
+    "standard": TuningProfile(
+        infer_queue=[],
+        display_queue=[],
+        sink=[],
+        rtsp_latency=2000,
+    ),
+    # drop everything but the newest frame, display late frames immediately
+    "low-latency": TuningProfile(
+        infer_queue=["leaky=downstream", "max-size-buffers=1", *_BUFFERS_ONLY],
+        display_queue=["leaky=downstream", "max-size-buffers=1", *_BUFFERS_ONLY],
+        sink=["sync=true", "max-lateness=20000000", "qos=true"],
+        rtsp_latency=100,
+    ),
+    # absorb short hiccups, drop frames once a branch falls behind
+    "balanced": TuningProfile(
+        infer_queue=["leaky=downstream", "max-size-buffers=3", *_BUFFERS_ONLY],
+        display_queue=["leaky=downstream", "max-size-buffers=3", *_BUFFERS_ONLY],
+        sink=["sync=true", "max-lateness=40000000", "qos=true"],
+        rtsp_latency=500,
+    ),
+    # never drop frames, run as fast as the slowest branch allows
+    "throughput": TuningProfile(
+        infer_queue=["max-size-buffers=30", *_BUFFERS_ONLY],
+        display_queue=["max-size-buffers=30", *_BUFFERS_ONLY],
+        sink=["sync=false"],
+        rtsp_latency=2000,
+    ),
+}
+DEFAULT_TUNING = "standard"
+
+
+def paced_queue(queue: list[str]) -> list[str]:
+    """
+    Gets the queue properties of a profile for inputs the pipeline paces itself, such as files.
+
+    Such inputs wait for a full queue instead of losing frames, so only the leaky setting is left out.
+    """
+    return [prop for prop in queue if not prop.startswith("leaky=")]
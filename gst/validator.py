@@ -1,18 +1,81 @@
 from typing import Optional
+import json
+import os
 
+from gst.elements import get_codec_elems
 from gst.pipeline import GstPipeline
-from utils.common import InputType, CAM_DEFAULT_WIDTH, CAM_DEFAULT_HEIGHT
+from gst.rtsp import rtsp_src_elems
+from utils.cache import JsonCache
+from utils.common import InputType, CAM_FORMAT, CAM_DEFAULT_WIDTH, CAM_DEFAULT_HEIGHT
+from utils.v4l2 import query_v4l2_caps
+
+# how long a successful validation is trusted for
+VALIDATION_CACHE_TTL = 7 * 24 * 60 * 60
+VALIDATION_CACHE_SIZE = 64
+
+_validation_cache = JsonCache("validation", ttl=VALIDATION_CACHE_TTL, max_entries=VALIDATION_CACHE_SIZE)
 
 
 class GstInputValidator:
-    """Validates input sources by directing output to a fakesink"""
+    """
+    Validates input sources by directing output to a fakesink
 
-    def __init__(self, inp_type: int, num_buffers: int = 10, verbose: int = 1) -> None:
+    Successful validations of files and cameras are cached on disk, so known-good inputs are not validated again
+    unless they change or `revalidate` is set. RTSP streams are always validated, since a stream can go offline
+    or move without its URL changing.
+    """
+
+    def __init__(
+        self,
+        inp_type: int,
+        num_buffers: int = 10,
+        verbose: int = 1,
+        revalidate: bool = False,
+        rtsp_transport: str = "auto",
+    ) -> None:
         self._inp_type = inp_type
         self._num_buffers = num_buffers
         self._verbose = verbose
+        self._revalidate = revalidate
+        self._rtsp_transport = rtsp_transport
         self._val_pipeline = GstPipeline()
 
+    def _cache_key(
+        self,
+        inp_src: str,
+        inp_w: Optional[int],
+        inp_h: Optional[int],
+        inp_codec: Optional[str],
+        codec_elems: Optional[tuple[str, str]],
+    ) -> Optional[str]:
+        """
+        Builds a validation cache key that changes whenever the input source does.
+
+        Returns None if the source can't be identified or may change unnoticed, such as an RTSP stream,
+        in which case it is not cached.
+        """
+        if self._inp_type == InputType.RTSP:
+            return None
+        key: dict[str, object] = {
+            "type": self._inp_type.name,
+            "src": inp_src,
+            "codec": inp_codec,
+            "codec_elems": list(codec_elems) if codec_elems else None,
+            "dims": [inp_w, inp_h],
+        }
+        if self._inp_type == InputType.FILE:
+            try:
+                st = os.stat(inp_src)
+            except OSError:
+                return None
+            key["src"] = os.path.abspath(inp_src)
+            key["file"] = [st.st_size, st.st_mtime_ns]
+        elif self._inp_type == InputType.CAMERA:
+            if not (caps := query_v4l2_caps(inp_src)):
+                return None
+            key["device"] = [caps["driver"], caps["card"], caps["bus_info"]]
+        return json.dumps(key, sort_keys=True)
+
     def validate_input(
         self,
         inp_src: str,
@@ -32,8 +95,16 @@ class GstInputValidator:
             inp_w (int): [Optional] width of input source for camera
             inp_h (int): [Optional] height of input source for camera
             inp_codec (str): [Optional] codec used in compression (for video and RTSP)
-            codec_elems (str): [Optional] Gstreamer elements for codec (for video and RTSP)
+            codec_elems (str): [Optional] Gstreamer elements for codec (for video and RTSP),
+                chosen from the installed decoders for `inp_codec` if not provided
         """
+        if not codec_elems and inp_codec and self._inp_type != InputType.CAMERA:
+            codec_elems = get_codec_elems(inp_codec)
+        cache_key = self._cache_key(inp_src, inp_w, inp_h, inp_codec, codec_elems)
+        if cache_key and not self._revalidate and _validation_cache.get(cache_key):
+            if self._verbose > 0:
+                print("Input OK (cached)")
+            return True
         self._val_pipeline.reset()
         if self._inp_type == InputType.FILE:
             self._val_pipeline.add_elements(
@@ -45,15 +116,11 @@ class GstInputValidator:
         elif self._inp_type == InputType.CAMERA:
             self._val_pipeline.add_elements(
                 ["v4l2src", f"device={inp_src}"],
-                f"video/x-raw,framerate=30/1,format=YUY2,width={inp_w or CAM_DEFAULT_WIDTH},height={inp_h or CAM_DEFAULT_HEIGHT}",
+                f"video/x-raw,framerate=30/1,format={CAM_FORMAT},width={inp_w or CAM_DEFAULT_WIDTH},height={inp_h or CAM_DEFAULT_HEIGHT}",
             )
         elif self._inp_type == InputType.RTSP:
             self._val_pipeline.add_elements(
-                ["rtspsrc", f'location="{inp_src}"', "latency=2000"],
-                "rtpjitterbuffer",
-                ["rtph264depay", "wait-for-keyframe=true"],
-                f"video/x-{inp_codec},width={inp_w},height={inp_h}" if (inp_w and inp_h) else f"video/x-{inp_codec}",
-                *codec_elems,
+                *rtsp_src_elems(inp_src, inp_codec, codec_elems, inp_w, inp_h, transport=self._rtsp_transport)
             )
         self._val_pipeline.add_elements(
             ["fakesink", f"num-buffers={self._num_buffers}"]
@@ -61,9 +128,13 @@ class GstInputValidator:
         if not self._val_pipeline.run(
             "Validating input..." if self._verbose > 0 else "", self._verbose > 1
         ):
+            if cache_key:
+                _validation_cache.remove(cache_key)
             if self._verbose > 0:
                 print("\n" + msg_on_error + "\n")
             return False
+        if cache_key:
+            _validation_cache.set(cache_key, True)
         if self._verbose > 0:
             print("Input OK")
         return True
@@ -2,12 +2,267 @@
 Generate .pyz archive for demo or examples
 """
 
+from functools import lru_cache
 from os import getcwd
 from pathlib import Path
-from shutil import copy2
-from tempfile import TemporaryDirectory
+from typing import Optional
 import argparse
-import zipapp
+import ast
+import hashlib
+import json
+import marshal
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+# directories never bundled into archives
+EXCLUDED_DIRS: frozenset[str] = frozenset({"exec", "examples", "__pycache__"})
+
+# records the content hash each archive was last built from
+BUILD_STATE_FILE = ".pyz_hashes.json"
+
+# bumped whenever archive layout changes, so that existing archives are rebuilt
+BUILD_FORMAT = 1
+
+# fixed timestamp for archive entries, so identical sources give identical archives
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+# bytecode optimization level of release builds, docstrings are kept since they are used as help text
+RELEASE_OPTIMIZE = 1
+
+# .pyc flags of hash based bytecode that is never checked against its source
+PYC_UNCHECKED_HASH = 0b01
+
+# version of the board's Python, which release bytecode is built for
+BOARD_PYTHON_VERSION = "3.10"
+
+# run by the target interpreter: compiles the modules of a marshalled {path: source} dict from stdin,
+# and writes a marshalled {path: .pyc contents} dict to stdout
+PYC_COMPILER = f"""
+import marshal, sys
+from importlib.util import MAGIC_NUMBER, source_hash
+sources = marshal.load(sys.stdin.buffer)
+pycs = {{
+    path: MAGIC_NUMBER
+    + ({PYC_UNCHECKED_HASH}).to_bytes(4, "little")
+    + source_hash(content)
+    + marshal.dumps(compile(content, path, "exec", dont_inherit=True, optimize={RELEASE_OPTIMIZE}))
+    for path, content in sources.items()
+}}
+marshal.dump(pycs, sys.stdout.buffer)
+"""
+
+
+def collect_sources(root: Path) -> dict[str, bytes]:
+    """
+    Reads the modules shared by all targets, keyed by their path relative to `root`.
+
+    Hidden directories, `EXCLUDED_DIRS`, this script and `demo.py` are skipped.
+    """
+    sources: dict[str, bytes] = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith(".") and d not in EXCLUDED_DIRS)
+        rel_dir = Path(dirpath).relative_to(root)
+        for name in sorted(filenames):
+            if not name.endswith(".py"):
+                continue
+            if rel_dir == Path(".") and name in ("demo.py", Path(__file__).name):
+                continue
+            sources[(rel_dir / name).as_posix()] = (Path(dirpath) / name).read_bytes()
+    return sources
+
+
+def get_module_path(module: str, sources: dict[str, bytes]) -> Optional[str]:
+    """
+    Gets the path of a module in `sources`, or None if it isn't one of the bundled modules.
+    """
+    path = module.replace(".", "/")
+    for candidate in (f"{path}.py", f"{path}/__init__.py"):
+        if candidate in sources:
+            return candidate
+    return None
+
+
+def find_reachable_sources(sources: dict[str, bytes], main_src: bytes) -> dict[str, bytes]:
+    """
+    Finds the modules in `sources` that `main_src` imports, directly or through other modules.
+
+    Imports anywhere in a module count, including function level and optional imports.
+    """
+    reachable: dict[str, bytes] = {}
+    pending: list[bytes] = [main_src]
+    while pending:
+        for node in ast.walk(ast.parse(pending.pop())):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                # `from pkg import name` may import a module as well as an attribute
+                modules = [node.module, *(f"{node.module}.{alias.name}" for alias in node.names)]
+            else:
+                continue
+            for module in modules:
+                parts = module.split(".")
+                # importing a module also imports its parent packages
+                for i in range(1, len(parts) + 1):
+                    path = get_module_path(".".join(parts[:i]), sources)
+                    if path and path not in reachable:
+                        reachable[path] = sources[path]
+                        pending.append(sources[path])
+    return reachable
+
+
+@lru_cache(maxsize=4)
+def get_python_version(python: str) -> Optional[str]:
+    """
+    Gets the full version (`sys.version`) of the Python interpreter `python`, or None if it can't be run.
+    """
+    try:
+        res = subprocess.run(
+            [python, "-c", "import sys; print(sys.version)"], capture_output=True, text=True, timeout=30
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return res.stdout.strip() if res.returncode == 0 else None
+
+
+def compile_pycs(sources: dict[str, bytes], python: str) -> dict[str, bytes]:
+    """
+    Compiles modules to .pyc contents with the Python interpreter `python`, so the bytecode matches its version.
+
+    The bytecode is hash based and unchecked, so zipimport uses it without comparing it to the source.
+    Interpreters of other versions reject it by its magic number and fall back to the bundled source.
+    """
+    res = subprocess.run([python, "-c", PYC_COMPILER], input=marshal.dumps(sources), capture_output=True)
+    if res.returncode != 0:
+        raise SystemExit(f"Fatal: compiling bytecode with {python} failed:\n{res.stderr.decode()}")
+    return marshal.loads(res.stdout)
+
+
+def get_build_hash(
+    sources: dict[str, bytes], main_src: bytes, release: bool = False, python: str = sys.executable
+) -> str:
+    digest = hashlib.sha256(f"format {BUILD_FORMAT}\n".encode())
+    if release:
+        digest.update(f"release {get_python_version(python)}\n".encode())
+    for path, content in sorted(sources.items()):
+        digest.update(f"{path}\n{len(content)}\n".encode())
+        digest.update(content)
+    digest.update(b"__main__.py\n")
+    digest.update(main_src)
+    return digest.hexdigest()
+
+
+def build_archive(
+    sources: dict[str, bytes], main_src: bytes, output: Path, release: bool = False, python: str = sys.executable
+) -> None:
+    """
+    Writes a .pyz archive of `sources` with `main_src` as `__main__.py`, replacing `output` atomically.
+
+    Release archives also contain bytecode compiled by the interpreter `python` next to each module.
+    """
+    pycs = compile_pycs({**sources, "__main__.py": main_src}, python) if release else {}
+    fd, tmp = tempfile.mkstemp(dir=output.parent, prefix=output.name)
+    try:
+        with os.fdopen(fd, "wb") as f, zipfile.ZipFile(f, "w") as zf:
+            # zipimport only finds namespace packages through their directory entries
+            for directory in sorted({p.rsplit("/", 1)[0] + "/" for p in sources if "/" in p}):
+                zf.writestr(zipfile.ZipInfo(directory, ZIP_DATE_TIME), b"")
+            for path, content in [*sorted(sources.items()), ("__main__.py", main_src)]:
+                zf.writestr(zipfile.ZipInfo(path, ZIP_DATE_TIME), content)
+                if path in pycs:
+                    zf.writestr(zipfile.ZipInfo(f"{path}c", ZIP_DATE_TIME), pycs[path])
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, output)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_build_state(exec_dir: Path) -> dict[str, str]:
+    try:
+        with open(exec_dir / BUILD_STATE_FILE, "r") as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_build_state(exec_dir: Path, state: dict[str, str]) -> None:
+    with open(exec_dir / BUILD_STATE_FILE, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+
+def measure_import_time(
+    archive: Path, modules: set[str], python: str = sys.executable
+) -> Optional[tuple[float, float]]:
+    """
+    Starts `archive` with `--help` on the interpreter `python` and measures how long importing its bundled
+    modules took.
+
+    Returns:
+        tuple[float, float]: bundled module import time and total startup time (ms), or None if it failed to start
+    """
+    start = time.perf_counter()
+    try:
+        res = subprocess.run(
+            [python, "-X", "importtime", str(archive), "--help"],
+            capture_output=True, text=True, timeout=60,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    startup_ms = (time.perf_counter() - start) * 1000
+    if res.returncode != 0:
+        return None
+    import_us = 0
+    for line in res.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) == 3 and fields[2].strip() in modules and fields[0].strip().isdigit():
+            import_us += int(fields[0])
+    return import_us / 1000, startup_ms
+
+
+def build_target(
+    target: str,
+    cwd: Path,
+    sources: dict[str, bytes],
+    exec_dir: Path,
+    built_hash: Optional[str],
+    force: bool,
+    release: bool = False,
+    python: str = sys.executable,
+) -> tuple[str, Optional[str]]:
+    """
+    Builds the archive for `target` unless it is up to date with `built_hash`.
+
+    Release builds only bundle the modules reachable from the target, with bytecode compiled by the interpreter
+    `python`, and report its import time on that interpreter.
+
+    Returns:
+        tuple[str, str]: the target's content hash, and a status message or None if it was up to date
+    """
+    target_src: Path = cwd / target if target == "demo.py" else cwd / "examples" / target
+    main_src = target_src.read_bytes()
+    if release:
+        sources = find_reachable_sources(sources, main_src)
+    build_hash = get_build_hash(sources, main_src, release, python)
+    output = exec_dir / f"{Path(target).stem}.pyz"
+    if not force and build_hash == built_hash and output.exists():
+        return build_hash, None
+    start = time.perf_counter()
+    build_archive(sources, main_src, output, release, python)
+    status = f"Built .pyz for {target} in {(time.perf_counter() - start) * 1000:.0f} ms"
+    if release:
+        modules = {path.removesuffix(".py").removesuffix("/__init__").replace("/", ".") for path in sources}
+        timing = measure_import_time(output, modules, python)
+        status += f", {len(sources)} modules"
+        status += (
+            f", imports {timing[0]:.1f} ms of {timing[1]:.0f} ms startup" if timing else ", failed to start"
+        )
+    return build_hash, status
 
 
 if __name__ == "__main__":
@@ -30,27 +285,61 @@ if __name__ == "__main__":
         choices=["demo.py", *examples],
         help="Which demo(s) to build ([default] %(choices)s)"
     )
+    parser.add_argument(
+        "-f", "--force",
+        action="store_true",
+        default=False,
+        help="Rebuild targets even if their sources haven't changed"
+    )
+    parser.add_argument(
+        "-r", "--release",
+        action="store_true",
+        default=False,
+        help="Bundle only the modules each target imports, with precompiled bytecode for the board's Python version"
+    )
+    parser.add_argument(
+        "--board_python",
+        type=str,
+        metavar="VERSION",
+        default=BOARD_PYTHON_VERSION,
+        help="Python version of the board, release bytecode only loads on this version (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--python",
+        type=str,
+        metavar="INTERPRETER",
+        help="Python interpreter of the board's version to compile release bytecode with (default: python<VERSION>)"
+    )
     args = parser.parse_args()
 
+    python: str = args.python or f"python{args.board_python}"
+    if args.release:
+        if not (python_version := get_python_version(python)):
+            raise SystemExit(
+                f"Fatal: Python interpreter {python} not found, release bytecode must be compiled by Python "
+                f"{args.board_python}, select its interpreter with --python"
+            )
+        if (found := ".".join(python_version.split()[0].split(".")[:2])) != args.board_python:
+            raise SystemExit(
+                f"Fatal: {python} is Python {found}, but the board runs Python {args.board_python}, "
+                "whose zipimport would ignore the bytecode"
+            )
+
     if not (exec_dir := Path(cwd / "exec")).exists():
         exec_dir.mkdir(exist_ok=True)
 
     targets: list[str] = ["demo.py", *examples] if args.all else args.targets
+    sources: dict[str, bytes] = collect_sources(cwd)
+    state: dict[str, str] = load_build_state(exec_dir)
+    start = time.perf_counter()
+    # archives are stored uncompressed, so building one only takes a few milliseconds and is done serially
     for target in targets:
-        with TemporaryDirectory() as td:
-            td = Path(td) / "demo-python"
-            for f in Path(".").rglob("*"):
-                if str(f.resolve()) == __file__:
-                    continue
-                if f.resolve() == cwd / "demo.py":
-                    continue
-                if cwd / f.parent == cwd / "examples":
-                    continue
-                if f.suffix == ".py":
-                    dst = td / f.parent
-                    dst.mkdir(parents=True, exist_ok=True)
-                    copy2(f, dst)
-            target_src: Path = cwd / target if target == "demo.py" else cwd / "examples" / target
-            copy2(target_src, td / "__main__.py")
-            zipapp.create_archive(td, f"{cwd}/exec/{Path(target).stem}.pyz")
-            print(f"Built .pyz for {target}")
+        build_hash, status = build_target(
+            target, cwd, sources, exec_dir, state.get(target), args.force, args.release, python
+        )
+        print(status or f"{target} is up to date")
+        state[target] = build_hash
+    save_build_state(exec_dir, state)
+    print(f"Finished {len(targets)} targets in {(time.perf_counter() - start) * 1000:.0f} ms")
+    if args.release:
+        print(f"Bytecode built for Python {args.board_python} with {python}, other versions run the bundled sources")
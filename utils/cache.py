@@ -0,0 +1,90 @@
+from pathlib import Path
+from typing import Any, Optional
+import json
+import os
+import tempfile
+import threading
+import time
+
+from utils.common import CACHE_DIR
+
+
+class JsonCache:
+    """
+    Small persistent key-value store backed by a JSON file in the user's cache directory.
+
+    Entries older than `ttl` seconds are treated as missing and dropped on the next write.
+    Once more than `max_entries` are stored, the least recently written entries are evicted.
+    Cache files that are unreadable or corrupt are silently ignored, so a cache never blocks a demo from running.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: Optional[float] = None,
+        max_entries: int = 256,
+        cache_dir: Path = CACHE_DIR,
+    ) -> None:
+        self._path: Path = cache_dir / f"{name}.json"
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._entries: Optional[dict[str, dict[str, Any]]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        if self._entries is None:
+            try:
+                with open(self._path, "r") as f:
+                    entries = json.load(f)
+                self._entries = entries if isinstance(entries, dict) else {}
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def _expired(self, entry: dict[str, Any], now: float) -> bool:
+        return self._ttl is not None and now - entry.get("time", 0) > self._ttl
+
+    def _save(self) -> None:
+        entries = self._entries
+        now = time.time()
+        for key in [k for k, e in entries.items() if self._expired(e, now)]:
+            del entries[key]
+        if len(entries) > self._max_entries:
+            by_age = sorted(entries, key=lambda k: entries[k].get("time", 0))
+            for key in by_age[: len(entries) - self._max_entries]:
+                del entries[key]
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self._path.parent, prefix=self._path.name)
+            with os.fdopen(fd, "w") as f:
+                json.dump(entries, f, indent=1)
+            os.replace(tmp, self._path)
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Returns the value stored for `key`, or None if missing or expired.
+        """
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is None or self._expired(entry, time.time()):
+                return None
+            return entry.get("value")
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Stores a JSON-serializable value for `key` and writes the cache to disk.
+        """
+        with self._lock:
+            self._load()[key] = {"time": time.time(), "value": value}
+            self._save()
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                self._save()
@@ -1,21 +1,126 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import NamedTuple, Optional
+import time
+
 from gst.validator import GstInputValidator
 from utils.common import InputType, CAM_DEV_PREFIX, CAM_DEFAULT_WIDTH, CAM_DEFAULT_HEIGHT
+from utils.v4l2 import V4L2_SYSFS_DIR, query_v4l2_caps, is_capture_device
+
+
+class CameraProbe(NamedTuple):
+    """Result of validating a single camera device"""
+
+    device: str
+    valid: bool
+    elapsed: float  # seconds
+
+
+def list_capture_devices() -> Optional[list[str]]:
+    """
+    Lists capture device nodes registered in sysfs, ordered by device number.
+
+    Returns None if sysfs is unavailable, in which case callers should fall back to probing
+    "/dev/video0" - "/dev/video9".
+    """
+    sysfs = Path(V4L2_SYSFS_DIR)
+    if not sysfs.is_dir():
+        return None
+    devices: list[str] = []
+    nodes = [n for n in sysfs.glob("video*") if n.name[5:].isdigit()]
+    for node in sorted(nodes, key=lambda n: int(n.name[5:])):
+        # only the first node (index 0) of a device streams video, the others carry metadata
+        try:
+            if int((node / "index").read_text().strip()) != 0:
+                continue
+        except (OSError, ValueError):
+            pass
+        device = CAM_DEV_PREFIX + node.name[5:]
+        caps = query_v4l2_caps(device)
+        if caps is not None and not is_capture_device(caps):
+            continue
+        devices.append(device)
+    return devices
+
+
+def _probe_camera(device: str, inp_w: int, inp_h: int, revalidate: bool) -> CameraProbe:
+    # validators hold pipeline state, so each probe needs its own
+    val = GstInputValidator(inp_type=InputType.CAMERA, verbose=0, revalidate=revalidate)
+    start = time.perf_counter()
+    valid = val.validate_input(device, "", inp_w=inp_w, inp_h=inp_h)
+    return CameraProbe(device, valid, time.perf_counter() - start)
+
+
+def _first_valid_known(candidates: list[str], results: list[CameraProbe]) -> bool:
+    """
+    Checks if the first usable device in `candidates` order is known from `results`.
+    """
+    probed = {r.device: r.valid for r in results}
+    for device in candidates:
+        if device not in probed:
+            return False
+        if probed[device]:
+            return True
+    return False
+
+
+def probe_camera_devices(
+    inp_w: int = CAM_DEFAULT_WIDTH,
+    inp_h: int = CAM_DEFAULT_HEIGHT,
+    *,
+    first_only: bool = False,
+    max_workers: int = 4,
+    revalidate: bool = False,
+) -> list[CameraProbe]:
+    """
+    Validates candidate camera devices concurrently.
+
+    Candidates are taken from sysfs when available so that non-capture nodes are never probed.
+    If `first_only` is set, probing stops once the lowest numbered usable device is known, i.e. a device is usable
+    and every candidate before it has been probed. Probes not yet started are cancelled, running ones are waited for.
+
+    Returns:
+        list[CameraProbe]: results for every device probed, in completion order.
+    """
+    if not inp_w > 0 or not inp_h > 0:
+        raise ValueError("Invalid camera input dimensions")
+    candidates = list_capture_devices()
+    if candidates is None:
+        candidates = [CAM_DEV_PREFIX + str(i) for i in range(10)]
+    if not candidates:
+        return []
+    results: list[CameraProbe] = []
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(candidates))))
+    try:
+        pending = {executor.submit(_probe_camera, dev, inp_w, inp_h, revalidate) for dev in candidates}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            results.extend(f.result() for f in done)
+            if first_only and _first_valid_known(candidates, results):
+                break
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return results
 
 
 def find_valid_camera_devices(
     inp_w: int = CAM_DEFAULT_WIDTH,
     inp_h: int = CAM_DEFAULT_HEIGHT,
+    *,
+    first_only: bool = False,
+    report: bool = False,
+    revalidate: bool = False,
 ) -> list[str]:
     """
     Attempts to find a connected camera.
 
     Only works for devices with format "dev/videoX".
+    Set `report` to print how long each device took to probe.
+    Previously validated devices are reused from the validation cache unless `revalidate` is set.
     """
-    if not inp_w > 0 or not inp_h > 0:
-        raise ValueError("Invalid camera input dimensions")
-    val = GstInputValidator(inp_type=InputType.CAMERA, verbose=0)
-    valid_devs: list[str] = []
-    for i in range(10):
-        if val.validate_input(CAM_DEV_PREFIX + str(i), "", inp_w=inp_w, inp_h=inp_h):
-            valid_devs.append(CAM_DEV_PREFIX + str(i))
-    return valid_devs
+    results = probe_camera_devices(inp_w, inp_h, first_only=first_only, revalidate=revalidate)
+    if report:
+        for res in sorted(results, key=lambda r: r.elapsed):
+            print(f"  {res.device}: {'OK' if res.valid else 'unusable'} ({res.elapsed * 1000:.0f} ms)")
+    valid = [r.device for r in results if r.valid]
+    return sorted(valid, key=lambda d: int(d[len(CAM_DEV_PREFIX):]))
@@ -1,11 +1,20 @@
 from enum import Enum, auto
+from os import environ
+from pathlib import Path
 from typing import Final
 
 # synap metadata file
 INF_META_FILE: Final = "0/model.json"
 
+# persistent cache location
+CACHE_DIR: Final = Path(environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "demo-python"
+
+# saved run profiles location
+PROFILE_DIR: Final = Path(environ.get("XDG_CONFIG_HOME") or Path.home() / ".config") / "demo-python" / "profiles"
+
 # camera specific constants
 CAM_DEV_PREFIX = "/dev/video"
+CAM_FORMAT = "YUY2"
 CAM_DEFAULT_WIDTH = 640
 CAM_DEFAULT_HEIGHT = 480
 
@@ -1,37 +1,161 @@
-from typing import Optional
+from pathlib import Path
+from typing import Any, NamedTuple, Optional
+import hashlib
 import json
+import os
 import zipfile
 
+from utils.cache import JsonCache
 from utils.common import INF_META_FILE
 
+# label file used by synapoverlay, searched for in the model's parent directories
+MODEL_LABEL_FILE = "info.json"
 
-def get_model_input_dims(model: str) -> Optional[tuple[int, int]]:
+_model_cache = JsonCache("models", max_entries=64)
+_hash_cache = JsonCache("model_hashes", max_entries=64)
+
+
+class ModelInfo(NamedTuple):
+    """Input and output details of a SyNAP model, parsed from its metadata"""
+
+    width: int
+    height: int
+    layout: str  # "nhwc" or "nchw"
+    dtype: Optional[str]
+    shape: list[int]
+    outputs: list[dict[str, Any]]  # name, shape and format of each output
+    labels: Optional[str]  # label file found next to the model, if any, looked up on every call
+
+
+def get_model_hash(model: str) -> Optional[str]:
     """
-    Attempts to find model input dimensions by parsing .synap file.
+    Gets the SHA-256 hash of a model file's contents.
+
+    Hashes are remembered by path, size and modification time so unchanged files aren't read again.
+    Returns None if the file can't be read.
     """
     try:
-        with zipfile.ZipFile(model, "r") as mod_info:
-            if INF_META_FILE not in mod_info.namelist():
-                raise FileNotFoundError("Missing model metadata")
-            with mod_info.open(INF_META_FILE, "r") as meta_f:
-                metadata = json.load(meta_f)
-                inputs = metadata["Inputs"]
-                if len(inputs) > 1:
-                    raise NotImplementedError("Multiple input models not supported")
-                input_info = inputs[list(inputs.keys())[0]]
-                if input_info["format"] == "nhwc":
-                    inp_w, inp_h = input_info["shape"][2], input_info["shape"][1]
-                elif input_info["format"] == "nchw":
-                    inp_w, inp_h = input_info["shape"][3], input_info["shape"][2]
-                else:
-                    raise ValueError(
-                        f"Invalid metadata: unknown format \"{input_info['format']}\""
-                    )
-                # print(f"Extracted model input size: {inp_w}x{inp_h}")
-                return inp_w, inp_h
+        st = os.stat(model)
+    except OSError:
+        return None
+    key = os.path.abspath(model)
+    stat_sig = [st.st_size, st.st_mtime_ns]
+    if (entry := _hash_cache.get(key)) and entry.get("stat") == stat_sig:
+        return entry["sha256"]
+    digest = hashlib.sha256()
+    try:
+        with open(model, "rb") as f:
+            while chunk := f.read(1 << 20):
+                digest.update(chunk)
+    except OSError:
+        return None
+    _hash_cache.set(key, {"stat": stat_sig, "sha256": digest.hexdigest()})
+    return digest.hexdigest()
+
+
+def _find_label_file(model: str) -> Optional[str]:
+    parent = Path(model).resolve().parent
+    for directory in [parent, *parent.parents][:3]:
+        if (labels := directory / MODEL_LABEL_FILE).is_file():
+            return str(labels)
+    return None
+
+
+def _parse_model_info(model: str) -> ModelInfo:
+    """
+    Parses model details from the metadata in a .synap file.
+    """
+    with zipfile.ZipFile(model, "r") as mod_info:
+        if INF_META_FILE not in mod_info.namelist():
+            raise FileNotFoundError("Missing model metadata")
+        with mod_info.open(INF_META_FILE, "r") as meta_f:
+            metadata = json.load(meta_f)
+    inputs = metadata["Inputs"]
+    if len(inputs) > 1:
+        raise NotImplementedError("Multiple input models not supported")
+    input_info = inputs[list(inputs.keys())[0]]
+    if input_info["format"] == "nhwc":
+        inp_w, inp_h = input_info["shape"][2], input_info["shape"][1]
+    elif input_info["format"] == "nchw":
+        inp_w, inp_h = input_info["shape"][3], input_info["shape"][2]
+    else:
+        raise ValueError(f"Invalid metadata: unknown format \"{input_info['format']}\"")
+    outputs = [
+        {"name": name, "shape": out.get("shape"), "format": out.get("format")}
+        for name, out in metadata.get("Outputs", {}).items()
+    ]
+    return ModelInfo(
+        width=inp_w,
+        height=inp_h,
+        layout=input_info["format"],
+        dtype=input_info.get("dtype"),
+        shape=input_info["shape"],
+        outputs=outputs,
+        labels=_find_label_file(model),
+    )
+
+
+def get_model_info(model: str) -> Optional[ModelInfo]:
+    """
+    Gets model details, from the model registry if this exact model file has been parsed before.
+
+    The registry is keyed by the hash of the model contents, so a changed model file is parsed again.
+    The label file depends on where the model is, not on its contents, so it is looked up again every time.
+    Returns None and prints the reason if the model is invalid.
+    """
+    model_hash = get_model_hash(model)
+    if model_hash and (entry := _model_cache.get(model_hash)) and "info" in entry:
+        try:
+            return ModelInfo(**{**entry["info"], "labels": _find_label_file(model)})
+        except TypeError:
+            # written by a version with different fields, parse the model again
+            pass
+    try:
+        info = _parse_model_info(model)
     except (zipfile.BadZipFile, FileNotFoundError):
         print(f"\nInvalid SyNAP model: {model}\n")
+        return None
     except KeyError as e:
         print(f'\nMissing model metadata "{e.args[0]}"\nInvalid SyNAP model: {model}\n')
+        return None
     except (NotImplementedError, ValueError) as e:
         print(f"\n{e.args[0]}\nInvalid SyNAP model: {model}\n")
+        return None
+    if model_hash:
+        cached = {field: value for field, value in info._asdict().items() if field != "labels"}
+        _model_cache.set(model_hash, {**(_model_cache.get(model_hash) or {}), "info": cached})
+    return info
+
+
+def is_model_validated(model: str) -> bool:
+    """
+    Checks if this exact model file has passed validation with `synap_cli` before.
+    """
+    model_hash = get_model_hash(model)
+    return bool(model_hash and (entry := _model_cache.get(model_hash)) and entry.get("valid"))
+
+
+def set_model_validated(model: str, valid: bool = True) -> None:
+    """
+    Records the `synap_cli` validation result of a model file in the model registry.
+    """
+    if model_hash := get_model_hash(model):
+        _model_cache.set(model_hash, {**(_model_cache.get(model_hash) or {}), "valid": valid})
+
+
+def get_model_input_dims(model: str) -> Optional[tuple[int, int]]:
+    """
+    Attempts to find model input dimensions by parsing .synap file.
+    """
+    if info := get_model_info(model):
+        return info.width, info.height
+    return None
+
+
+def get_model_label_file(model: str) -> Optional[str]:
+    """
+    Attempts to find the label file of a model, searched for in the model's parent directories.
+    """
+    if info := get_model_info(model):
+        return info.labels
+    return None
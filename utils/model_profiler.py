@@ -0,0 +1,242 @@
+"""
+Profile SyNAP models on the NPU.
+
+Runs each model with random input through `synap_cli` and reports its load time, per-inference latency
+percentiles and sustained inferences per second, as a comparison table and optionally as JSON.
+"""
+
+from math import ceil
+from pathlib import Path
+from typing import Any, Optional
+import argparse
+import json
+import platform
+import re
+import statistics
+import subprocess
+import sys
+
+from utils.cache import JsonCache
+from utils.model_info import get_model_hash, get_model_info
+
+# per-inference timing and final timings summary lines printed by `synap_cli`
+_PREDICT_RE = re.compile(r"Predict #\d+:\s*([\d.]+)\s*ms")
+_TIMINGS_RE = re.compile(r"(load|init|median|mean):\s*([\d.]+)")
+
+# board name exposed by the device tree
+BOARD_MODEL_FILE = "/proc/device-tree/model"
+
+# share of a model's standalone inference rate expected to be available inside a demo pipeline
+SELECT_HEADROOM = 0.8
+
+# inferences used to profile candidate models for selection
+SELECT_ITERATIONS = 20
+SELECT_WARMUP = 3
+
+_profile_cache = JsonCache("model_profiles", max_entries=128)
+
+
+def find_models(paths: list[str]) -> list[str]:
+    """
+    Expands directories in `paths` to the .synap models they contain, in sorted order.
+    """
+    models: list[str] = []
+    for path in paths:
+        if Path(path).is_dir():
+            models.extend(sorted(str(p) for p in Path(path).rglob("*.synap")))
+        else:
+            models.append(path)
+    return models
+
+
+def profile_model(model: str, iterations: int = 50, warmup: int = 5) -> Optional[dict[str, Any]]:
+    """
+    Runs `model` for `warmup` + `iterations` inferences and measures the last `iterations`.
+
+    Returns:
+        dict: model input details, load time (ms), latency avg/p50/p90/p99 (ms) and inferences per second,
+        or None if the model is invalid or `synap_cli` failed
+    """
+    if not (info := get_model_info(model)):
+        return None
+    try:
+        # fmt: off
+        res = subprocess.run(
+            [
+                "synap_cli",
+                "-m", model,
+                "-r", str(warmup + iterations),
+                "random"
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        # fmt: on
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"\nERROR: Failed to profile {model}: {getattr(e, 'stderr', None) or e}\n")
+        return None
+    latencies = [float(ms) for ms in _PREDICT_RE.findall(res.stdout)][warmup:]
+    timings = {name: float(ms) for name, ms in _TIMINGS_RE.findall(res.stdout)}
+    row: dict[str, Any] = {
+        "model": model,
+        "input": f"{info.width}x{info.height}",
+        "layout": info.layout,
+        "dtype": info.dtype,
+        "load_ms": timings.get("load"),
+        "init_ms": timings.get("init"),
+        "iterations": len(latencies),
+    }
+    if len(latencies) >= 2:
+        pcts = statistics.quantiles(latencies, n=100, method="inclusive")
+        row.update(
+            {
+                "avg_ms": round(statistics.fmean(latencies), 2),
+                "p50_ms": round(pcts[49], 2),
+                "p90_ms": round(pcts[89], 2),
+                "p99_ms": round(pcts[98], 2),
+                "inferences_per_s": round(len(latencies) * 1000 / sum(latencies), 2),
+            }
+        )
+    elif "mean" in timings:
+        # per-inference timings not printed, only the summary over all runs including warmup is available
+        row.update(
+            {
+                "avg_ms": timings["mean"],
+                "p50_ms": timings.get("median"),
+                "inferences_per_s": round(1000 / timings["mean"], 2) if timings["mean"] else None,
+            }
+        )
+    return row
+
+
+def get_board_id() -> str:
+    """
+    Identifies the board model profiles were measured on, from the device tree if available.
+    """
+    try:
+        with open(BOARD_MODEL_FILE, "r") as f:
+            if board := f.read().strip("\x00\n "):
+                return board
+    except OSError:
+        pass
+    return f"{platform.machine()}:{platform.node()}"
+
+
+def get_model_profile(model: str) -> Optional[dict[str, Any]]:
+    """
+    Gets a short profile of `model` on this board, measuring it only if this exact model hasn't been profiled here before.
+    """
+    model_hash = get_model_hash(model)
+    key = f"{get_board_id()}:{model_hash}"
+    if model_hash and (row := _profile_cache.get(key)):
+        return {**row, "model": model}
+    print(f"Profiling {model}...")
+    if (row := profile_model(model, SELECT_ITERATIONS, SELECT_WARMUP)) and model_hash:
+        _profile_cache.set(key, row)
+    return row
+
+
+def select_model(model_dir: str, target_fps: float, max_skip: int = 8) -> Optional[tuple[str, int]]:
+    """
+    Selects the most accurate model in `model_dir` that keeps up with `target_fps`, and the inference skip to run it with.
+
+    Lower inference skips are preferred, and among the models that keep up with the lowest possible skip, the one
+    with the largest input (then the largest file) is assumed to be the most accurate.
+    Profiles are cached per board and model, so only new or changed models are measured.
+
+    Returns:
+        tuple[str, int]: selected model and inference skip, or None if no model in `model_dir` could be profiled
+    """
+    rows = [row for model in find_models([model_dir]) if (row := get_model_profile(model))]
+    rows = [row for row in rows if row.get("inferences_per_s")]
+    if not rows:
+        print(f"\nERROR: No usable SyNAP models found in {model_dir}\n")
+        return None
+
+    def accuracy(row: dict[str, Any]) -> tuple[int, int]:
+        w, h = (int(d) for d in row["input"].split("x"))
+        return w * h, Path(row["model"]).stat().st_size
+
+    def min_skip(row: dict[str, Any]) -> int:
+        return max(ceil(target_fps / (row["inferences_per_s"] * SELECT_HEADROOM)), 1)
+
+    print_profiles(rows)
+    if fitting := [row for row in rows if min_skip(row) <= max_skip]:
+        best = min(fitting, key=lambda r: (min_skip(r), tuple(-v for v in accuracy(r))))
+    else:
+        best = max(rows, key=lambda r: r["inferences_per_s"])
+        print(f"No model keeps up with {target_fps:g} fps within inference skip {max_skip}, using the fastest")
+    skip = min(min_skip(best), max_skip)
+    print(f"\nSelected {best['model']} with inference skip {skip} for {target_fps:g} fps")
+    return best["model"], skip
+
+
+def print_profiles(rows: list[dict[str, Any]]) -> None:
+    print(
+        f"\n{'model':<60} {'input':>9} {'load ms':>8} {'avg ms':>7} {'p50 ms':>7} {'p99 ms':>7} {'inf/s':>7}"
+    )
+    for row in sorted(rows, key=lambda r: r.get("avg_ms") or float("inf")):
+        print(
+            f"{row['model'][-60:]:<60} {row['input']:>9} {row.get('load_ms') or '-':>8} {row.get('avg_ms') or '-':>7} "
+            f"{row.get('p50_ms') or '-':>7} {row.get('p99_ms') or '-':>7} {row.get('inferences_per_s') or '-':>7}"
+        )
+
+
+def main(args: argparse.Namespace) -> None:
+    if not (models := find_models(args.models)):
+        raise SystemExit("Fatal: no SyNAP models found")
+    rows: list[dict[str, Any]] = []
+    try:
+        for model in models:
+            print(f"Profiling {model}...")
+            if row := profile_model(model, args.iterations, args.warmup):
+                rows.append(row)
+    except KeyboardInterrupt:
+        print("\nProfiling interrupted, reporting completed models")
+    if not rows:
+        sys.exit(1)
+    print_profiles(rows)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\nSaved model profiles to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "-m",
+        "--models",
+        type=str,
+        nargs="+",
+        required=True,
+        metavar="PATH",
+        help="SyNAP model files, or directories to search for models",
+    )
+    parser.add_argument(
+        "-r",
+        "--iterations",
+        type=int,
+        default=50,
+        metavar="N",
+        help="Number of measured inferences per model (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-w",
+        "--warmup",
+        type=int,
+        default=5,
+        metavar="N",
+        help="Number of inferences to run before measuring (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        metavar="FILE",
+        help="Save profiles to FILE as JSON",
+    )
+    args = parser.parse_args()
+
+    main(args)
@@ -0,0 +1,70 @@
+from pathlib import Path
+from typing import Any, Optional
+import json
+import os
+import re
+import tempfile
+
+from utils.common import PROFILE_DIR
+
+# command line arguments that only apply to a single run and aren't saved in profiles
+PROFILE_EXCLUDED_ARGS: tuple[str, ...] = ("profile", "save_profile", "dry_run", "revalidate")
+
+
+def get_profile_path(name: str, profile_dir: Path = PROFILE_DIR) -> Path:
+    """
+    Gets the file a run profile is stored in.
+
+    Raises:
+        ValueError: if `name` isn't a valid profile name
+    """
+    if not re.fullmatch(r"[\w.-]+", name) or name.startswith("."):
+        raise ValueError(f'Invalid profile name "{name}", use letters, digits, ".", "-" and "_" only')
+    return profile_dir / f"{name}.json"
+
+
+def list_run_profiles(profile_dir: Path = PROFILE_DIR) -> list[str]:
+    return sorted(p.stem for p in profile_dir.glob("*.json"))
+
+
+def load_run_profile(name: str, profile_dir: Path = PROFILE_DIR) -> Optional[dict[str, Any]]:
+    """
+    Loads the command line arguments saved in a run profile.
+
+    Returns None and prints the reason if the profile is missing or invalid.
+    """
+    try:
+        with open(get_profile_path(name, profile_dir), "r") as f:
+            profile = json.load(f)
+        if not isinstance(profile, dict):
+            raise ValueError("Invalid profile contents")
+        return profile
+    except FileNotFoundError:
+        available = ", ".join(list_run_profiles(profile_dir)) or "none"
+        print(f'\nERROR: Profile "{name}" not found (available: {available})\n')
+    except (OSError, ValueError) as e:
+        print(f'\nERROR: Failed to load profile "{name}": {e}\n')
+    return None
+
+
+def save_run_profile(name: str, args: dict[str, Any], profile_dir: Path = PROFILE_DIR) -> bool:
+    """
+    Saves command line arguments as a run profile, replacing any existing profile with the same name.
+
+    Arguments in `PROFILE_EXCLUDED_ARGS` are left out.
+
+    Returns:
+        bool: True if the profile was saved, False if there was an error.
+    """
+    try:
+        path = get_profile_path(name, profile_dir)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name)
+        with os.fdopen(fd, "w") as f:
+            json.dump({k: v for k, v in args.items() if k not in PROFILE_EXCLUDED_ARGS}, f, indent=2)
+        os.replace(tmp, path)
+        print(f'Saved profile "{name}" to {path}')
+        return True
+    except (OSError, ValueError) as e:
+        print(f'\nERROR: Failed to save profile "{name}": {e}\n')
+        return False
@@ -2,9 +2,13 @@ from argparse import ArgumentTypeError
 from typing import Optional
 import subprocess
 
+from gst.elements import DECODERS, get_codec_elems
+from gst.tiling import TILE_MAX_COUNT
 from gst.validator import GstInputValidator
 from utils.camera import find_valid_camera_devices
 from utils.common import InputType, CAM_DEV_PREFIX, CAM_DEFAULT_WIDTH, CAM_DEFAULT_HEIGHT
+from utils.model_info import is_model_validated, set_model_validated
+from utils.video_info import get_video_file_info
 
 
 __all__ = [
@@ -16,14 +20,10 @@ __all__ = [
     "get_inp_src_info",
     "get_inf_model",
     "validate_inp_dims",
+    "validate_roi",
+    "validate_tile_grid",
 ]
 
-CODECS: dict[str, tuple[str, str]] = {
-    "av1": ("av1parse", "v4l2av1dec"),
-    "h264": ("h264parse", "avdec_h264"),
-    "h265": ("h265parse", "avdec_h265"),
-}
-
 
 def get_dims(prompt: str, inp_dims: Optional[str]) -> tuple[int, int]:
     """
@@ -111,11 +111,17 @@ def get_inp_src_info(
     inp_h: Optional[int],
     inp_src: Optional[str],
     inp_codec: Optional[str],
+    revalidate: bool = False,
+    rtsp_transport: str = "auto",
 ) -> Optional[tuple[int, str, str, tuple[str, str]]]:
     """
     Gets codec details from a provided input source.
 
     Prompts user for missing information and also validates the input source.
+    Cached validation results are ignored if `revalidate` is set.
+
+    The codec of MP4 / QuickTime files is read from the container if `inp_codec` is None or "auto",
+    a codec given by the user is always kept.
     """
     inp_src: str = inp_src or input("Input source: ")
     try:
@@ -123,14 +129,18 @@ def get_inp_src_info(
     except FileNotFoundError:
         print(f"\nERROR: Invalid input source \"{inp_src}\"\n")
         return None
-    gst_val: GstInputValidator = GstInputValidator(inp_type)
+    gst_val: GstInputValidator = GstInputValidator(
+        inp_type, revalidate=revalidate, rtsp_transport=rtsp_transport
+    )
     codec_elems: Optional[tuple[str, str]] = None
     try:
         if inp_type == InputType.CAMERA:
             inp_codec = None
             if inp_src.lower() == "auto":
                 print("Finding valid camera device...")
-                valid_devs = find_valid_camera_devices(inp_w or CAM_DEFAULT_WIDTH, inp_h or CAM_DEFAULT_HEIGHT)
+                valid_devs = find_valid_camera_devices(
+                    inp_w or CAM_DEFAULT_WIDTH, inp_h or CAM_DEFAULT_HEIGHT, first_only=True, report=True, revalidate=revalidate
+                )
                 if not valid_devs:
                     print("\nNo camera connected to board\n")
                     return None
@@ -141,10 +151,19 @@ def get_inp_src_info(
                 f'ERROR: Invalid camera "{inp_src}", use `v4l2-ctl --list-devices` to verify device'
             )
         elif inp_type == InputType.FILE or inp_type == InputType.RTSP:
+            if (
+                inp_type == InputType.FILE
+                and inp_codec in (None, "auto")
+                and (file_info := get_video_file_info(inp_src))
+            ):
+                inp_codec = file_info[0]
+                print(f"Detected {inp_codec} video ({file_info[1]}x{file_info[2]})")
+            elif inp_codec == "auto":
+                inp_codec = None if inp_type == InputType.FILE else "h264"
             inp_codec = inp_codec or (
                 input("[Optional] Codec [av1 / h264 (default) / h265]: ") or "h264"
             )
-            codec_elems = CODECS[inp_codec]
+            codec_elems = get_codec_elems(inp_codec)
             msg_on_error: str = (
                 f'ERROR: Invalid input video file "{inp_src}", check source and codec'
             ) if inp_type == InputType.FILE else (
@@ -164,20 +183,24 @@ def get_inp_src_info(
             return inp_type, inp_src, inp_codec, codec_elems
     except KeyError:
         print(
-            f'\nERROR: Invalid codec "{inp_codec}", choose from [av1 / h264 / h265]\n'
+            f'\nERROR: Invalid codec "{inp_codec}", choose from [{" / ".join(DECODERS)}]\n'
         )
 
 
-def get_inf_model(model: Optional[str]) -> str:
+def get_inf_model(model: Optional[str], revalidate: bool = False) -> str:
     """
     Gets a valid model by verifying model with synap_cli.
 
+    Models that passed validation before are looked up in the model registry instead, unless `revalidate` is set.
     Prompts user for model file if `model` is None.
     """
     while True:
         try:
             if not model:
                 model: str = input("Model file path: ")
+            if not revalidate and is_model_validated(model):
+                print("Model OK (validated before)")
+                return model
             print("Validating model...")
             # fmt: off
             subprocess.run(
@@ -190,6 +213,7 @@ def get_inf_model(model: Optional[str]) -> str:
                 capture_output=True
             )
             # fmt: on
+            set_model_validated(model)
             print("Model OK")
             return model
         except subprocess.CalledProcessError as e:
@@ -215,3 +239,33 @@ def validate_inp_dims(dims: Optional[str]) -> str:
         raise ArgumentTypeError(
             "Input size must be WIDTHxHEIGHT, where both are integers."
         )
+
+
+def validate_roi(roi: str) -> tuple[int, int, int, int]:
+    """
+    Helper function to validate a region of interest from a command line arg.
+    """
+    try:
+        x, y, width, height = [int(v) for v in roi.split(",")]
+    except ValueError:
+        raise ArgumentTypeError("Region of interest must be X,Y,WIDTH,HEIGHT, where all are integers.")
+    if x < 0 or y < 0 or width <= 0 or height <= 0:
+        raise ArgumentTypeError("Region of interest must have a non-negative origin and a positive size.")
+    return x, y, width, height
+
+
+def validate_tile_grid(grid: str) -> tuple[int, int]:
+    """
+    Helper function to validate a tile grid from a command line arg.
+    """
+    try:
+        cols, rows = [int(v) for v in grid.split("x")]
+    except ValueError:
+        raise ArgumentTypeError("Tile grid must be COLSxROWS, where both are integers.")
+    if cols <= 0 or rows <= 0:
+        raise ArgumentTypeError("Both columns and rows must be positive integers.")
+    if cols * rows > TILE_MAX_COUNT:
+        raise ArgumentTypeError(
+            f"{cols}x{rows} tiles exceed the limit of {TILE_MAX_COUNT}, each tile is one more inference per frame."
+        )
+    return cols, rows
@@ -0,0 +1,55 @@
+from typing import Optional
+import fcntl
+import os
+import struct
+
+# sysfs directory listing V4L2 device nodes
+V4L2_SYSFS_DIR = "/sys/class/video4linux"
+
+# VIDIOC_QUERYCAP = _IOR('V', 0, struct v4l2_capability), struct is 104 bytes
+VIDIOC_QUERYCAP = 0x80685600
+V4L2_CAP_STRUCT = struct.Struct("16s32s32sIII12x")
+V4L2_CAP_VIDEO_CAPTURE = 0x00000001
+V4L2_CAP_VIDEO_CAPTURE_MPLANE = 0x00001000
+V4L2_CAP_VIDEO_M2M_MPLANE = 0x00004000
+V4L2_CAP_VIDEO_M2M = 0x00008000
+V4L2_CAP_DEVICE_CAPS = 0x80000000
+
+
+def query_v4l2_caps(device: str) -> Optional[dict[str, str | int]]:
+    """
+    Queries V4L2 capabilities of a device node with VIDIOC_QUERYCAP.
+
+    Returns None if the device can't be opened or doesn't support the ioctl.
+    """
+    try:
+        fd = os.open(device, os.O_RDWR | os.O_NONBLOCK)
+    except OSError:
+        return None
+    try:
+        buf = bytearray(V4L2_CAP_STRUCT.size)
+        fcntl.ioctl(fd, VIDIOC_QUERYCAP, buf)
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+    driver, card, bus_info, version, caps, dev_caps = V4L2_CAP_STRUCT.unpack(buf)
+    return {
+        "driver": driver.split(b"\0", 1)[0].decode(errors="replace"),
+        "card": card.split(b"\0", 1)[0].decode(errors="replace"),
+        "bus_info": bus_info.split(b"\0", 1)[0].decode(errors="replace"),
+        "version": version,
+        "capabilities": dev_caps if caps & V4L2_CAP_DEVICE_CAPS else caps,
+    }
+
+
+def is_capture_device(caps: dict[str, str | int]) -> bool:
+    """
+    Checks if V4L2 capabilities describe a video capture device.
+
+    Memory-to-memory devices (e.g. hardware codecs) also report capture capabilities and are excluded.
+    """
+    flags: int = caps["capabilities"]
+    if flags & (V4L2_CAP_VIDEO_M2M | V4L2_CAP_VIDEO_M2M_MPLANE):
+        return False
+    return bool(flags & (V4L2_CAP_VIDEO_CAPTURE | V4L2_CAP_VIDEO_CAPTURE_MPLANE))
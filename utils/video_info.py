@@ -0,0 +1,150 @@
+from functools import lru_cache
+from typing import Iterator, Optional
+import mmap
+import struct
+
+# sample entry types mapped to the codec names used by `gst.elements.DECODERS`
+MP4_CODEC_TYPES: dict[bytes, str] = {
+    b"avc1": "h264",
+    b"avc3": "h264",
+    b"hvc1": "h265",
+    b"hev1": "h265",
+    b"av01": "av1",
+}
+
+_ATOM_HEADER = struct.Struct(">I4s")
+_ATOM_SIZE64 = struct.Struct(">Q")
+_U16 = struct.Struct(">H")
+_U32 = struct.Struct(">I")
+_STTS_ENTRY = struct.Struct(">II")
+
+
+def _iter_atoms(buf: mmap.mmap, start: int, end: int) -> Iterator[tuple[bytes, int, int]]:
+    """
+    Yields (type, payload start, atom end) for each atom in `buf[start:end]`.
+    """
+    pos = start
+    while pos + _ATOM_HEADER.size <= end:
+        size, atom_type = _ATOM_HEADER.unpack_from(buf, pos)
+        header = _ATOM_HEADER.size
+        if size == 1:
+            if pos + header + _ATOM_SIZE64.size > end:
+                return
+            size = _ATOM_SIZE64.unpack_from(buf, pos + header)[0]
+            header += _ATOM_SIZE64.size
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            return
+        yield atom_type, pos + header, pos + size
+        pos += size
+
+
+def _find_atom(buf: mmap.mmap, start: int, end: int, atom_type: bytes) -> Optional[tuple[int, int]]:
+    for a_type, a_start, a_end in _iter_atoms(buf, start, end):
+        if a_type == atom_type:
+            return a_start, a_end
+    return None
+
+
+def _find_path(buf: mmap.mmap, start: int, end: int, *path: bytes) -> Optional[tuple[int, int]]:
+    for atom_type in path:
+        if not (atom := _find_atom(buf, start, end, atom_type)):
+            return None
+        start, end = atom
+    return start, end
+
+
+def _find_video_mdia(buf: mmap.mmap, start: int, end: int) -> Optional[tuple[int, int]]:
+    """
+    Gets the media atom of a track, if it is a video track.
+    """
+    if not (mdia := _find_atom(buf, start, end, b"mdia")):
+        return None
+    # hdlr: version/flags (4), pre_defined (4), handler_type (4)
+    hdlr = _find_atom(buf, *mdia, b"hdlr")
+    if not hdlr or hdlr[1] - hdlr[0] < 12 or buf[hdlr[0] + 8 : hdlr[0] + 12] != b"vide":
+        return None
+    return mdia
+
+
+def _parse_video_trak(buf: mmap.mmap, start: int, end: int) -> Optional[tuple[str, int, int]]:
+    if not (mdia := _find_video_mdia(buf, start, end)):
+        return None
+    if not (stsd := _find_path(buf, *mdia, b"minf", b"stbl", b"stsd")):
+        return None
+    # stsd: version/flags (4), entry_count (4), sample entries
+    for entry_type, entry_start, entry_end in _iter_atoms(buf, stsd[0] + 8, stsd[1]):
+        if entry_type not in MP4_CODEC_TYPES:
+            continue
+        # visual sample entry: reserved (6), data_reference_index (2), pre_defined/reserved (16), width, height
+        if entry_end - entry_start < 28:
+            return None
+        width = _U16.unpack_from(buf, entry_start + 24)[0]
+        height = _U16.unpack_from(buf, entry_start + 26)[0]
+        return MP4_CODEC_TYPES[entry_type], width, height
+    return None
+
+
+def _parse_video_fps(buf: mmap.mmap, start: int, end: int) -> Optional[float]:
+    if not (mdia := _find_video_mdia(buf, start, end)):
+        return None
+    # mdhd: version (1), flags (3), then creation and modification times of 4 or 8 bytes each, timescale
+    mdhd = _find_atom(buf, *mdia, b"mdhd")
+    stts = _find_path(buf, *mdia, b"minf", b"stbl", b"stts")
+    if not mdhd or not stts or mdhd[1] - mdhd[0] < 24:
+        return None
+    timescale = _U32.unpack_from(buf, mdhd[0] + (20 if buf[mdhd[0]] == 1 else 12))[0]
+    # stts: version/flags (4), entry_count (4), entries of sample count (4) and sample duration (4)
+    entry_count = _U32.unpack_from(buf, stts[0] + 4)[0]
+    if stts[0] + 8 + entry_count * _STTS_ENTRY.size > stts[1]:
+        return None
+    samples = duration = 0
+    for i in range(entry_count):
+        count, delta = _STTS_ENTRY.unpack_from(buf, stts[0] + 8 + i * _STTS_ENTRY.size)
+        samples += count
+        duration += count * delta
+    return samples * timescale / duration if samples and duration and timescale else None
+
+
+@lru_cache(maxsize=8)
+def get_video_file_fps(video_file: str) -> Optional[float]:
+    """
+    Attempts to find the average frame rate of the first video track in an MP4 / QuickTime file.
+
+    Returns:
+        float: frames per second, or None if the file can't be parsed.
+    """
+    try:
+        with open(video_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if not (moov := _find_atom(buf, 0, len(buf), b"moov")):
+                return None
+            for atom_type, trak_start, trak_end in _iter_atoms(buf, *moov):
+                if atom_type == b"trak" and (fps := _parse_video_fps(buf, trak_start, trak_end)):
+                    return fps
+    except (OSError, ValueError, struct.error):
+        pass
+    return None
+
+
+@lru_cache(maxsize=8)
+def get_video_file_info(video_file: str) -> Optional[tuple[str, int, int]]:
+    """
+    Attempts to find the codec and dimensions of the first video track in an MP4 / QuickTime file.
+
+    Only the container's `moov` atom is read, the video itself is not decoded.
+
+    Returns:
+        tuple[str, int, int]: codec name, width and height, or None if the file can't be parsed
+        or uses an unsupported codec.
+    """
+    try:
+        with open(video_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if not (moov := _find_atom(buf, 0, len(buf), b"moov")):
+                return None
+            for atom_type, trak_start, trak_end in _iter_atoms(buf, *moov):
+                if atom_type == b"trak" and (info := _parse_video_trak(buf, trak_start, trak_end)):
+                    return info
+    except (OSError, ValueError, struct.error):
+        pass
+    return None